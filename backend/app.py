@@ -1,13 +1,31 @@
-from flask import Flask, jsonify, request, make_response
+from flask import Flask, jsonify, request, make_response, g, has_request_context
 from flask_cors import CORS
-import mysql.connector
 from mysql.connector import Error
-from config import DB_CONFIG
+from db_pool import get_pool, pool_stats
+from cache import TTLCache, SingleFlightCache, SharedCounter
+from permissions import RolePermissionCache
+from refdata import RefDataCache
+from search_index import EmployeeSearchIndex
+from audit_log import audit_log
+from metrics import Counter, Gauge, Histogram, REGISTRY, TimedConnection, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from profiler import create_profiler
+from log_setup import setup_logging, flush_logging, logging_stats, request_id_var
+import rollup
+import project_totals
 from datetime import datetime, timedelta
 import calendar
 import hashlib
 import secrets
 import json
+import base64
+import binascii
+import time
+import uuid
+import os
+import threading
+import re
+import logging
+from concurrent.futures import ThreadPoolExecutor
 
 def hash_password(password):
     """生成密码哈希"""
@@ -25,6 +43,13 @@ def verify_password(password, password_hash):
     except:
         return False
 
+setup_logging()
+logger = logging.getLogger('pms.app')
+# 借出/归还连接等高频事件，DEBUG 级别且按 LOGGING_CONFIG['sample_rates'] 采样
+db_logger = logging.getLogger('pms.db')
+# 每个请求一条汇总日志（路由、状态码、耗时、数据库耗时与语句数）
+request_logger = logging.getLogger('pms.request')
+
 app = Flask(__name__)
 # 启用CORS并支持凭据，限制允许的前端来源
 CORS(app,
@@ -43,74 +68,352 @@ CORS(app,
 # 内存session存储（当user_sessions表不存在时使用）
 memory_sessions = {}
 
-# 连接计数器
-connection_count = 0
-active_connections = 0
-
-def get_db_connection():
-    """创建并返回数据库连接"""
-    global connection_count, active_connections
-    connection_count += 1
-    active_connections += 1
-    
+# 请求与数据库指标（/metrics），多进程部署时每个工作进程各自统计
+REQUEST_LATENCY = Histogram('pms_http_request_duration_seconds', '请求处理耗时（秒）', ['method', 'route'])
+REQUEST_COUNT = Counter('pms_http_requests_total', '请求数', ['method', 'route', 'status'])
+REQUESTS_IN_FLIGHT = Gauge('pms_http_requests_in_flight', '处理中的请求数')
+REQUEST_DB_TIME = Histogram('pms_http_request_db_seconds', '单个请求内数据库执行与取数总耗时（秒）', ['route'])
+POOL_CHECKOUT_WAIT = Histogram('pms_db_pool_checkout_seconds', '从连接池借出连接的等待时间（秒）',
+                               buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0))
+POOL_CHECKOUT_FAILURES = Counter('pms_db_pool_checkout_failures_total', '借出连接失败次数（超时或无法建立连接）')
+POOL_CONNECTIONS = Gauge('pms_db_pool_connections', '连接池连接数', ['state'])
+REQUEST_QUERY_COUNT = Histogram('pms_http_request_queries', '单个请求执行的SQL语句数', ['route'],
+                                buckets=(1, 2, 5, 10, 20, 50, 100, 200))
+QUERY_BUDGET_EXCEEDED = Counter('pms_http_query_budget_exceeded_total', '查询数超预算或疑似N+1的请求数', ['route'])
+LOG_QUEUE = Gauge('pms_log_queue', '日志队列状态（queued 为待写出条数，dropped 为队列满丢弃的累计条数）', ['state'])
+
+# SQL 性能分析：语句指纹统计、慢查询日志（EXPLAIN 使用独立连接）、单请求查询预算
+profiler = create_profiler(connect=lambda: get_pool().acquire())
+
+def _observe_db_time(seconds, statement=None, params=None):
+    """计时游标的回调：累计当前请求的数据库耗时与语句数，语句交给性能分析器"""
+    fp = None
+    if statement is not None and profiler.enabled:
+        fp = profiler.record(statement, params, seconds)
+    if has_request_context():
+        g.db_time = g.get('db_time', 0.0) + seconds
+        if statement is not None:
+            g.query_count = g.get('query_count', 0) + 1
+            if fp is not None:
+                fingerprints = g.setdefault('query_fingerprints', {})
+                fingerprints[fp] = fingerprints.get(fp, 0) + 1
+
+def _checkout_connection():
+    """从连接池借出一个物理连接（游标带计时），失败返回None"""
+    started = time.perf_counter()
     try:
-        print(f"[DB_CONN] Attempting connection #{connection_count}, active: {active_connections}")
-        print(f"[DB_CONN] MySQL: {DB_CONFIG['host']}:{DB_CONFIG['port']}")
-        conn = mysql.connector.connect(**DB_CONFIG)
-        
-        # 设置会话时区为北京时间（东八区）
-        cursor = conn.cursor()
-        cursor.execute("SET time_zone = '+08:00'")
-        cursor.close()
-        
-        print(f"[DB_CONN] Connection #{connection_count} successful, ID: {conn.connection_id}, active: {active_connections}")
-        return conn
+        # 会话时区（东八区）等初始化只在物理连接创建时执行一次，见 db_pool.py
+        conn = get_pool().acquire()
     except Error as e:
-        active_connections -= 1
-        print(f"[DB_CONN] Connection #{connection_count} FAILED: {e}")
-        print(f"[DB_CONN] Active connections after failure: {active_connections}")
+        POOL_CHECKOUT_FAILURES.inc()
+        logger.error('借出数据库连接失败: %s', e)
         return None
+    finally:
+        POOL_CHECKOUT_WAIT.observe(value=time.perf_counter() - started)
+    if db_logger.isEnabledFor(logging.DEBUG):
+        db_logger.debug('借出连接', extra={'connection_id': conn.connection_id,
+                                        'wait_ms': round((time.perf_counter() - started) * 1000, 2)})
+    return TimedConnection(conn, _observe_db_time)
 
-# 从cookie会话中获取当前登录的employee_id
-def get_current_employee_id(cursor=None):
-    session_id = request.cookies.get('pms_session_id')
-    if not session_id:
-        return None
+class RequestConnection(object):
+    """请求内共享的数据库连接：close() 不归还连接池，请求结束时统一归还"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def close(self):
+        pass
+
+def get_db_connection():
+    """获取数据库连接
+    请求上下文中首次调用时从连接池借出，同一请求内的后续调用复用同一连接，
+    请求结束时由 release_request_connection 归还；请求之外（后台线程等）直接借出独立连接，
+    用完须自行 close() 归还。
+    """
+    if not has_request_context():
+        return _checkout_connection()
+    conn = g.get('db_conn')
+    if conn is None:
+        conn = _checkout_connection()
+        if conn is None:
+            return None
+        g.db_conn = conn
+    return RequestConnection(conn)
+
+# 上游（负载均衡、前端）传入的请求ID只接受安全字符，否则重新生成
+REQUEST_ID_RE = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+@app.before_request
+def start_request_metrics():
+    request_id = request.headers.get('X-Request-ID', '')
+    if not REQUEST_ID_RE.match(request_id):
+        request_id = uuid.uuid4().hex[:16]
+    g.request_id = request_id
+    g.request_id_token = request_id_var.set(request_id)
+    g.request_started = time.perf_counter()
+    g.db_time = 0.0
+    g.query_count = 0
+    REQUESTS_IN_FLIGHT.inc()
+
+@app.after_request
+def capture_response_status(response):
+    g.response_status = response.status_code
+    response.headers['X-Query-Count'] = str(g.get('query_count', 0))
+    if 'request_id' in g:
+        response.headers['X-Request-ID'] = g.request_id
+    return response
+
+@app.teardown_request
+def record_request_metrics(exc):
+    """请求结束（包括异常）时记录耗时与状态码，teardown 总会执行，计数不会漂移"""
+    started = g.pop('request_started', None)
+    if started is None:
+        return
+    REQUESTS_IN_FLIGHT.dec()
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    status = g.get('response_status', 500)
+    elapsed = time.perf_counter() - started
+    query_count = g.get('query_count', 0)
+    REQUEST_LATENCY.observe(request.method, route, value=elapsed)
+    REQUEST_COUNT.inc(request.method, route, status)
+    REQUEST_DB_TIME.observe(route, value=g.get('db_time', 0.0))
+    REQUEST_QUERY_COUNT.observe(route, value=query_count)
+    if profiler.enabled:
+        violation = profiler.check_request(request.method, route, query_count, g.get('query_fingerprints', {}), elapsed)
+        if violation:
+            QUERY_BUDGET_EXCEEDED.inc(route)
+            logger.warning('SQL语句数超出预算 %s', profiler.query_budget,
+                           extra={'route': route, 'queries': query_count,
+                                  'n_plus_one': [item['fingerprint'] for item in violation['n_plus_one']]})
+    summary = {'route': route, 'status': status, 'elapsed_ms': round(elapsed * 1000, 2),
+               'db_ms': round(g.get('db_time', 0.0) * 1000, 2), 'queries': query_count}
+    if exc is not None:
+        summary['error'] = repr(exc)
+    request_logger.log(logging.ERROR if status >= 500 else logging.INFO,
+                       '%s %s %s', request.method, request.path, status, extra=summary)
+    token = g.pop('request_id_token', None)
+    if token is not None:
+        request_id_var.reset(token)
+
+@app.teardown_request
+def release_request_connection(exc):
+    """请求结束时归还请求内的数据库连接（未提交的事务会被回滚）"""
+    conn = g.pop('db_conn', None)
+    if conn is not None:
+        conn.close()
+
+# 会话缓存：pms_session_id -> 员工、角色与权限，命中时鉴权无需查库
+# 登出、改密、用户变更、角色变更时显式失效，其余情况最长 SESSION_CACHE_TTL 秒后重新加载
+SESSION_CACHE_TTL = 60
+session_cache = TTLCache(max_size=10000, ttl=SESSION_CACHE_TTL)
+
+# 多进程部署时通过共享的失效代数同步各工作进程的会话缓存：任一进程失效会话后推进代数，
+# 其他进程下次读缓存时发现代数变化即清空本进程的会话缓存、重新查库
+try:
+    from config import SESSION_GENERATION_PATH
+except ImportError:
+    SESSION_GENERATION_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'session_cache.generation')
+session_generation = SharedCounter(SESSION_GENERATION_PATH)
+_seen_session_generation = session_generation.value()
+_session_generation_lock = threading.Lock()
+
+def cached_session(session_id):
+    """从会话缓存读取会话，其他进程失效过会话时先清空本进程缓存"""
+    global _seen_session_generation
+    generation = session_generation.value()
+    if generation != _seen_session_generation:
+        with _session_generation_lock:
+            if generation != _seen_session_generation:
+                session_cache.clear()
+                _seen_session_generation = generation
+    return session_cache.get(session_id)
+
+def publish_session_invalidation():
+    """通知其他工作进程丢弃会话缓存（本进程已精确失效，不必整体清空）"""
+    global _seen_session_generation
+    with _session_generation_lock:
+        generation = session_generation.increment()
+        # 期间没有其他进程推进过代数时，本进程的缓存仍然有效
+        if generation == _seen_session_generation + 1:
+            _seen_session_generation = generation
+
+def parse_permissions(value):
+    """解析 roles.permissions 字段（驱动可能返回字符串或已解析的对象）"""
+    if not value:
+        return {}
+    if isinstance(value, (dict, list)):
+        return value
+    if isinstance(value, (bytes, bytearray)):
+        value = value.decode('utf-8')
+    try:
+        return json.loads(value)
+    except (json.JSONDecodeError, TypeError):
+        return {}
+
+def load_session(session_id, cursor=None):
+    """按 pms_session_id 加载会话信息，优先命中会话缓存，无效时返回None"""
+    generation = session_generation.value()
+    session = cached_session(session_id)
+    if session is not None:
+        return session
     close_cursor = False
     if cursor is None:
+        # 复用请求内的连接，不额外借出
         conn = get_db_connection()
         if not conn:
             return None
         cursor = conn.cursor(dictionary=True)
         close_cursor = True
     try:
+        session_data = None
         try:
-            cursor.execute(
-                """
-                SELECT s.employee_id
+            cursor.execute("""
+                SELECT s.employee_id, s.expires_at,
+                       e.name, e.email, e.status, e.role_id,
+                       r.role_name, r.role_code, r.permissions
                 FROM user_sessions s
                 JOIN employees e ON s.employee_id = e.id
+                LEFT JOIN roles r ON e.role_id = r.id
                 WHERE s.session_token = %s AND s.expires_at > %s AND e.status = 1
-                """,
-                (session_id, datetime.now()),
-            )
-            row = cursor.fetchone()
-            if row:
-                return row['employee_id']
-        except Error:
-            # 回退到内存session
+            """, (session_id, datetime.now()))
+            session_data = cursor.fetchone()
+        except Error as e:
+            # 如果user_sessions表不存在，从内存存储查询
+            logger.warning('查询 user_sessions 失败，使用内存存储: %s', e)
             sess = memory_sessions.get(session_id)
             if sess and sess.get('expires_at') and sess['expires_at'] > datetime.now():
-                return sess.get('employee_id')
-        return None
+                cursor.execute("""
+                    SELECT e.id as employee_id, e.name, e.email, e.status, e.role_id,
+                           r.role_name, r.role_code, r.permissions
+                    FROM employees e
+                    LEFT JOIN roles r ON e.role_id = r.id
+                    WHERE e.id = %s AND e.status = 1
+                """, (sess['employee_id'],))
+                session_data = cursor.fetchone()
+                if session_data:
+                    session_data['expires_at'] = sess['expires_at']
+        if not session_data:
+            return None
+        session = {
+            'employee_id': session_data['employee_id'],
+            'name': session_data['name'],
+            'email': session_data['email'],
+            'role_id': session_data['role_id'],
+            'role_name': session_data['role_name'],
+            'role_code': session_data['role_code'],
+            'permissions_raw': session_data['permissions'],
+            'permissions': parse_permissions(session_data['permissions']),
+            'expires_at': session_data['expires_at'],
+        }
+        # 缓存时间不超过会话本身的剩余有效期；查库期间有失效发生时不写入缓存
+        ttl = min(SESSION_CACHE_TTL, (session['expires_at'] - datetime.now()).total_seconds())
+        if session_generation.value() == generation:
+            session_cache.set(session_id, session, ttl=ttl)
+        return session
     finally:
         if close_cursor:
             try:
                 cursor.close()
-                conn.close()
             except Exception:
                 pass
 
+def invalidate_sessions(employee_id=None, role_id=None):
+    """按员工或角色失效会话缓存"""
+    if employee_id is not None:
+        session_cache.invalidate_where(lambda token, sess: sess['employee_id'] == employee_id)
+    if role_id is not None:
+        session_cache.invalidate_where(lambda token, sess: sess['role_id'] == role_id)
+    publish_session_invalidation()
+
+def _load_role_permissions():
+    """角色权限缓存的加载函数：一次查询全部角色"""
+    conn = get_db_connection()
+    if not conn:
+        raise Error('Database connection failed.')
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT id, role_name, permissions FROM roles")
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+role_permissions = RolePermissionCache(_load_role_permissions)
+
+def has_permission(employee, key):
+    """判断员工是否拥有权限键（如 'navigation.timesheet'）
+    employee 为 load_session 返回的会话信息，角色权限缓存命中时不访问数据库
+    """
+    if not employee:
+        return False
+    return key in role_permissions.get(employee.get('role_id')).keys
+
+# 运维统计接口（SQL 性能分析、连接池、参考数据缓存）仅对系统管理权限开放
+ADMIN_PERMISSION = 'navigation.system-management'
+
+def check_permission(key):
+    """校验当前会话是否拥有权限键，通过时返回 None，否则返回 401/403 响应"""
+    session_id = request.cookies.get('pms_session_id')
+    try:
+        user = load_session(session_id) if session_id else None
+    except Error as e:
+        return jsonify({'message': str(e)}), 500
+    if not user:
+        return jsonify({'message': '未登录或会话失效'}), 401
+    if not has_permission(user, key):
+        return jsonify({'message': '没有权限'}), 403
+    return None
+
+# 从cookie会话中获取当前登录的employee_id
+def get_current_employee_id(cursor=None):
+    session_id = request.cookies.get('pms_session_id')
+    if not session_id:
+        return None
+    session = load_session(session_id, cursor)
+    return session['employee_id'] if session else None
+
+def get_operator_name():
+    """获取操作日志中的操作人：优先取会话关联的员工姓名，其次取 X-User-Name 请求头"""
+    user_name = None
+    session_id = request.cookies.get('pms_session_id')
+    if session_id:
+        try:
+            session = load_session(session_id)
+            if session:
+                user_name = session['name']
+        except Error:
+            pass
+    return user_name or request.headers.get('X-User-Name', '系统')
+
+# 参考数据缓存：项目、部门、项目经理、角色列表，写接口提交后推进对应版本号
+REFDATA_CACHE_TTL = 300
+# 浏览器可缓存，但每次使用前须用 ETag 重新验证，写操作后立即可见
+REFDATA_CACHE_CONTROL = 'private, no-cache'
+refdata = RefDataCache(ttl=REFDATA_CACHE_TTL)
+
+def refdata_response(name, compute, key=()):
+    """返回参考数据响应，未命中缓存时借用数据库连接调用 compute(cursor) 计算
+    请求的 If-None-Match 与缓存内容哈希一致时直接返回 304
+    """
+    def load():
+        conn = get_db_connection()
+        if not conn:
+            raise Error('Database connection failed.')
+        cursor = conn.cursor(dictionary=True)
+        try:
+            return compute(cursor)
+        finally:
+            cursor.close()
+            conn.close()
+    entry = refdata.get(name, load, key)
+    response = app.response_class(entry.body, mimetype='application/json')
+    response.set_etag(entry.etag)
+    response.headers['Cache-Control'] = REFDATA_CACHE_CONTROL
+    return response.make_conditional(request)
+
 @app.route('/api/db-test')
 def db_test():
     """测试数据库连接"""
@@ -121,6 +424,53 @@ def db_test():
     else:
         return jsonify({'status': 'error', 'message': 'Database connection failed.'}), 500
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus 文本格式指标"""
+    stats = pool_stats()
+    for state in ('size', 'idle', 'in_use', 'waiting'):
+        POOL_CONNECTIONS.set(state, value=stats.get(state, 0))
+    log_stats = logging_stats()
+    for state in ('queued', 'dropped'):
+        LOG_QUEUE.set(state, value=log_stats.get(state, 0))
+    return app.response_class(REGISTRY.render(), content_type=METRICS_CONTENT_TYPE)
+
+@app.route('/api/profiler/stats', methods=['GET'])
+def profiler_stats():
+    """SQL 性能分析统计
+    参数: top=返回的指纹数（默认20），order_by=total|count|p95|max（默认total）
+    """
+    denied = check_permission(ADMIN_PERMISSION)
+    if denied:
+        return denied
+    top = max(1, min(request.args.get('top', 20, type=int), 500))
+    return jsonify(profiler.stats(top=top, order_by=request.args.get('order_by', 'total')))
+
+@app.route('/api/profiler/reset', methods=['POST'])
+def profiler_reset():
+    """清空 SQL 性能分析统计"""
+    denied = check_permission(ADMIN_PERMISSION)
+    if denied:
+        return denied
+    profiler.reset()
+    return jsonify({'message': '已清空'})
+
+@app.route('/api/db-pool/stats', methods=['GET'])
+def db_pool_stats():
+    """连接池统计信息"""
+    denied = check_permission(ADMIN_PERMISSION)
+    if denied:
+        return denied
+    return jsonify(pool_stats())
+
+@app.route('/api/refdata/stats', methods=['GET'])
+def refdata_stats():
+    """参考数据缓存统计信息"""
+    denied = check_permission(ADMIN_PERMISSION)
+    if denied:
+        return denied
+    return jsonify(refdata.stats())
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """健康检查接口"""
@@ -132,67 +482,96 @@ def health_check():
             cursor.fetchone()
             cursor.close()
             conn.close()
-            return jsonify({'status': 'success', 'message': 'Service and database healthy.'})
+            return jsonify({'status': 'success', 'message': 'Service and database healthy.', 'pool': pool_stats()})
         else:
             return jsonify({'status': 'error', 'message': 'Database connection failed.'}), 500
     except Exception as e:
         return jsonify({'status': 'error', 'message': f'Health check failed: {str(e)}'}), 500
 
+def _load_employee_search_rows():
+    """员工搜索索引的加载函数：一次查询全部员工姓名与部门名"""
+    conn = get_db_connection()
+    if not conn:
+        raise Error('Database connection failed.')
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT e.id, e.name, d.dept_name
+            FROM employees e
+            LEFT JOIN departments d ON e.department_id = d.id
+        """)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+employee_search = EmployeeSearchIndex(_load_employee_search_rows)
+
+# 联想输入最多返回条数
+MAX_TYPEAHEAD_LIMIT = 50
+
 # 人员管理API
 @app.route('/api/employees', methods=['GET'])
 def get_employees():
-    """获取员工列表"""
+    """获取员工列表（search 关键字走内存搜索索引，只按主键取当前页）"""
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 10, type=int)
     search = request.args.get('search', '', type=str)
     department = request.args.get('department', '', type=str)
+    # pinyin=1 时关键字同时匹配姓名拼音（全拼/首字母），默认与 LIKE 结果一致
+    pinyin = request.args.get('pinyin', '') in ('1', 'true')
     
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
-        # 构建查询条件
-        where_conditions = []
-        params = []
-        
-        if search:
-            where_conditions.append("(e.name LIKE %s OR d.dept_name LIKE %s)")
-            params.extend([f'%{search}%', f'%{search}%'])
-        
-        if department:
-            where_conditions.append("d.dept_name = %s")
-            params.append(department)
-        
-        where_clause = ""
-        if where_conditions:
-            where_clause = "WHERE " + " AND ".join(where_conditions)
-        
-        # 获取总数
-        count_query = f"""
-            SELECT COUNT(*) 
-            FROM employees e 
-            LEFT JOIN departments d ON e.department_id = d.id 
-            {where_clause}
-        """
-        cursor.execute(count_query, params)
-        total = cursor.fetchone()[0]
-        
-        # 计算分页
         offset = (page - 1) * per_page
-        total_pages = (total + per_page - 1) // per_page
-        
-        # 获取员工数据
-        query = f"""
+        select_clause = """
             SELECT e.id, e.name, e.email, e.role_id, r.role_name, e.last_login,
                    d.dept_name as department, e.department_id
             FROM employees e 
             LEFT JOIN roles r ON e.role_id = r.id
             LEFT JOIN departments d ON e.department_id = d.id 
-            {where_clause}
-            ORDER BY e.id DESC 
-            LIMIT %s OFFSET %s
         """
-        cursor.execute(query, params + [per_page, offset])
-        employees = cursor.fetchall()
+        
+        if search:
+            # 搜索索引给出按ID倒序的全部匹配，总数即匹配数，当前页按主键查询
+            matched_ids = employee_search.search(search, department or None, pinyin=pinyin)
+            total = len(matched_ids)
+            page_ids = matched_ids[max(offset, 0):max(offset, 0) + per_page]
+            employees = []
+            if page_ids:
+                placeholders = ', '.join(['%s'] * len(page_ids))
+                cursor.execute(f"{select_clause} WHERE e.id IN ({placeholders}) ORDER BY e.id DESC", page_ids)
+                employees = cursor.fetchall()
+        else:
+            where_clause = ""
+            params = []
+            if department:
+                where_clause = "WHERE d.dept_name = %s"
+                params.append(department)
+            
+            # 获取总数
+            count_query = f"""
+                SELECT COUNT(*) 
+                FROM employees e 
+                LEFT JOIN departments d ON e.department_id = d.id 
+                {where_clause}
+            """
+            cursor.execute(count_query, params)
+            total = cursor.fetchone()[0]
+            
+            # 获取员工数据
+            query = f"""
+                {select_clause}
+                {where_clause}
+                ORDER BY e.id DESC 
+                LIMIT %s OFFSET %s
+            """
+            cursor.execute(query, params + [per_page, offset])
+            employees = cursor.fetchall()
+        
+        # 计算分页
+        total_pages = (total + per_page - 1) // per_page
         
         # 转换为字典格式
         employee_list = []
@@ -226,112 +605,66 @@ def get_employees():
     except Error as e:
         return jsonify({'message': str(e)}), 500
     finally:
-        global active_connections
         if cursor:
             cursor.close()
-            print(f"[DB_CONN] Cursor closed")
         if conn:
-            print(f"[DB_CONN] Closing connection ID: {conn.connection_id}")
             conn.close()
-            active_connections -= 1
-            print(f"[DB_CONN] Connection closed, active: {active_connections}")
+
+@app.route('/api/employees/typeahead', methods=['GET'])
+def employee_typeahead():
+    """员工联想输入：按姓名、拼音、部门名匹配，返回前 limit 个（默认10）
+    参数: q=关键字，limit=返回条数
+    """
+    query = request.args.get('q', '', type=str)
+    limit = max(1, min(request.args.get('limit', 10, type=int), MAX_TYPEAHEAD_LIMIT))
+    try:
+        return jsonify({'items': employee_search.typeahead(query, limit)})
+    except Error as e:
+        return jsonify({'message': str(e)}), 500
+
+@app.route('/api/employees/search-index/stats', methods=['GET'])
+def employee_search_stats():
+    """员工搜索索引统计信息"""
+    return jsonify(employee_search.stats())
 
 @app.route('/api/departments', methods=['GET'])
 def get_departments():
-    """获取部门列表"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    """获取部门列表（参考数据缓存）"""
+    def compute(cursor):
+        cursor.execute("SELECT id, dept_name AS name FROM departments ORDER BY dept_name")
+        return cursor.fetchall()
     try:
-        cursor.execute("SELECT id, dept_name FROM departments ORDER BY dept_name")
-        departments = cursor.fetchall()
-        return jsonify([{'id': dept[0], 'name': dept[1]} for dept in departments])
+        return refdata_response('departments', compute)
     except Error as e:
         return jsonify({'message': str(e)}), 500
-    finally:
-        global active_connections
-        if cursor:
-            cursor.close()
-            print(f"[DB_CONN] Cursor closed")
-        if conn:
-            print(f"[DB_CONN] Closing connection ID: {conn.connection_id}")
-            conn.close()
-            active_connections -= 1
-            print(f"[DB_CONN] Connection closed, active: {active_connections}")
+
 @app.route('/api/current-user-permissions', methods=['GET'])
 def get_current_user_permissions():
-    """获取当前用户权限"""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+    """获取当前用户权限（会话缓存 + 角色权限缓存，命中时不访问数据库）"""
+    session_id = request.cookies.get('pms_session_id')
     try:
-        # 从session中获取当前登录用户ID
-        employee_id = get_current_employee_id(cursor)
-        if not employee_id:
-            return jsonify({'message': '未登录或会话失效'}), 401
-        
-        cursor.execute("""
-            SELECT e.id, e.name, e.role_id, r.role_name, r.permissions
-            FROM employees e
-            LEFT JOIN roles r ON e.role_id = r.id
-            WHERE e.id = %s AND e.status = 1
-        """, (employee_id,))
-        
-        user = cursor.fetchone()
+        user = load_session(session_id) if session_id else None
         if not user:
-            return jsonify({'message': '用户不存在或已被禁用'}), 404
-        
-        print(f"[权限查询] 用户: {user['name']}, 角色: {user['role_name']}")
-        print(f"[权限查询] 原始permissions字段: {user['permissions']}")
-        print(f"[权限查询] permissions类型: {type(user['permissions'])}")
-        
-        # 解析权限JSON
-        permissions = {}
-        if user['permissions']:
-            try:
-                # 如果已经是字典类型（某些MySQL驱动会自动解析JSON）
-                if isinstance(user['permissions'], dict):
-                    permissions = user['permissions']
-                # 如果是字符串类型，需要解析
-                elif isinstance(user['permissions'], str):
-                    permissions = json.loads(user['permissions'])
-                else:
-                    print(f"[权限查询] 未知的permissions类型: {type(user['permissions'])}")
-                    permissions = {}
-            except (json.JSONDecodeError, TypeError) as e:
-                print(f"[权限查询] 解析permissions失败: {e}")
-                permissions = {}
-        
-        # 强制添加工时管理权限（所有用户必须有）
-        if 'navigation' not in permissions:
-            permissions['navigation'] = {}
-        permissions['navigation']['timesheet'] = True
+            return jsonify({'message': '未登录或会话失效'}), 401
         
-        print(f"[权限查询] 解析后的permissions: {permissions}")
+        # 已强制包含工时管理权限（所有用户必须有），见 permissions.py
+        compiled = role_permissions.get(user['role_id'])
         
         return jsonify({
-            'user_id': user['id'],
+            'user_id': user['employee_id'],
             'user_name': user['name'],
             'role_id': user['role_id'],
             'role_name': user['role_name'],
-            'permissions': permissions
+            'permissions': compiled.tree
         })
         
     except Error as e:
-        print(f"[权限查询] 数据库错误: {e}")
+        logger.error('查询角色权限失败: %s', e)
         return jsonify({'message': str(e)}), 500
-    finally:
-        global active_connections
-        if cursor:
-            cursor.close()
-            print(f"[DB_CONN] Cursor closed")
-        if conn:
-            print(f"[DB_CONN] Closing connection ID: {conn.connection_id}")
-            conn.close()
-            active_connections -= 1
-            print(f"[DB_CONN] Connection closed, active: {active_connections}")
 
 @app.route('/api/roles', methods=['GET'])
 def get_roles():
-    """获取角色列表（支持分页）"""
+    """获取角色列表（支持分页，参考数据缓存）"""
     page = int(request.args.get('page', 1))
     per_page = int(request.args.get('per_page', 10))
     page = max(1, page)
@@ -339,9 +672,7 @@ def get_roles():
     
     offset = (page - 1) * per_page
     
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    try:
+    def compute(cursor):
         # 统计总数
         cursor.execute("SELECT COUNT(*) AS cnt FROM roles")
         total_count = cursor.fetchone()['cnt']
@@ -357,7 +688,7 @@ def get_roles():
         
         total_pages = (total_count + per_page - 1) // per_page if per_page else 1
         
-        return jsonify({
+        return {
             'items': roles,
             'pagination': {
                 'page': page,
@@ -365,26 +696,16 @@ def get_roles():
                 'total_count': total_count,
                 'total_pages': total_pages
             }
-        })
+        }
+    try:
+        return refdata_response('roles', compute, (page, per_page))
     except Error as e:
         return jsonify({'message': str(e)}), 500
-    finally:
-        global active_connections
-        if cursor:
-            cursor.close()
-            print(f"[DB_CONN] Cursor closed")
-        if conn:
-            print(f"[DB_CONN] Closing connection ID: {conn.connection_id}")
-            conn.close()
-            active_connections -= 1
-            print(f"[DB_CONN] Connection closed, active: {active_connections}")
 
 @app.route('/api/employees/project-managers', methods=['GET'])
 def get_project_managers():
-    """获取项目经理列表"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
+    """获取项目经理列表（参考数据缓存）"""
+    def compute(cursor):
         cursor.execute("""
             SELECT e.id, e.name 
             FROM employees e
@@ -392,20 +713,11 @@ def get_project_managers():
             WHERE r.role_name = '项目经理' AND e.status = 1 
             ORDER BY e.name
         """)
-        managers = cursor.fetchall()
-        return jsonify([{'id': manager[0], 'name': manager[1]} for manager in managers])
+        return cursor.fetchall()
+    try:
+        return refdata_response('project_managers', compute)
     except Error as e:
         return jsonify({'message': str(e)}), 500
-    finally:
-        global active_connections
-        if cursor:
-            cursor.close()
-            print(f"[DB_CONN] Cursor closed")
-        if conn:
-            print(f"[DB_CONN] Closing connection ID: {conn.connection_id}")
-            conn.close()
-            active_connections -= 1
-            print(f"[DB_CONN] Connection closed, active: {active_connections}")
 
 @app.route('/api/roles', methods=['POST'])
 def create_role():
@@ -433,7 +745,7 @@ def create_role():
             permissions['navigation'] = {}
         permissions['navigation']['timesheet'] = True
         
-        print(f"[创建角色] 角色: {role_name}, 权限: {permissions}")
+        logger.debug('创建角色 %s，权限: %s', role_name, permissions)
 
         cursor.execute(
             """
@@ -443,43 +755,12 @@ def create_role():
             (role_name, role_code, description, json.dumps(permissions))
         )
         conn.commit()
+        role_permissions.invalidate()
+        refdata.bump('roles')
 
         new_id = cursor.lastrowid
-        # 操作日志（不影响主流程）
-        try:
-            # 优先从session获取当前用户名称
-            user_name = None
-            try:
-                # 直接读session关联的员工名称
-                conn2 = get_db_connection()
-                if conn2:  # 检查连接是否成功
-                    cur2 = conn2.cursor()
-                session_id = request.cookies.get('pms_session_id')
-                if session_id:
-                    cur2.execute("""
-                        SELECT e.name
-                        FROM user_sessions s
-                        JOIN employees e ON e.id = s.employee_id
-                        WHERE s.session_token = %s AND s.expires_at > %s
-                    """, (session_id, datetime.now()))
-                    row = cur2.fetchone()
-                    if row:
-                        user_name = row[0]
-                    cur2.close()
-                    conn2.close()
-            except Exception:
-                pass
-            if not user_name:
-                user_name = request.headers.get('X-User-Name', '系统')
-            log_cur = conn.cursor()
-            log_cur.execute(
-                "INSERT INTO operation_logs (operation_time, user_name, operation) VALUES (NOW(), %s, %s)",
-                (user_name, f"创建角色: {role_name}({role_code})")
-            )
-            conn.commit()
-            log_cur.close()
-        except Exception:
-            conn.rollback()
+        # 操作日志（异步批量写入，不影响主流程）
+        audit_log.record(get_operator_name(), f"创建角色: {role_name}({role_code})")
         cursor.execute("""
             SELECT id, role_name, role_code, description, status, permissions
             FROM roles
@@ -490,15 +771,10 @@ def create_role():
     except Error as e:
         return jsonify({'message': str(e)}), 500
     finally:
-        global active_connections
         if cursor:
             cursor.close()
-            print(f"[DB_CONN] Cursor closed")
         if conn:
-            print(f"[DB_CONN] Closing connection ID: {conn.connection_id}")
             conn.close()
-            active_connections -= 1
-            print(f"[DB_CONN] Connection closed, active: {active_connections}")
 
 @app.route('/api/roles/<int:role_id>', methods=['GET'])
 def get_role(role_id):
@@ -518,15 +794,10 @@ def get_role(role_id):
     except Error as e:
         return jsonify({'message': str(e)}), 500
     finally:
-        global active_connections
         if cursor:
             cursor.close()
-            print(f"[DB_CONN] Cursor closed")
         if conn:
-            print(f"[DB_CONN] Closing connection ID: {conn.connection_id}")
             conn.close()
-            active_connections -= 1
-            print(f"[DB_CONN] Connection closed, active: {active_connections}")
 
 @app.route('/api/roles/<int:role_id>', methods=['PUT'])
 def update_role(role_id):
@@ -561,7 +832,7 @@ def update_role(role_id):
             permissions['navigation'] = {}
         permissions['navigation']['timesheet'] = True
         
-        print(f"[更新角色] 角色ID: {role_id}, 角色: {role_name}, 权限: {permissions}")
+        logger.debug('更新角色 %s (%s)，权限: %s', role_id, role_name, permissions)
 
         cursor.execute(
             """
@@ -572,40 +843,12 @@ def update_role(role_id):
             (role_name, role_code, description, status, json.dumps(permissions), role_id)
         )
         conn.commit()
+        invalidate_sessions(role_id=role_id)
+        role_permissions.invalidate()
+        refdata.bump('roles', 'project_managers')
 
-        # 操作日志（不影响主流程）
-        try:
-            user_name = None
-            try:
-                conn2 = get_db_connection()
-                if conn2:  # 检查连接是否成功
-                    cur2 = conn2.cursor()
-                session_id = request.cookies.get('pms_session_id')
-                if session_id:
-                    cur2.execute("""
-                        SELECT e.name
-                        FROM user_sessions s
-                        JOIN employees e ON e.id = s.employee_id
-                        WHERE s.session_token = %s AND s.expires_at > %s
-                    """, (session_id, datetime.now()))
-                    row = cur2.fetchone()
-                    if row:
-                        user_name = row[0]
-                    cur2.close()
-                    conn2.close()
-            except Exception:
-                pass
-            if not user_name:
-                user_name = request.headers.get('X-User-Name', '系统')
-            log_cur = conn.cursor()
-            log_cur.execute(
-                "INSERT INTO operation_logs (operation_time, user_name, operation) VALUES (NOW(), %s, %s)",
-                (user_name, f"更新角色: {role_name}({role_code})")
-            )
-            conn.commit()
-            log_cur.close()
-        except Exception:
-            conn.rollback()
+        # 操作日志（异步批量写入，不影响主流程）
+        audit_log.record(get_operator_name(), f"更新角色: {role_name}({role_code})")
         cursor.execute("""
             SELECT id, role_name, role_code, description, status, permissions
             FROM roles
@@ -617,15 +860,10 @@ def update_role(role_id):
         conn.rollback()
         return jsonify({'message': str(e)}), 500
     finally:
-        global active_connections
         if cursor:
             cursor.close()
-            print(f"[DB_CONN] Cursor closed")
         if conn:
-            print(f"[DB_CONN] Closing connection ID: {conn.connection_id}")
             conn.close()
-            active_connections -= 1
-            print(f"[DB_CONN] Connection closed, active: {active_connections}")
 
 @app.route('/api/roles/<int:role_id>', methods=['DELETE'])
 def delete_role(role_id):
@@ -649,89 +887,144 @@ def delete_role(role_id):
 
         cursor.execute("DELETE FROM roles WHERE id = %s", (role_id,))
         conn.commit()
-        # 操作日志（不影响主流程）
-        try:
-            user_name = None
-            try:
-                conn2 = get_db_connection()
-                if conn2:  # 检查连接是否成功
-                    cur2 = conn2.cursor()
-                session_id = request.cookies.get('pms_session_id')
-                if session_id:
-                    cur2.execute("""
-                        SELECT e.name
-                        FROM user_sessions s
-                        JOIN employees e ON e.id = s.employee_id
-                        WHERE s.session_token = %s AND s.expires_at > %s
-                    """, (session_id, datetime.now()))
-                    row = cur2.fetchone()
-                    if row:
-                        user_name = row[0]
-                    cur2.close()
-                    conn2.close()
-            except Exception:
-                pass
-            if not user_name:
-                user_name = request.headers.get('X-User-Name', '系统')
-            log_cur = conn.cursor()
-            log_cur.execute(
-                "INSERT INTO operation_logs (operation_time, user_name, operation) VALUES (NOW(), %s, %s)",
-                (user_name, f"删除角色: {role_name}")
-            )
-            conn.commit()
-            log_cur.close()
-        except Exception:
-            conn.rollback()
+        invalidate_sessions(role_id=role_id)
+        role_permissions.invalidate()
+        refdata.bump('roles', 'project_managers')
+        # 操作日志（异步批量写入，不影响主流程）
+        audit_log.record(get_operator_name(), f"删除角色: {role_name}")
         
         return jsonify({'message': '删除成功'}), 200
     except Error as e:
         conn.rollback()
         return jsonify({'message': str(e)}), 500
     finally:
-        global active_connections
         if cursor:
             cursor.close()
-            print(f"[DB_CONN] Cursor closed")
         if conn:
-            print(f"[DB_CONN] Closing connection ID: {conn.connection_id}")
             conn.close()
-            active_connections -= 1
-            print(f"[DB_CONN] Connection closed, active: {active_connections}")
+
+# 操作日志总数缓存（仅游标分页使用）：大表上精确 COUNT(*) 代价高，游标分页的总数允许短时间内不精确；
+# 偏移分页保持原有的精确 COUNT(*)，total_count / total_pages 含义不变
+operation_log_count_cache = TTLCache(max_size=1, ttl=60)
+# 表统计行数低于该值时直接精确计数（小表的 TABLE_ROWS 估算误差较大）
+EXACT_COUNT_THRESHOLD = 100000
+
+def get_operation_log_total(cursor):
+    """操作日志总数（缓存），返回 (total, is_estimate)"""
+    cached = operation_log_count_cache.get('total')
+    if cached is not None:
+        return cached
+    cursor.execute("""
+        SELECT TABLE_ROWS AS cnt
+        FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'operation_logs'
+    """)
+    row = cursor.fetchone()
+    estimate = int(row['cnt'] or 0) if row else 0
+    if estimate < EXACT_COUNT_THRESHOLD:
+        cursor.execute("SELECT COUNT(*) AS cnt FROM operation_logs")
+        result = (cursor.fetchone()['cnt'], False)
+    else:
+        result = (estimate, True)
+    operation_log_count_cache.set('total', result)
+    return result
+
+def encode_log_cursor(operation_time, log_id):
+    """把 (operation_time, id) 编码为不透明的游标字符串"""
+    raw = json.dumps([operation_time.isoformat(), log_id])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_log_cursor(token):
+    """解析游标字符串，格式错误时抛出 ValueError"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        operation_time, log_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(operation_time), int(log_id)
+    except (TypeError, ValueError, UnicodeError, binascii.Error) as e:
+        raise ValueError(f'无效的游标: {token}') from e
 
 @app.route('/api/operation-logs', methods=['GET'])
 def get_operation_logs():
-    """获取操作日志列表（简化版，支持分页）"""
+    """获取操作日志列表（支持分页）
+    默认按 page/per_page 偏移分页；传入 mode=cursor 或 cursor 参数时使用游标分页，
+    按 (operation_time, id) 定位，翻到任意深度的代价都与第一页相同
+    """
     page = int(request.args.get('page', 1))
     per_page = int(request.args.get('per_page', 10))
     page = max(1, page)
     per_page = max(1, min(per_page, 100))
+    cursor_token = request.args.get('cursor')
+    cursor_mode = request.args.get('mode') == 'cursor' or cursor_token is not None
+
+    after = None
+    if cursor_token:
+        try:
+            after = decode_log_cursor(cursor_token)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
 
     offset = (page - 1) * per_page
 
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
     try:
-        # 统计总数
-        cursor.execute("SELECT COUNT(*) AS cnt FROM operation_logs")
-        total_count = cursor.fetchone()['cnt']
-
-        # 查询当前页，直接返回数据库存储的时间（不做时区转换）
-        cursor.execute(
-            """
-            SELECT id, operation_time, user_name, `operation`
-            FROM operation_logs
-            ORDER BY operation_time DESC, id DESC
-            LIMIT %s OFFSET %s
-            """,
-            (per_page, offset)
-        )
-        logs = cursor.fetchall()
+        # 直接返回数据库存储的时间（不做时区转换）
+        if cursor_mode:
+            # 统计总数（缓存，可能为估算值）
+            total_count, total_is_estimate = get_operation_log_total(cursor)
+            where_clause = ""
+            params = []
+            if after:
+                where_clause = "WHERE operation_time < %s OR (operation_time = %s AND id < %s)"
+                params = [after[0], after[0], after[1]]
+            # 多取一条用于判断是否还有下一页
+            cursor.execute(
+                f"""
+                SELECT id, operation_time, user_name, `operation`
+                FROM operation_logs
+                {where_clause}
+                ORDER BY operation_time DESC, id DESC
+                LIMIT %s
+                """,
+                params + [per_page + 1]
+            )
+            logs = cursor.fetchall()
+            has_next = len(logs) > per_page
+            logs = logs[:per_page]
+            next_cursor = None
+            if has_next and logs:
+                next_cursor = encode_log_cursor(logs[-1]['operation_time'], logs[-1]['id'])
+        else:
+            cursor.execute("SELECT COUNT(*) AS cnt FROM operation_logs")
+            total_count = cursor.fetchone()['cnt']
+            cursor.execute(
+                """
+                SELECT id, operation_time, user_name, `operation`
+                FROM operation_logs
+                ORDER BY operation_time DESC, id DESC
+                LIMIT %s OFFSET %s
+                """,
+                (per_page, offset)
+            )
+            logs = cursor.fetchall()
         
         # 手动格式化时间为字符串，避免Flask自动转换为GMT格式
         for log in logs:
             if log.get('operation_time'):
                 log['operation_time'] = log['operation_time'].strftime('%Y-%m-%d %H:%M:%S')
 
+        if cursor_mode:
+            return jsonify({
+                'items': logs,
+                'next_cursor': next_cursor,
+                'pagination': {
+                    'per_page': per_page,
+                    'total_count': total_count,
+                    'total_is_estimate': total_is_estimate,
+                    'has_next': has_next
+                }
+            })
+
         total_pages = (total_count + per_page - 1) // per_page if per_page else 1
 
         return jsonify({
@@ -746,15 +1039,10 @@ def get_operation_logs():
     except Error as e:
         return jsonify({'message': str(e)}), 500
     finally:
-        global active_connections
         if cursor:
             cursor.close()
-            print(f"[DB_CONN] Cursor closed")
         if conn:
-            print(f"[DB_CONN] Closing connection ID: {conn.connection_id}")
             conn.close()
-            active_connections -= 1
-            print(f"[DB_CONN] Connection closed, active: {active_connections}")
 
 @app.route('/api/users', methods=['POST'])
 def create_user():
@@ -794,41 +1082,12 @@ def create_user():
             (name, email, password_hash, role_id, department_id)
         )
         conn.commit()
+        refdata.bump('project_managers')
+        employee_search.invalidate()
 
         new_id = cursor.lastrowid
-        # 操作日志（不影响主流程）
-        try:
-            user_name = None
-            try:
-                conn2 = get_db_connection()
-                if conn2:  # 检查连接是否成功
-                    cur2 = conn2.cursor()
-                session_id = request.cookies.get('pms_session_id')
-                if session_id:
-                    cur2.execute("""
-                        SELECT e.name
-                        FROM user_sessions s
-                        JOIN employees e ON e.id = s.employee_id
-                        WHERE s.session_token = %s AND s.expires_at > %s
-                    """, (session_id, datetime.now()))
-                    row = cur2.fetchone()
-                    if row:
-                        user_name = row[0]
-                    cur2.close()
-                    conn2.close()
-            except Exception:
-                pass
-            if not user_name:
-                user_name = request.headers.get('X-User-Name', '系统')
-            log_cur = conn.cursor()
-            log_cur.execute(
-                "INSERT INTO operation_logs (operation_time, user_name, operation) VALUES (NOW(), %s, %s)",
-                (user_name, f"创建用户: {name}({email})")
-            )
-            conn.commit()
-            log_cur.close()
-        except Exception:
-            conn.rollback()
+        # 操作日志（异步批量写入，不影响主流程）
+        audit_log.record(get_operator_name(), f"创建用户: {name}({email})")
         cursor.execute("""
             SELECT e.id, e.name, e.email, e.role_id, r.role_name, e.status, e.last_login,
                    e.department_id, d.dept_name as department
@@ -842,15 +1101,10 @@ def create_user():
     except Error as e:
         return jsonify({'message': str(e)}), 500
     finally:
-        global active_connections
         if cursor:
             cursor.close()
-            print(f"[DB_CONN] Cursor closed")
         if conn:
-            print(f"[DB_CONN] Closing connection ID: {conn.connection_id}")
             conn.close()
-            active_connections -= 1
-            print(f"[DB_CONN] Connection closed, active: {active_connections}")
 
 @app.route('/api/users/<int:user_id>', methods=['PUT'])
 def update_user(user_id):
@@ -889,40 +1143,12 @@ def update_user(user_id):
             (name, email, role_id, department_id, user_id)
         )
         conn.commit()
+        invalidate_sessions(employee_id=user_id)
+        refdata.bump('project_managers')
+        employee_search.invalidate()
 
-        # 操作日志（不影响主流程）
-        try:
-            user_name = None
-            try:
-                conn2 = get_db_connection()
-                if conn2:  # 检查连接是否成功
-                    cur2 = conn2.cursor()
-                session_id = request.cookies.get('pms_session_id')
-                if session_id:
-                    cur2.execute("""
-                        SELECT e.name
-                        FROM user_sessions s
-                        JOIN employees e ON e.id = s.employee_id
-                        WHERE s.session_token = %s AND s.expires_at > %s
-                    """, (session_id, datetime.now()))
-                    row = cur2.fetchone()
-                    if row:
-                        user_name = row[0]
-                    cur2.close()
-                    conn2.close()
-            except Exception:
-                pass
-            if not user_name:
-                user_name = request.headers.get('X-User-Name', '系统')
-            log_cur = conn.cursor()
-            log_cur.execute(
-                "INSERT INTO operation_logs (operation_time, user_name, operation) VALUES (NOW(), %s, %s)",
-                (user_name, f"更新用户: {name}({email})")
-            )
-            conn.commit()
-            log_cur.close()
-        except Exception:
-            conn.rollback()
+        # 操作日志（异步批量写入，不影响主流程）
+        audit_log.record(get_operator_name(), f"更新用户: {name}({email})")
         # 返回更新后的用户信息
         cursor.execute("""
             SELECT e.id, e.name, e.email, e.role_id, r.role_name, e.status, e.last_login,
@@ -935,20 +1161,15 @@ def update_user(user_id):
         user = cursor.fetchone()
         return jsonify({'message': '更新成功', 'user': user}), 200
     except Error as e:
-        print(f"[UPDATE_USER] Database error: {e}")
+        logger.error('更新用户失败: %s', e)
         if conn:
             conn.rollback()
         return jsonify({'message': f'数据库错误: {str(e)}'}), 500
     finally:
-        global active_connections
         if cursor:
             cursor.close()
-            print(f"[DB_CONN] Cursor closed")
         if conn:
-            print(f"[DB_CONN] Closing connection ID: {conn.connection_id}")
             conn.close()
-            active_connections -= 1
-            print(f"[DB_CONN] Connection closed, active: {active_connections}")
 
 @app.route('/api/users/<int:user_id>', methods=['DELETE'])
 def delete_user(user_id):
@@ -968,76 +1189,56 @@ def delete_user(user_id):
         # 删除用户
         cursor.execute("DELETE FROM employees WHERE id = %s", (user_id,))
         conn.commit()
+        invalidate_sessions(employee_id=user_id)
+        refdata.bump('project_managers')
+        employee_search.invalidate()
         
-        # 操作日志（不影响主流程）
-        try:
-            operator_name = None
-            try:
-                conn2 = get_db_connection()
-                if conn2:  # 检查连接是否成功
-                    cur2 = conn2.cursor()
-                session_id = request.cookies.get('pms_session_id')
-                if session_id:
-                    cur2.execute("""
-                        SELECT e.name
-                        FROM user_sessions s
-                        JOIN employees e ON e.id = s.employee_id
-                        WHERE s.session_token = %s AND s.expires_at > %s
-                    """, (session_id, datetime.now()))
-                    row = cur2.fetchone()
-                    if row:
-                        operator_name = row[0]
-                    cur2.close()
-                    conn2.close()
-            except Exception:
-                pass
-            if not operator_name:
-                operator_name = request.headers.get('X-User-Name', '系统')
-            log_cur = conn.cursor()
-            log_cur.execute(
-                "INSERT INTO operation_logs (operation_time, user_name, operation) VALUES (NOW(), %s, %s)",
-                (operator_name, f"删除用户: {deleted_user_name}({deleted_user_email})")
-            )
-            conn.commit()
-            log_cur.close()
-        except Exception:
-            conn.rollback()
+        # 操作日志（异步批量写入，不影响主流程）
+        audit_log.record(get_operator_name(), f"删除用户: {deleted_user_name}({deleted_user_email})")
         
         return jsonify({'message': '删除成功'}), 200
     except Error as e:
         conn.rollback()
         return jsonify({'message': str(e)}), 500
     finally:
-        global active_connections
         if cursor:
             cursor.close()
-            print(f"[DB_CONN] Cursor closed")
         if conn:
-            print(f"[DB_CONN] Closing connection ID: {conn.connection_id}")
             conn.close()
-            active_connections -= 1
-            print(f"[DB_CONN] Connection closed, active: {active_connections}")
 
 @app.route('/api/projects', methods=['GET'])
 def get_projects():
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    try:
+    """获取项目列表（参考数据缓存）"""
+    def compute(cursor):
         cursor.execute("SELECT id, project_code, project_name, status, project_type FROM projects WHERE project_code <> 'P000000000000' ORDER BY project_code")
-        projects = cursor.fetchall()
-        return jsonify(projects)
+        return cursor.fetchall()
+    try:
+        return refdata_response('projects', compute)
     except Error as e:
         return jsonify({'message': str(e)}), 500
-    finally:
-        global active_connections
-        if cursor:
+
+def allocate_project_seq(year_suffix):
+    """分配项目年度序列号
+    在独立连接上对 project_code_sequences 的计数行原子递增并立即提交，行锁只持有一条语句的时间，
+    并发创建项目互不等待、不会拿到重复序号；项目插入失败时该序号作废（允许出现空号）
+    """
+    conn = get_pool().acquire()
+    try:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                INSERT INTO project_code_sequences (year_suffix, last_seq)
+                VALUES (%s, LAST_INSERT_ID(1))
+                ON DUPLICATE KEY UPDATE last_seq = LAST_INSERT_ID(last_seq + 1)
+            """, (year_suffix,))
+            cursor.execute("SELECT LAST_INSERT_ID()")
+            seq = cursor.fetchone()[0]
+            conn.commit()
+            return seq
+        finally:
             cursor.close()
-            print(f"[DB_CONN] Cursor closed")
-        if conn:
-            print(f"[DB_CONN] Closing connection ID: {conn.connection_id}")
-            conn.close()
-            active_connections -= 1
-            print(f"[DB_CONN] Connection closed, active: {active_connections}")
+    finally:
+        conn.close()
 
 @app.route('/api/projects', methods=['POST'])
 def create_project():
@@ -1098,11 +1299,8 @@ def create_project():
                 conn.rollback()
                 return jsonify({'message': f'该业务单元({business_unit_code})、客户部门({client_or_dept_code})、项目大类({project_category})的年度项目已存在，请先删除之前的年度项目'}), 409
         else:
-            # 普通项目：当前年份的项目数量 + 1
-            cursor.execute("SELECT COUNT(*) as count FROM projects WHERE year_suffix = %s", (year_suffix,))
-            count_row = cursor.fetchone()
-            current_count = count_row['count']
-            annual_seq = f"{year_suffix}{str(current_count + 1).zfill(2)}"  # 格式：2501, 2502, 2503...
+            # 普通项目：从年度序列号表原子分配下一个序号
+            annual_seq = f"{year_suffix}{str(allocate_project_seq(year_suffix)).zfill(2)}"  # 格式：2501, 2502, 2503...
 
         # 生成 project_code: {bu}-{category}-{client}-{annual_seq}-{phase}
         project_code = f"{business_unit_code}-{project_category}-{client_or_dept_code}-{annual_seq}-{phase_type}"
@@ -1134,6 +1332,7 @@ def create_project():
             )
         )
         conn.commit()
+        refdata.bump('projects')
 
         new_id = cursor.lastrowid
         cursor.execute("""
@@ -1147,15 +1346,10 @@ def create_project():
     except Error as e:
         return jsonify({'message': str(e)}), 500
     finally:
-        global active_connections
         if cursor:
             cursor.close()
-            print(f"[DB_CONN] Cursor closed")
         if conn:
-            print(f"[DB_CONN] Closing connection ID: {conn.connection_id}")
             conn.close()
-            active_connections -= 1
-            print(f"[DB_CONN] Connection closed, active: {active_connections}")
 
 @app.route('/api/projects/<int:project_id>', methods=['PUT'])
 def update_project(project_id):
@@ -1209,6 +1403,7 @@ def update_project(project_id):
              business_unit_code, client_or_dept_code, phase_type, project_id)
         )
         conn.commit()
+        refdata.bump('projects')
 
         cursor.execute("""
             SELECT id, project_code, project_name, status, project_type, project_manager_id, project_category,
@@ -1222,15 +1417,10 @@ def update_project(project_id):
         conn.rollback()
         return jsonify({'message': str(e)}), 500
     finally:
-        global active_connections
         if cursor:
             cursor.close()
-            print(f"[DB_CONN] Cursor closed")
         if conn:
-            print(f"[DB_CONN] Closing connection ID: {conn.connection_id}")
             conn.close()
-            active_connections -= 1
-            print(f"[DB_CONN] Connection closed, active: {active_connections}")
 
 @app.route('/api/projects/<int:project_id>', methods=['DELETE'])
 def delete_project(project_id):
@@ -1251,21 +1441,17 @@ def delete_project(project_id):
 
         cursor.execute("DELETE FROM projects WHERE id = %s", (project_id,))
         conn.commit()
+        refdata.bump('projects')
         
         return jsonify({'message': '删除成功'}), 200
     except Error as e:
         conn.rollback()
         return jsonify({'message': str(e)}), 500
     finally:
-        global active_connections
         if cursor:
             cursor.close()
-            print(f"[DB_CONN] Cursor closed")
         if conn:
-            print(f"[DB_CONN] Closing connection ID: {conn.connection_id}")
             conn.close()
-            active_connections -= 1
-            print(f"[DB_CONN] Connection closed, active: {active_connections}")
 
 @app.route('/api/projects/detailed', methods=['GET'])
 def get_projects_detailed():
@@ -1283,7 +1469,7 @@ def get_projects_detailed():
         
         # 先查询总数
         count_query = """
-            SELECT COUNT(DISTINCT p.id) as total
+            SELECT COUNT(*) as total
             FROM projects p
             WHERE p.project_code <> 'P000000000000'
         """
@@ -1293,7 +1479,7 @@ def get_projects_detailed():
         # 计算总页数
         total_pages = (total_count + limit - 1) // limit if total_count > 0 else 1
         
-        # 联表查询项目经理姓名与预算人天总和（带分页）
+        # 联表查询项目经理姓名（带分页），预算人天总和读取项目上维护的汇总字段
         query = """
             SELECT
                 p.id,
@@ -1309,15 +1495,13 @@ def get_projects_detailed():
                 p.year_suffix,
                 p.annual_seq,
                 e.name AS project_manager_name,
-                COALESCE(SUM(pm.budget_days), 0) AS total_budget_days
+                p.total_budget_days,
+                p.member_count
             FROM 
                 projects p
             LEFT JOIN employees e ON e.id = p.project_manager_id
-            LEFT JOIN project_members pm ON pm.project_id = p.id
             WHERE
                 p.project_code <> 'P000000000000'
-            GROUP BY
-                p.id, p.project_code, p.project_name, p.status, p.project_type, p.project_manager_id, p.project_category, p.business_unit_code, p.client_or_dept_code, p.phase_type, p.year_suffix, p.annual_seq, e.name
             ORDER BY 
                 p.project_code
             LIMIT %s OFFSET %s
@@ -1334,7 +1518,7 @@ def get_projects_detailed():
         })
 
     except Error as e:
-        print(f"Database error in get_projects_detailed: {e}")
+        logger.error('查询项目详情失败: %s', e)
         return jsonify({'message': f'An error occurred: {e}'}), 500
     finally:
         if conn.is_connected():
@@ -1356,20 +1540,156 @@ def submit_report():
         query = """INSERT INTO work_reports (employee_id, project_id, task_description, hours_spent, report_date, status)
                  VALUES (%s, %s, %s, %s, %s, %s)"""
         cursor.execute(query, (employee_id, data['project_id'], data['task_description'], data['hours_spent'], data['report_date'], 0))
+        rollup.reports_added(cursor, [(data['report_date'], employee_id, data['project_id'], 0, data['hours_spent'])])
         conn.commit()
+        invalidate_report_stats()
         return jsonify({'message': 'Report created successfully'}), 201
     except Error as e:
         return jsonify({'message': str(e)}), 500
     finally:
-        global active_connections
         if cursor:
             cursor.close()
-            print(f"[DB_CONN] Cursor closed")
         if conn:
-            print(f"[DB_CONN] Closing connection ID: {conn.connection_id}")
             conn.close()
-            active_connections -= 1
-            print(f"[DB_CONN] Connection closed, active: {active_connections}")
+
+# 批量报工单次最多行数
+MAX_BATCH_REPORTS = 200
+
+def validate_report_row(row):
+    """校验单行报工数据，返回 (规范化后的行, 错误列表)"""
+    errors = []
+    if not isinstance(row, dict):
+        return None, ['行数据必须是对象']
+    try:
+        project_id = int(row.get('project_id'))
+    except (TypeError, ValueError):
+        project_id = None
+        errors.append('project_id 无效')
+    task_description = str(row.get('task_description') or '').strip()
+    if not task_description:
+        errors.append('task_description 不能为空')
+    try:
+        hours_spent = float(row.get('hours_spent'))
+        if not 0 < hours_spent <= 24:
+            errors.append('hours_spent 必须在 0-24 之间')
+    except (TypeError, ValueError):
+        hours_spent = None
+        errors.append('hours_spent 无效')
+    try:
+        report_date = datetime.strptime(str(row.get('report_date')), '%Y-%m-%d').date()
+    except ValueError:
+        report_date = None
+        errors.append('report_date 格式应为 YYYY-MM-DD')
+    return (project_id, task_description, hours_spent, report_date), errors
+
+@app.route('/api/reports/batch', methods=['POST'])
+def submit_reports_batch():
+    """批量提交报工：整体校验，一个事务内 executemany 写入
+    请求体: {"reports": [{project_id, task_description, hours_spent, report_date}, ...], "idempotency_key": "..."}
+    幂等键也可通过 Idempotency-Key 请求头传入，同一用户重复提交同一幂等键时直接返回首次的结果
+    """
+    data = request.get_json(silent=True) or {}
+    rows = data.get('reports')
+    idempotency_key = (request.headers.get('Idempotency-Key') or data.get('idempotency_key') or '').strip()
+
+    if not isinstance(rows, list) or not rows:
+        return jsonify({'message': '缺少必要字段：reports'}), 400
+    if len(rows) > MAX_BATCH_REPORTS:
+        return jsonify({'message': f'单次最多提交 {MAX_BATCH_REPORTS} 条报工'}), 400
+    if len(idempotency_key) > 64:
+        return jsonify({'message': 'idempotency_key 长度不能超过64'}), 400
+
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        employee_id = get_current_employee_id(cursor)
+        if not employee_id:
+            return jsonify({'message': '未登录或会话失效'}), 401
+
+        # 逐行校验
+        values = []
+        results = []
+        for index, row in enumerate(rows):
+            normalized, errors = validate_report_row(row)
+            values.append(normalized)
+            results.append({'index': index, 'status': 'invalid' if errors else 'created', 'errors': errors})
+
+        # 整体校验：项目存在性（一次查询）、同一天工时合计
+        project_ids = sorted({v[0] for v in values if v and v[0] is not None})
+        existing_projects = set()
+        if project_ids:
+            placeholders = ', '.join(['%s'] * len(project_ids))
+            cursor.execute(f"SELECT id FROM projects WHERE id IN ({placeholders})", project_ids)
+            existing_projects = {r['id'] for r in cursor.fetchall()}
+        daily_hours = {}
+        for value in values:
+            if value and value[2] is not None and value[3] is not None:
+                daily_hours[value[3]] = daily_hours.get(value[3], 0) + value[2]
+        for value, result in zip(values, results):
+            if value[0] is not None and value[0] not in existing_projects:
+                result['errors'].append('项目不存在')
+            if value[3] is not None and daily_hours.get(value[3], 0) > 24:
+                result['errors'].append(f'{value[3].isoformat()} 的工时合计超过24小时')
+            if result['errors']:
+                result['status'] = 'invalid'
+
+        invalid_count = sum(1 for r in results if r['status'] == 'invalid')
+        if invalid_count:
+            return jsonify({'message': f'{invalid_count} 条报工校验失败，未提交任何记录', 'results': results}), 400
+
+        # 以下写入在同一个事务中（连接未开启autocommit），最后一次提交
+        if idempotency_key:
+            # 先占用幂等键：并发的重复请求会在唯一键上等待本事务结束，然后走重放分支
+            try:
+                cursor.execute(
+                    "INSERT INTO report_batch_requests (employee_id, idempotency_key) VALUES (%s, %s)",
+                    (employee_id, idempotency_key)
+                )
+            except Error as e:
+                if e.errno != 1062:
+                    raise
+                conn.rollback()
+                cursor.execute(
+                    "SELECT response_json FROM report_batch_requests WHERE employee_id = %s AND idempotency_key = %s",
+                    (employee_id, idempotency_key)
+                )
+                stored = cursor.fetchone()
+                payload = stored['response_json'] if stored else None
+                if isinstance(payload, (str, bytes, bytearray)):
+                    payload = json.loads(payload)
+                response = make_response(jsonify(payload), 200)
+                response.headers['Idempotent-Replayed'] = 'true'
+                return response
+
+        cursor.executemany(
+            """INSERT INTO work_reports (employee_id, project_id, task_description, hours_spent, report_date, status)
+               VALUES (%s, %s, %s, %s, %s, %s)""",
+            [(employee_id, v[0], v[1], v[2], v[3], 0) for v in values]
+        )
+        rollup.reports_added(cursor, [(v[3], employee_id, v[0], 0, v[2]) for v in values])
+        for result in results:
+            del result['errors']
+        payload = {
+            'message': f'成功提交 {len(results)} 条报工',
+            'created': len(results),
+            'results': results
+        }
+        if idempotency_key:
+            cursor.execute(
+                "UPDATE report_batch_requests SET response_json = %s WHERE employee_id = %s AND idempotency_key = %s",
+                (json.dumps(payload, ensure_ascii=False), employee_id, idempotency_key)
+            )
+        conn.commit()
+        invalidate_report_stats()
+        return jsonify(payload), 201
+    except Error as e:
+        conn.rollback()
+        return jsonify({'message': str(e)}), 500
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
 
 @app.route('/api/reports', methods=['GET'])
 def get_reports():
@@ -1438,15 +1758,10 @@ def get_reports():
     except Error as e:
         return jsonify({'message': str(e)}), 500
     finally:
-        global active_connections
         if cursor:
             cursor.close()
-            print(f"[DB_CONN] Cursor closed")
         if conn:
-            print(f"[DB_CONN] Closing connection ID: {conn.connection_id}")
             conn.close()
-            active_connections -= 1
-            print(f"[DB_CONN] Connection closed, active: {active_connections}")
 
 @app.route('/api/reports/<date>', methods=['GET'])
 def get_reports_by_date(date):
@@ -1482,15 +1797,10 @@ def get_reports_by_date(date):
     except Error as e:
         return jsonify({'message': str(e)}), 500
     finally:
-        global active_connections
         if cursor:
             cursor.close()
-            print(f"[DB_CONN] Cursor closed")
         if conn:
-            print(f"[DB_CONN] Closing connection ID: {conn.connection_id}")
             conn.close()
-            active_connections -= 1
-            print(f"[DB_CONN] Connection closed, active: {active_connections}")
 
 @app.route('/api/projects/<int:project_id>/members', methods=['GET'])
 def list_project_members(project_id):
@@ -1527,15 +1837,10 @@ def list_project_members(project_id):
     except Error as e:
         return jsonify({'message': str(e)}), 500
     finally:
-        global active_connections
         if cursor:
             cursor.close()
-            print(f"[DB_CONN] Cursor closed")
         if conn:
-            print(f"[DB_CONN] Closing connection ID: {conn.connection_id}")
             conn.close()
-            active_connections -= 1
-            print(f"[DB_CONN] Connection closed, active: {active_connections}")
 
 @app.route('/api/projects/<int:project_id>/members', methods=['POST'])
 def add_project_member(project_id):
@@ -1550,10 +1855,12 @@ def add_project_member(project_id):
         role_name = data.get('role_name')  # 改为接收角色名称
         start_date = data.get('start_date')
         end_date = data.get('end_date')
-        budget_days = data.get('budget_days')
-
         if not employee_id:
             return jsonify({'message': '缺少必要字段: employee_id'}), 400
+        try:
+            budget_days = project_totals.parse_budget_days(data.get('budget_days'))
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
 
         # 将角色名称转换为角色ID（如果提供了角色名称）
         if role_name:
@@ -1585,9 +1892,10 @@ def add_project_member(project_id):
             """,
             (project_id, employee_id, role_name, start_date, end_date, budget_days)
         )
+        new_id = cursor.lastrowid
+        project_totals.member_added(cursor, project_id, budget_days)
         conn.commit()
 
-        new_id = cursor.lastrowid
         cursor.execute(
             """
             SELECT pm.id,
@@ -1613,15 +1921,10 @@ def add_project_member(project_id):
         conn.rollback()
         return jsonify({'message': str(e)}), 500
     finally:
-        global active_connections
         if cursor:
             cursor.close()
-            print(f"[DB_CONN] Cursor closed")
         if conn:
-            print(f"[DB_CONN] Closing connection ID: {conn.connection_id}")
             conn.close()
-            active_connections -= 1
-            print(f"[DB_CONN] Connection closed, active: {active_connections}")
 
 @app.route('/api/projects/<int:project_id>/members/<int:member_id>', methods=['PUT'])
 def update_project_member(project_id, member_id):
@@ -1651,6 +1954,12 @@ def update_project_member(project_id, member_id):
                     'message': f'该成员"{existing["employee_name"]}"已在项目中，不能重复添加'
                 }), 400
         
+        if 'budget_days' in data:
+            try:
+                data['budget_days'] = project_totals.parse_budget_days(data['budget_days'])
+            except ValueError as e:
+                return jsonify({'message': str(e)}), 400
+
         fields = []
         params = []
         for col in ['employee_id', 'role_name', 'start_date', 'end_date', 'budget_days']:
@@ -1660,7 +1969,22 @@ def update_project_member(project_id, member_id):
         if not fields:
             return jsonify({'message': '无可更新字段'}), 400
         params.extend([member_id, project_id])
+        old_member = None
+        if 'budget_days' in data:
+            cursor.execute(
+                "SELECT budget_days FROM project_members WHERE id = %s AND project_id = %s FOR UPDATE",
+                (member_id, project_id)
+            )
+            old_member = cursor.fetchone()
         cursor.execute(f"UPDATE project_members SET {', '.join(fields)} WHERE id = %s AND project_id = %s", tuple(params))
+        if old_member:
+            # 以数据库实际存储的值计算增量，避免与 SUM(project_members.budget_days) 产生偏差
+            cursor.execute(
+                "SELECT budget_days FROM project_members WHERE id = %s AND project_id = %s",
+                (member_id, project_id)
+            )
+            new_member = cursor.fetchone()
+            project_totals.member_budget_changed(cursor, project_id, old_member['budget_days'], new_member['budget_days'])
         conn.commit()
 
         cursor.execute(
@@ -1688,15 +2012,10 @@ def update_project_member(project_id, member_id):
         conn.rollback()
         return jsonify({'message': str(e)}), 500
     finally:
-        global active_connections
         if cursor:
             cursor.close()
-            print(f"[DB_CONN] Cursor closed")
         if conn:
-            print(f"[DB_CONN] Closing connection ID: {conn.connection_id}")
             conn.close()
-            active_connections -= 1
-            print(f"[DB_CONN] Connection closed, active: {active_connections}")
 
 @app.route('/api/projects/<int:project_id>/members/<int:member_id>', methods=['DELETE'])
 def delete_project_member(project_id, member_id):
@@ -1706,22 +2025,24 @@ def delete_project_member(project_id, member_id):
         return jsonify({'message': 'Database connection failed.'}), 500
     cursor = conn.cursor()
     try:
+        cursor.execute(
+            "SELECT budget_days FROM project_members WHERE id = %s AND project_id = %s FOR UPDATE",
+            (member_id, project_id)
+        )
+        member = cursor.fetchone()
         cursor.execute("DELETE FROM project_members WHERE id = %s AND project_id = %s", (member_id, project_id))
+        if member:
+            project_totals.member_removed(cursor, project_id, member[0])
         conn.commit()
         return jsonify({'message': '删除成功'}), 200
     except Error as e:
         conn.rollback()
         return jsonify({'message': str(e)}), 500
     finally:
-        global active_connections
         if cursor:
             cursor.close()
-            print(f"[DB_CONN] Cursor closed")
         if conn:
-            print(f"[DB_CONN] Closing connection ID: {conn.connection_id}")
             conn.close()
-            active_connections -= 1
-            print(f"[DB_CONN] Connection closed, active: {active_connections}")
 @app.route('/api/stats/<year>/<month>', methods=['GET'])
 def get_monthly_stats(year, month):
     """获取指定年月的统计信息"""
@@ -1747,13 +2068,13 @@ def get_monthly_stats(year, month):
         if not employee_id:
             return jsonify({'message': '未登录或会话失效'}), 401
         
-        # 获取本月工时统计
+        # 获取本月工时统计（读日汇总表）
         cursor.execute("""
             SELECT 
-                COALESCE(SUM(hours_spent), 0) as total_hours,
+                COALESCE(SUM(total_hours), 0) as total_hours,
                 COALESCE(COUNT(DISTINCT project_id), 0) as project_count,
-                COALESCE(COUNT(DISTINCT DATE(report_date)), 0) as working_days
-            FROM work_reports 
+                COALESCE(COUNT(DISTINCT report_date), 0) as working_days
+            FROM work_report_daily_rollup 
             WHERE report_date >= %s AND report_date <= %s AND employee_id = %s
         """, (start_date, end_date, employee_id))
         
@@ -1771,7 +2092,7 @@ def get_monthly_stats(year, month):
         else:
             # 如果 workdays 表中没有数据，使用默认值22
             working_days_in_month = 22
-            print(f"警告: workdays 表中未找到 {year}-{month_int} 的数据，使用默认值22")
+            logger.warning('workdays 表中未找到 %s-%s 的数据，使用默认值22', year, month_int)
         
         # 计算填报率（实际填报工作日数 / 本月工作日数）
         fill_rate = round((stats['working_days'] / working_days_in_month) * 100, 1) if working_days_in_month > 0 else 0
@@ -1792,15 +2113,10 @@ def get_monthly_stats(year, month):
     except Error as e:
         return jsonify({'message': str(e)}), 500
     finally:
-        global active_connections
         if cursor:
             cursor.close()
-            print(f"[DB_CONN] Cursor closed")
         if conn:
-            print(f"[DB_CONN] Closing connection ID: {conn.connection_id}")
             conn.close()
-            active_connections -= 1
-            print(f"[DB_CONN] Connection closed, active: {active_connections}")
 
 @app.route('/api/reports/pending', methods=['GET'])
 def get_pending_reports():
@@ -1875,59 +2191,181 @@ def get_pending_reports():
     except Error as e:
         return jsonify({'message': str(e)}), 500
     finally:
-        global active_connections
         if cursor:
             cursor.close()
-            print(f"[DB_CONN] Cursor closed")
         if conn:
-            print(f"[DB_CONN] Closing connection ID: {conn.connection_id}")
             conn.close()
-            active_connections -= 1
-            print(f"[DB_CONN] Connection closed, active: {active_connections}")
 
-@app.route('/api/reports/<int:report_id>/approve', methods=['POST'])
-def approve_report(report_id):
-    """审核通过报工记录"""
+def update_report_status(cursor, reports, new_status):
+    """更新报工状态并同步日汇总表，调用方负责提交事务
+    reports 为已加锁（FOR UPDATE）读取的记录，需包含 id, report_date, employee_id, project_id, status, hours_spent
+    """
+    if not reports:
+        return 0
+    placeholders = ', '.join(['%s'] * len(reports))
+    cursor.execute(
+        f"UPDATE work_reports SET status = %s WHERE id IN ({placeholders})",
+        [new_status] + [r['id'] for r in reports]
+    )
+    updated = cursor.rowcount
+    rollup.reports_status_changed(cursor, [
+        (r['report_date'], r['employee_id'], r['project_id'], r['status'], r['hours_spent']) for r in reports
+    ], new_status)
+    return updated
+
+def set_single_report_status(report_id, new_status, message):
+    """单条审核：锁定记录、更新状态并同步汇总表"""
     conn = get_db_connection()
-    cursor = conn.cursor()
+    cursor = conn.cursor(dictionary=True)
     try:
-        cursor.execute("UPDATE work_reports SET status = 1 WHERE id = %s", (report_id,))
+        cursor.execute("""
+            SELECT id, report_date, employee_id, project_id, status, hours_spent
+            FROM work_reports
+            WHERE id = %s
+            FOR UPDATE
+        """, (report_id,))
+        update_report_status(cursor, cursor.fetchall(), new_status)
         conn.commit()
-        return jsonify({'message': 'Report approved successfully'}), 200
+        invalidate_report_stats()
+        return jsonify({'message': message}), 200
     except Error as e:
+        conn.rollback()
         return jsonify({'message': str(e)}), 500
     finally:
-        global active_connections
         if cursor:
             cursor.close()
-            print(f"[DB_CONN] Cursor closed")
         if conn:
-            print(f"[DB_CONN] Closing connection ID: {conn.connection_id}")
             conn.close()
-            active_connections -= 1
-            print(f"[DB_CONN] Connection closed, active: {active_connections}")
+
+@app.route('/api/reports/<int:report_id>/approve', methods=['POST'])
+def approve_report(report_id):
+    """审核通过报工记录"""
+    return set_single_report_status(report_id, 1, 'Report approved successfully')
 
 @app.route('/api/reports/<int:report_id>/reject', methods=['POST'])
 def reject_report(report_id):
     """审核驳回报工记录"""
+    return set_single_report_status(report_id, 3, 'Report rejected successfully')
+
+# 可审核的报工状态：0 待审核，2 被驳回后重新提交
+REVIEWABLE_STATUSES = (0, 2)
+# 单次批量审核最多条数
+MAX_BATCH_REVIEW = 1000
+
+def review_reports_batch(new_status):
+    """批量审核：按报工ID列表或筛选条件选出记录，校验当前用户是否为项目经理，一条UPDATE、一次提交
+    请求体: {"report_ids": [1, 2, ...]} 或 {"filter": {"project_id": 1, "week": "2025-08-04"}}
+    week 为该周内任意一天（按周一至周日计算），也可用 start_date/end_date 指定日期范围
+    """
+    data = request.get_json(silent=True) or {}
+    report_ids = data.get('report_ids')
+    filters = data.get('filter')
+
+    if report_ids is None and not isinstance(filters, dict):
+        return jsonify({'message': '缺少必要字段：report_ids 或 filter'}), 400
+
     conn = get_db_connection()
-    cursor = conn.cursor()
+    cursor = conn.cursor(dictionary=True)
     try:
-        cursor.execute("UPDATE work_reports SET status = 3 WHERE id = %s", (report_id,))
+        employee_id = get_current_employee_id(cursor)
+        if not employee_id:
+            return jsonify({'message': '未登录或会话失效'}), 401
+
+        if report_ids is not None:
+            if not isinstance(report_ids, list) or not report_ids:
+                return jsonify({'message': 'report_ids 必须是非空数组'}), 400
+            try:
+                report_ids = sorted({int(i) for i in report_ids})
+            except (TypeError, ValueError):
+                return jsonify({'message': 'report_ids 包含无效ID'}), 400
+            if len(report_ids) > MAX_BATCH_REVIEW:
+                return jsonify({'message': f'单次最多审核 {MAX_BATCH_REVIEW} 条报工'}), 400
+            placeholders = ', '.join(['%s'] * len(report_ids))
+            where_clause = f"wr.id IN ({placeholders})"
+            params = list(report_ids)
+        else:
+            try:
+                project_id = int(filters.get('project_id'))
+            except (TypeError, ValueError):
+                return jsonify({'message': 'filter.project_id 无效'}), 400
+            cursor.execute("SELECT project_manager_id FROM projects WHERE id = %s", (project_id,))
+            project = cursor.fetchone()
+            if not project:
+                return jsonify({'message': '项目不存在'}), 404
+            if project['project_manager_id'] != employee_id:
+                return jsonify({'message': '只有项目经理可以审核该项目的报工'}), 403
+            where_conditions = ["wr.project_id = %s", "wr.status IN (0, 2)"]
+            params = [project_id]
+            try:
+                if filters.get('week'):
+                    day = datetime.strptime(filters['week'], '%Y-%m-%d').date()
+                    week_start = day - timedelta(days=day.weekday())
+                    where_conditions.append("wr.report_date BETWEEN %s AND %s")
+                    params.extend([week_start, week_start + timedelta(days=6)])
+                elif filters.get('start_date') and filters.get('end_date'):
+                    where_conditions.append("wr.report_date BETWEEN %s AND %s")
+                    params.extend([datetime.strptime(filters['start_date'], '%Y-%m-%d').date(),
+                                   datetime.strptime(filters['end_date'], '%Y-%m-%d').date()])
+            except (TypeError, ValueError):
+                return jsonify({'message': '日期格式应为 YYYY-MM-DD'}), 400
+            where_clause = " AND ".join(where_conditions)
+
+        # 锁定目标记录，按结果分类
+        cursor.execute(f"""
+            SELECT wr.id, wr.report_date, wr.employee_id, wr.project_id, wr.status, wr.hours_spent,
+                   p.project_manager_id
+            FROM work_reports wr
+            JOIN projects p ON wr.project_id = p.id
+            WHERE {where_clause}
+            LIMIT {MAX_BATCH_REVIEW + 1}
+            FOR UPDATE
+        """, params)
+        rows = cursor.fetchall()
+        if report_ids is None and len(rows) > MAX_BATCH_REVIEW:
+            conn.rollback()
+            return jsonify({'message': f'匹配的报工超过 {MAX_BATCH_REVIEW} 条，请缩小筛选范围'}), 400
+
+        counts = {'updated': 0, 'not_found': 0, 'forbidden': 0, 'skipped': 0}
+        found_ids = {row['id'] for row in rows}
+        if report_ids is not None:
+            counts['not_found'] = len([i for i in report_ids if i not in found_ids])
+        targets = []
+        for row in rows:
+            if row['project_manager_id'] != employee_id:
+                counts['forbidden'] += 1
+            elif row['status'] not in REVIEWABLE_STATUSES:
+                counts['skipped'] += 1
+            else:
+                targets.append(row)
+
+        counts['updated'] = update_report_status(cursor, targets, new_status)
         conn.commit()
-        return jsonify({'message': 'Report rejected successfully'}), 200
+        invalidate_report_stats()
+        target_ids = [row['id'] for row in targets]
+
+        return jsonify({
+            'message': f"已处理 {counts['updated']} 条报工",
+            'counts': counts,
+            'updated_ids': target_ids
+        }), 200
     except Error as e:
+        conn.rollback()
         return jsonify({'message': str(e)}), 500
     finally:
-        global active_connections
         if cursor:
             cursor.close()
-            print(f"[DB_CONN] Cursor closed")
         if conn:
-            print(f"[DB_CONN] Closing connection ID: {conn.connection_id}")
             conn.close()
-            active_connections -= 1
-            print(f"[DB_CONN] Connection closed, active: {active_connections}")
+
+@app.route('/api/reports/batch-approve', methods=['POST'])
+def approve_reports_batch():
+    """批量审核通过报工记录"""
+    return review_reports_batch(1)
+
+@app.route('/api/reports/batch-reject', methods=['POST'])
+def reject_reports_batch():
+    """批量审核驳回报工记录"""
+    return review_reports_batch(3)
 
 @app.route('/api/reports/<int:report_id>', methods=['DELETE'])
 def delete_report(report_id):
@@ -1936,7 +2374,12 @@ def delete_report(report_id):
     cursor = conn.cursor(dictionary=True)
     try:
         # 首先检查报工记录是否存在以及状态
-        cursor.execute("SELECT id, status FROM work_reports WHERE id = %s", (report_id,))
+        cursor.execute("""
+            SELECT id, report_date, employee_id, project_id, status, hours_spent
+            FROM work_reports
+            WHERE id = %s
+            FOR UPDATE
+        """, (report_id,))
         report = cursor.fetchone()
         
         if not report:
@@ -1948,9 +2391,14 @@ def delete_report(report_id):
         
         # 删除报工记录
         cursor.execute("DELETE FROM work_reports WHERE id = %s", (report_id,))
+        deleted = cursor.rowcount
+        if deleted:
+            rollup.reports_removed(cursor, [(report['report_date'], report['employee_id'], report['project_id'],
+                                             report['status'], report['hours_spent'])])
         conn.commit()
+        invalidate_report_stats()
         
-        if cursor.rowcount > 0:
+        if deleted > 0:
             return jsonify({'message': 'Report deleted successfully'}), 200
         else:
             return jsonify({'message': 'Report not found or already deleted'}), 404
@@ -1958,97 +2406,131 @@ def delete_report(report_id):
     except Error as e:
         return jsonify({'message': str(e)}), 500
     finally:
-        global active_connections
         if cursor:
             cursor.close()
-            print(f"[DB_CONN] Cursor closed")
         if conn:
-            print(f"[DB_CONN] Closing connection ID: {conn.connection_id}")
             conn.close()
-            active_connections -= 1
-            print(f"[DB_CONN] Connection closed, active: {active_connections}")
 
-@app.route('/api/reports/analysis', methods=['GET'])
-def get_reports_analysis():
-    """获取报工分析数据，支持多种筛选条件"""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
-    try:
-        # 获取查询参数
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 10))
-        time_range = request.args.get('time_range', 'current_month')
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
-        project_id = request.args.get('project_id')
-        employee_id = request.args.get('employee_id')
-        
-        # 构建WHERE条件
-        where_conditions = []
-        params = []
-        
-        if time_range == 'custom' and start_date and end_date:
-            where_conditions.append("wr.report_date BETWEEN %s AND %s")
-            params.extend([start_date, end_date])
-        elif time_range == 'current_month':
-            # 默认查询8月数据，因为当前数据都在8月
-            start_date = "2025-08-01"
-            end_date = "2025-08-31"
-            where_conditions.append("wr.report_date BETWEEN %s AND %s")
-            params.extend([start_date, end_date])
-        elif time_range == 'last_month':
-            # 查询7月数据
-            start_date = "2025-07-01"
-            end_date = "2025-07-31"
-            where_conditions.append("wr.report_date BETWEEN %s AND %s")
-            params.extend([start_date, end_date])
-        elif time_range == 'last_3_months':
-            # 查询6-8月数据
-            start_date = "2025-06-01"
-            end_date = "2025-08-31"
-            where_conditions.append("wr.report_date BETWEEN %s AND %s")
-            params.extend([start_date, end_date])
-        elif time_range == 'last_6_months':
-            # 查询3-8月数据
-            start_date = "2025-03-01"
-            end_date = "2025-08-31"
-            where_conditions.append("wr.report_date BETWEEN %s AND %s")
-            params.extend([start_date, end_date])
-        elif time_range == 'current_year':
-            # 查询2025年全年数据
-            start_date = "2025-01-01"
-            end_date = "2025-12-31"
-            where_conditions.append("wr.report_date BETWEEN %s AND %s")
-            params.extend([start_date, end_date])
-        
-        if project_id:
-            where_conditions.append("wr.project_id = %s")
-            params.append(project_id)
-        
-        if employee_id:
-            where_conditions.append("wr.employee_id = %s")
-            params.append(employee_id)
-        
-        where_clause = " AND ".join(where_conditions) if where_conditions else "1=1"
-        
-        # 获取总记录数
-        count_query = f"""
-            SELECT COUNT(*) as total
-            FROM work_reports wr
-            JOIN employees e ON wr.employee_id = e.id
-            JOIN projects p ON wr.project_id = p.id
-            WHERE {where_clause}
-        """
-        cursor.execute(count_query, params)
-        total_count = cursor.fetchone()['total']
-        
-        # 计算分页
-        total_pages = (total_count + per_page - 1) // per_page
-        offset = (page - 1) * per_page
-        
-        # 获取分页数据
-        query = f"""
+# 无 workdays 数据时每月默认的工作日数
+DEFAULT_MONTH_WORKDAYS = 22
+
+def analysis_date_range(time_range, start_date=None, end_date=None):
+    """报工分析的筛选日期范围，返回 (start_date, end_date)，不限制时为 (None, None)"""
+    if time_range == 'custom' and start_date and end_date:
+        return start_date, end_date
+    # 当前数据集中在2025年，固定日期范围沿用原有口径
+    fixed_ranges = {
+        'current_month': ("2025-08-01", "2025-08-31"),
+        'last_month': ("2025-07-01", "2025-07-31"),
+        'last_3_months': ("2025-06-01", "2025-08-31"),
+        'last_6_months': ("2025-03-01", "2025-08-31"),
+        'current_year': ("2025-01-01", "2025-12-31"),
+    }
+    return fixed_ranges.get(time_range, (None, None))
+
+def months_between(start, end):
+    """[start, end] 覆盖的 (year, month) 列表，参数为 (year, month)"""
+    months = []
+    year, month = start
+    while (year, month) <= end:
+        months.append((year, month))
+        month += 1
+        if month > 12:
+            year, month = year + 1, 1
+    return months
+
+def workday_months(time_range, start_date=None, end_date=None, today=None):
+    """计算填报率分母所覆盖的月份（以当前日期为基准）"""
+    today = today or datetime.now().date()
+    current = (today.year, today.month)
+
+    def months_ago(n):
+        index = today.year * 12 + today.month - 1 - n
+        return (index // 12, index % 12 + 1)
+
+    if time_range == 'current_month':
+        return [current]
+    if time_range == 'last_month':
+        return [months_ago(1)]
+    if time_range == 'last_3_months':
+        return months_between(months_ago(2), current)
+    if time_range == 'last_6_months':
+        return months_between(months_ago(5), current)
+    if time_range == 'current_year':
+        return months_between((today.year, 1), current)
+    if time_range == 'custom' and start_date and end_date:
+        try:
+            start = datetime.strptime(start_date, '%Y-%m-%d')
+            end = datetime.strptime(end_date, '%Y-%m-%d')
+        except ValueError:
+            return []
+        return months_between((start.year, start.month), (end.year, end.month))
+    return []
+
+def sum_workdays(cursor, months):
+    """一次查询汇总多个月的工作日数，workdays 表缺失的月份按默认值计"""
+    if not months:
+        return DEFAULT_MONTH_WORKDAYS
+    conditions = " OR ".join(["(year = %s AND month = %s)"] * len(months))
+    params = [v for ym in months for v in ym]
+    cursor.execute(f"SELECT year, month, workdays FROM workdays WHERE {conditions}", params)
+    found = {(row['year'], row['month']): row['workdays'] for row in cursor.fetchall()}
+    return sum(found.get(ym, DEFAULT_MONTH_WORKDAYS) for ym in months)
+
+def compute_reports_analysis(cursor, args):
+    """报工分析：日汇总表一次聚合得到总数与KPI，一次分页查询，一次 workdays 查询
+    args 为请求参数（request.args 或同结构的字典），返回可直接序列化的结果（含各阶段耗时）
+    总数与分页以日汇总表为准，汇总表与 work_reports 的一致性用 python rollup.py check 核对
+    """
+    started = time.perf_counter()
+    timings = {}
+
+    page = max(1, int(args.get('page', 1)))
+    per_page = max(1, int(args.get('per_page', 10)))
+    time_range = args.get('time_range', 'current_month')
+    project_id = args.get('project_id')
+    employee_id = args.get('employee_id')
+    start_date, end_date = analysis_date_range(time_range, args.get('start_date'), args.get('end_date'))
+
+    # 构建WHERE条件（报工表与日汇总表列名一致，通过别名 wr 共用）
+    where_conditions = []
+    params = []
+    if start_date and end_date:
+        where_conditions.append("wr.report_date BETWEEN %s AND %s")
+        params.extend([start_date, end_date])
+    if project_id:
+        where_conditions.append("wr.project_id = %s")
+        params.append(project_id)
+    if employee_id:
+        where_conditions.append("wr.employee_id = %s")
+        params.append(employee_id)
+    where_clause = " AND ".join(where_conditions) if where_conditions else "1=1"
+
+    # 总记录数与KPI从日汇总表一次聚合
+    t0 = time.perf_counter()
+    cursor.execute(f"""
+        SELECT
+            COALESCE(SUM(wr.report_count), 0) as total,
+            COALESCE(SUM(wr.total_hours), 0) as total_hours,
+            COALESCE(SUM(wr.total_hours) / NULLIF(SUM(wr.report_count), 0), 0) as avg_hours_per_day,
+            COUNT(DISTINCT wr.employee_id) as employee_count,
+            COUNT(DISTINCT wr.project_id) as project_count,
+            COUNT(DISTINCT wr.report_date) as working_days
+        FROM work_report_daily_rollup wr
+        WHERE {where_clause}
+    """, params)
+    kpi_data = cursor.fetchone()
+    timings['aggregate_ms'] = round((time.perf_counter() - t0) * 1000, 2)
+
+    total_count = int(kpi_data['total'])
+    total_pages = (total_count + per_page - 1) // per_page
+    offset = (page - 1) * per_page
+
+    # 分页数据（超出范围时不查询）；汇总表不关联员工与项目，这里用 LEFT JOIN 保持同一口径
+    reports = []
+    t0 = time.perf_counter()
+    if offset < total_count:
+        cursor.execute(f"""
             SELECT
                 wr.id,
                 wr.report_date,
@@ -2059,129 +2541,69 @@ def get_reports_analysis():
                 wr.status,
                 wr.created_at
             FROM work_reports wr
-            JOIN employees e ON wr.employee_id = e.id
-            JOIN projects p ON wr.project_id = p.id
+            LEFT JOIN employees e ON wr.employee_id = e.id
+            LEFT JOIN projects p ON wr.project_id = p.id
             WHERE {where_clause}
             ORDER BY wr.report_date DESC
             LIMIT %s OFFSET %s
-        """
-        params.extend([per_page, offset])
-        cursor.execute(query, params)
+        """, params + [per_page, offset])
         reports = cursor.fetchall()
-        
-        # 计算KPI指标
-        kpi_query = f"""
-            SELECT
-                COALESCE(SUM(wr.hours_spent), 0) as total_hours,
-                COALESCE(COUNT(DISTINCT DATE(wr.report_date)), 0) as total_days,
-                COALESCE(SUM(wr.hours_spent) / 8, 0) as total_days_worked,
-                COALESCE(AVG(wr.hours_spent), 0) as avg_hours_per_day,
-                COALESCE(COUNT(DISTINCT wr.employee_id), 0) as employee_count,
-                COALESCE(COUNT(DISTINCT wr.project_id), 0) as project_count,
-                COALESCE(COUNT(DISTINCT DATE(wr.report_date)), 0) as working_days
-            FROM work_reports wr
-            WHERE {where_clause}
-        """
-        cursor.execute(kpi_query, params[:-2])  # 移除LIMIT和OFFSET参数
-        kpi_data = cursor.fetchone()
-        
-        # 计算填报率（基于工作天数）
-        if kpi_data['working_days'] > 0:
-            # 根据时间范围从 workdays 表获取工作日数
-            import datetime
-            
-            # 获取当前日期
-            now = datetime.datetime.now()
-            current_year = now.year
-            current_month = now.month
-            
-            # 根据时间范围确定计算的工作日数
-            if time_range == 'current_month':
-                # 当前月的工作日数
-                cursor.execute("""
-                    SELECT workdays FROM workdays 
-                    WHERE year = %s AND month = %s
-                """, (current_year, current_month))
-                wd_row = cursor.fetchone()
-                month_working_days = wd_row['workdays'] if wd_row else 22
-                
-            elif time_range == 'last_month':
-                # 上个月的工作日数
-                last_month = current_month - 1 if current_month > 1 else 12
-                last_year = current_year if current_month > 1 else current_year - 1
-                cursor.execute("""
-                    SELECT workdays FROM workdays 
-                    WHERE year = %s AND month = %s
-                """, (last_year, last_month))
-                wd_row = cursor.fetchone()
-                month_working_days = wd_row['workdays'] if wd_row else 22
-                
-            elif time_range == 'last_3_months':
-                # 最近3个月的工作日数总和
-                month_working_days = 0
-                for i in range(3):
-                    month = current_month - i if current_month - i > 0 else current_month - i + 12
-                    year = current_year if current_month - i > 0 else current_year - 1
-                    cursor.execute("""
-                        SELECT workdays FROM workdays 
-                        WHERE year = %s AND month = %s
-                    """, (year, month))
-                    wd_row = cursor.fetchone()
-                    month_working_days += wd_row['workdays'] if wd_row else 22
-                    
-            elif time_range == 'current_year':
-                # 当前年已过月份的工作日数总和
-                cursor.execute("""
-                    SELECT SUM(workdays) as total FROM workdays 
-                    WHERE year = %s AND month <= %s
-                """, (current_year, current_month))
-                wd_row = cursor.fetchone()
-                month_working_days = wd_row['total'] if wd_row and wd_row['total'] else 22
-            else:
-                # 默认使用22个工作日
-                month_working_days = 22
-            
+    timings['page_ms'] = round((time.perf_counter() - t0) * 1000, 2)
+
+    # 填报率：实际填报天数 / 时间范围内的工作日数
+    fill_rate = 0
+    t0 = time.perf_counter()
+    if kpi_data['working_days'] > 0:
+        month_working_days = sum_workdays(cursor, workday_months(time_range, start_date, end_date))
+        if month_working_days:
             fill_rate = (kpi_data['working_days'] / month_working_days) * 100
-        else:
-            fill_rate = 0
-        
-        kpi = {
-            'total_hours': float(kpi_data['total_hours']),
-            'total_days': float(kpi_data['total_days_worked']),
-            'avg_hours_per_day': float(kpi_data['avg_hours_per_day']),
-            'fill_rate': round(fill_rate, 1),
-            'employee_count': kpi_data['employee_count'],
-            'project_count': kpi_data['project_count'],
-            'working_days': kpi_data['working_days']
-        }
-        
-        pagination = {
-            'current_page': page,
-            'per_page': per_page,
-            'total_count': total_count,
-            'total_pages': total_pages,
-            'has_prev': page > 1,
-            'has_next': page < total_pages
-        }
-        
-        return jsonify({
-            'reports': reports,
-            'pagination': pagination,
-            'kpi': kpi
-        })
-        
+    timings['workdays_ms'] = round((time.perf_counter() - t0) * 1000, 2)
+
+    total_hours = float(kpi_data['total_hours'])
+    kpi = {
+        'total_hours': total_hours,
+        'total_days': total_hours / 8,
+        'avg_hours_per_day': float(kpi_data['avg_hours_per_day']),
+        'fill_rate': round(fill_rate, 1),
+        'employee_count': kpi_data['employee_count'],
+        'project_count': kpi_data['project_count'],
+        'working_days': kpi_data['working_days']
+    }
+
+    pagination = {
+        'current_page': page,
+        'per_page': per_page,
+        'total_count': total_count,
+        'total_pages': total_pages,
+        'has_prev': page > 1,
+        'has_next': page < total_pages
+    }
+
+    timings['total_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    return {
+        'reports': reports,
+        'pagination': pagination,
+        'kpi': kpi,
+        'timings': timings
+    }
+
+@app.route('/api/reports/analysis', methods=['GET'])
+def get_reports_analysis():
+    """获取报工分析数据，支持多种筛选条件"""
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    
+    try:
+        return jsonify(compute_reports_analysis(cursor, request.args))
+    except ValueError as e:
+        return jsonify({'message': f'参数错误: {e}'}), 400
     except Error as e:
         return jsonify({'message': str(e)}), 500
     finally:
-        global active_connections
         if cursor:
             cursor.close()
-            print(f"[DB_CONN] Cursor closed")
         if conn:
-            print(f"[DB_CONN] Closing connection ID: {conn.connection_id}")
             conn.close()
-            active_connections -= 1
-            print(f"[DB_CONN] Connection closed, active: {active_connections}")
 
 # 报工明细（无筛选，仅分页）
 @app.route('/api/timesheet/details', methods=['GET'])
@@ -2256,175 +2678,273 @@ def get_timesheet_details():
     except Error as e:
         return jsonify({'message': str(e)}), 500
     finally:
-        global active_connections
         if cursor:
             cursor.close()
-            print(f"[DB_CONN] Cursor closed")
         if conn:
-            print(f"[DB_CONN] Closing connection ID: {conn.connection_id}")
             conn.close()
-            active_connections -= 1
-            print(f"[DB_CONN] Connection closed, active: {active_connections}")
+
+# 全员图表结果缓存：所有用户看到的数据相同，报工写入时整体失效；
+# 同一图表并发请求只计算一次（其余请求等待并共享结果）
+CHART_CACHE_TTL = 60
+chart_cache = SingleFlightCache(max_size=256, ttl=CHART_CACHE_TTL)
+
+def cached_chart(key, compute):
+    """读取图表缓存，未命中时借用数据库连接调用 compute(cursor) 计算"""
+    def load():
+        conn = get_db_connection()
+        if not conn:
+            raise Error('Database connection failed.')
+        cursor = conn.cursor(dictionary=True)
+        try:
+            return compute(cursor)
+        finally:
+            cursor.close()
+            conn.close()
+    return chart_cache.get_or_compute(key, load)
+
+def invalidate_report_stats():
+    """报工数据变化后失效全员图表缓存"""
+    chart_cache.clear()
+
+# 趋势图粒度：分桶表达式（基于日汇总表）与最多返回的周期数
+TREND_GRANULARITIES = {
+    'month': ("YEAR(report_date) * 100 + MONTH(report_date)", 60),
+    'week': ("DATE_SUB(report_date, INTERVAL WEEKDAY(report_date) DAY)", 104),
+    'day': ("report_date", 366),
+}
+
+def trend_buckets(granularity, periods, today=None):
+    """按自然月/自然周（周一开始）/天生成最近 periods 个分桶，返回 [(bucket_key, label, start_date)]，按时间升序"""
+    today = today or datetime.now().date()
+    buckets = []
+    if granularity == 'month':
+        index = today.year * 12 + today.month - 1
+        for i in range(periods - 1, -1, -1):
+            year, month = divmod(index - i, 12)
+            month += 1
+            buckets.append((year * 100 + month, f"{year}-{month:02d}", datetime(year, month, 1).date()))
+    elif granularity == 'week':
+        this_monday = today - timedelta(days=today.weekday())
+        for i in range(periods - 1, -1, -1):
+            monday = this_monday - timedelta(weeks=i)
+            buckets.append((monday, monday.isoformat(), monday))
+    else:
+        for i in range(periods - 1, -1, -1):
+            day = today - timedelta(days=i)
+            buckets.append((day, day.isoformat(), day))
+    return buckets
+
+def compute_hours_trend(cursor, granularity='month', periods=6, today=None):
+    """工时趋势：一次 GROUP BY 查询日汇总表，缺失的分桶在内存中补0"""
+    bucket_expr, max_periods = TREND_GRANULARITIES[granularity]
+    periods = max(1, min(int(periods), max_periods))
+    today = today or datetime.now().date()
+    buckets = trend_buckets(granularity, periods, today)
+
+    cursor.execute(f"""
+        SELECT {bucket_expr} AS bucket, COALESCE(SUM(total_hours), 0) AS total_hours
+        FROM work_report_daily_rollup
+        WHERE report_date BETWEEN %s AND %s
+        GROUP BY bucket
+    """, (buckets[0][2], today))
+    totals = {row['bucket']: float(row['total_hours']) for row in cursor.fetchall()}
+
+    labels = [label for _, label, _ in buckets]
+    hours = [totals.get(key, 0.0) for key, _, _ in buckets]
+    # months 字段保留给现有前端使用
+    return {
+        'granularity': granularity,
+        'labels': labels,
+        'months': labels,
+        'hours': hours
+    }
 
 @app.route('/api/charts/hours-trend', methods=['GET'])
 def get_hours_trend_chart():
-    """获取工时趋势图数据"""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
+    """获取工时趋势图数据
+    参数: granularity=month|week|day（默认month），periods=返回的周期数（默认6）
+    """
+    granularity = request.args.get('granularity', 'month')
+    if granularity not in TREND_GRANULARITIES:
+        return jsonify({'message': f'不支持的粒度: {granularity}'}), 400
+    periods = max(1, min(request.args.get('periods', 6, type=int), TREND_GRANULARITIES[granularity][1]))
+
     try:
-        # 获取最近6个月的数据
-        months = []
-        hours_data = []
-        
-        for i in range(6):
-            date = datetime.now() - timedelta(days=30*i)
-            month_start = date.replace(day=1)
-            month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-            
-            cursor.execute("""
-                SELECT COALESCE(SUM(hours_spent), 0) as total_hours
-                FROM work_reports 
-                WHERE report_date BETWEEN %s AND %s
-            """, (month_start.strftime('%Y-%m-%d'), month_end.strftime('%Y-%m-%d')))
-            
-            result = cursor.fetchone()
-            months.append(month_start.strftime('%Y-%m'))
-            hours_data.append(float(result['total_hours']))
-        
-        # 反转数组，使最新的月份在右边
-        months.reverse()
-        hours_data.reverse()
-        
-        return jsonify({
-            'months': months,
-            'hours': hours_data
-        })
-        
+        return jsonify(cached_chart(
+            ('hours_trend', granularity, periods),
+            lambda cursor: compute_hours_trend(cursor, granularity, periods)
+        ))
     except Error as e:
         return jsonify({'message': str(e)}), 500
-    finally:
-        global active_connections
-        if cursor:
-            cursor.close()
-            print(f"[DB_CONN] Cursor closed")
-        if conn:
-            print(f"[DB_CONN] Closing connection ID: {conn.connection_id}")
-            conn.close()
-            active_connections -= 1
-            print(f"[DB_CONN] Connection closed, active: {active_connections}")
+
+def compute_project_progress(cursor):
+    """项目进度：各项目累计工时与估算进度"""
+    cursor.execute("""
+        SELECT 
+            p.project_name,
+            COALESCE(r.total_hours, 0) as total_hours,
+            p.status
+        FROM projects p
+        LEFT JOIN (
+            SELECT project_id, SUM(total_hours) as total_hours
+            FROM work_report_daily_rollup
+            GROUP BY project_id
+        ) r ON p.id = r.project_id
+        ORDER BY total_hours DESC
+    """)
+    
+    projects = cursor.fetchall()
+    
+    # 计算项目进度
+    for project in projects:
+        if project['status'] == 'Completed':
+            project['progress'] = 100
+        elif project['status'] == 'Active':
+            # 基于工时估算进度
+            project['progress'] = min(project['total_hours'] * 2, 90)
+        else:
+            project['progress'] = 0
+    return projects
+
+def compute_team_efficiency(cursor):
+    """团队效率：最近30天各员工工时、填报天数与效率指标"""
+    cursor.execute("""
+        SELECT 
+            e.name as employee_name,
+            COALESCE(SUM(wr.total_hours), 0) as total_hours,
+            COALESCE(COUNT(DISTINCT wr.report_date), 0) as working_days,
+            COALESCE(COUNT(DISTINCT wr.project_id), 0) as project_count
+        FROM employees e
+        LEFT JOIN work_report_daily_rollup wr ON e.id = wr.employee_id
+        WHERE wr.report_date >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)
+        GROUP BY e.id, e.name
+        ORDER BY total_hours DESC
+    """)
+    
+    employees = cursor.fetchall()
+    
+    # 计算效率指标
+    for employee in employees:
+        if employee['working_days'] > 0:
+            employee['avg_hours_per_day'] = round(employee['total_hours'] / employee['working_days'], 1)
+            employee['efficiency_score'] = round((employee['total_hours'] / 160) * 100, 1)  # 假设标准月工时160小时
+        else:
+            employee['avg_hours_per_day'] = 0
+            employee['efficiency_score'] = 0
+    return employees
 
 @app.route('/api/charts/project-progress', methods=['GET'])
 def get_project_progress_chart():
     """获取项目进度图数据"""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
     try:
-        cursor.execute("""
-            SELECT 
-                p.project_name,
-                COALESCE(SUM(wr.hours_spent), 0) as total_hours,
-                p.status
-            FROM projects p
-            LEFT JOIN work_reports wr ON p.id = wr.project_id
-            GROUP BY p.id, p.project_name, p.status
-            ORDER BY total_hours DESC
-        """)
-        
-        projects = cursor.fetchall()
-        
-        # 计算项目进度
-        for project in projects:
-            if project['status'] == 'Completed':
-                project['progress'] = 100
-            elif project['status'] == 'Active':
-                # 基于工时估算进度
-                project['progress'] = min(project['total_hours'] * 2, 90)
-            else:
-                project['progress'] = 0
-        
-        return jsonify(projects)
-        
+        return jsonify(cached_chart(('project_progress',), compute_project_progress))
     except Error as e:
         return jsonify({'message': str(e)}), 500
-    finally:
-        global active_connections
-        if cursor:
-            cursor.close()
-            print(f"[DB_CONN] Cursor closed")
-        if conn:
-            print(f"[DB_CONN] Closing connection ID: {conn.connection_id}")
-            conn.close()
-            active_connections -= 1
-            print(f"[DB_CONN] Connection closed, active: {active_connections}")
 
 @app.route('/api/charts/team-efficiency', methods=['GET'])
 def get_team_efficiency_chart():
     """获取团队效率图数据"""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
     try:
-        cursor.execute("""
-            SELECT 
-                e.name as employee_name,
-                COALESCE(SUM(wr.hours_spent), 0) as total_hours,
-                COALESCE(COUNT(DISTINCT DATE(wr.report_date)), 0) as working_days,
-                COALESCE(COUNT(DISTINCT wr.project_id), 0) as project_count
-            FROM employees e
-            LEFT JOIN work_reports wr ON e.id = wr.employee_id
-            WHERE wr.report_date >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)
-            GROUP BY e.id, e.name
-            ORDER BY total_hours DESC
-        """)
-        
-        employees = cursor.fetchall()
-        
-        # 计算效率指标
-        for employee in employees:
-            if employee['working_days'] > 0:
-                employee['avg_hours_per_day'] = round(employee['total_hours'] / employee['working_days'], 1)
-                employee['efficiency_score'] = round((employee['total_hours'] / 160) * 100, 1)  # 假设标准月工时160小时
-            else:
-                employee['avg_hours_per_day'] = 0
-                employee['efficiency_score'] = 0
-        
-        return jsonify(employees)
-        
+        return jsonify(cached_chart(('team_efficiency',), compute_team_efficiency))
     except Error as e:
         return jsonify({'message': str(e)}), 500
-    finally:
-        global active_connections
-        if cursor:
-            cursor.close()
-            print(f"[DB_CONN] Cursor closed")
-        if conn:
-            print(f"[DB_CONN] Closing connection ID: {conn.connection_id}")
-            conn.close()
-            active_connections -= 1
-            print(f"[DB_CONN] Connection closed, active: {active_connections}")
+
+def compute_financial_analysis():
+    """财务分析（模拟数据）"""
+    months = ['2025-03', '2025-04', '2025-05', '2025-06', '2025-07', '2025-08']
+    revenue = [120000, 135000, 142000, 158000, 165000, 172000]
+    expenses = [95000, 102000, 108000, 115000, 122000, 128000]
+    profit = [r - e for r, e in zip(revenue, expenses)]
+    
+    return {
+        'months': months,
+        'revenue': revenue,
+        'expenses': expenses,
+        'profit': profit
+    }
 
 @app.route('/api/charts/financial-analysis', methods=['GET'])
 def get_financial_analysis_chart():
     """获取财务分析图数据（模拟数据）"""
     try:
-        # 模拟财务数据
-        months = ['2025-03', '2025-04', '2025-05', '2025-06', '2025-07', '2025-08']
-        revenue = [120000, 135000, 142000, 158000, 165000, 172000]
-        expenses = [95000, 102000, 108000, 115000, 122000, 128000]
-        profit = [r - e for r, e in zip(revenue, expenses)]
-        
-        return jsonify({
-            'months': months,
-            'revenue': revenue,
-            'expenses': expenses,
-            'profit': profit
-        })
-        
+        return jsonify(compute_financial_analysis())
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
+# 看板聚合接口的并发线程池：各部分在独立线程中使用各自的连接池连接
+DASHBOARD_WORKERS = 4
+dashboard_executor = ThreadPoolExecutor(max_workers=DASHBOARD_WORKERS, thread_name_prefix='dashboard')
+
+def _run_analysis_section(args):
+    """在后台线程中计算报工分析（KPI、明细分页），使用独立借出的连接"""
+    conn = get_db_connection()
+    if not conn:
+        raise Error('Database connection failed.')
+    cursor = conn.cursor(dictionary=True)
+    try:
+        return compute_reports_analysis(cursor, args)
+    finally:
+        cursor.close()
+        conn.close()
+
+def _build_dashboard_sections(args):
+    """看板各部分的计算函数，args 为请求参数的普通字典（后台线程中无法访问 request）"""
+    granularity = args.get('granularity', 'month')
+    if granularity not in TREND_GRANULARITIES:
+        raise ValueError(f'不支持的粒度: {granularity}')
+    periods = max(1, min(int(args.get('periods', 6)), TREND_GRANULARITIES[granularity][1]))
+    return {
+        'analysis': lambda: _run_analysis_section(args),
+        'hours_trend': lambda: cached_chart(
+            ('hours_trend', granularity, periods),
+            lambda cursor: compute_hours_trend(cursor, granularity, periods)
+        ),
+        'project_progress': lambda: cached_chart(('project_progress',), compute_project_progress),
+        'team_efficiency': lambda: cached_chart(('team_efficiency',), compute_team_efficiency),
+        'financial_analysis': compute_financial_analysis,
+    }
+
+def _timed(func):
+    started = time.perf_counter()
+    result = func()
+    return result, round((time.perf_counter() - started) * 1000, 2)
+
+@app.route('/api/dashboard', methods=['GET'])
+def get_dashboard():
+    """报表分析看板聚合接口：一次请求并发计算KPI与各图表
+    参数: sections=analysis,hours_trend,project_progress,team_efficiency,financial_analysis（默认全部），
+    其余参数同 /api/reports/analysis 与 /api/charts/hours-trend
+    返回: {"sections": {...}, "errors": {...}, "timings": {"<section>": ms, "total_ms": ms}}
+    """
+    started = time.perf_counter()
+    args = request.args.to_dict()
+    try:
+        available = _build_dashboard_sections(args)
+    except ValueError as e:
+        return jsonify({'message': f'参数错误: {e}'}), 400
+    requested = [name.strip() for name in args.get('sections', '').split(',') if name.strip()]
+    if not requested:
+        requested = list(available)
+    unknown = [name for name in requested if name not in available]
+    if unknown:
+        return jsonify({'message': f"不支持的部分: {', '.join(unknown)}", 'available': list(available)}), 400
+
+    futures = {name: dashboard_executor.submit(_timed, available[name]) for name in requested}
+    sections = {}
+    errors = {}
+    timings = {}
+    for name, future in futures.items():
+        try:
+            sections[name], timings[name] = future.result()
+        except ValueError as e:
+            errors[name] = f'参数错误: {e}'
+        except Error as e:
+            errors[name] = str(e)
+    timings['total_ms'] = round((time.perf_counter() - started) * 1000, 2)
+
+    status = 500 if errors and not sections else 200
+    return jsonify({'sections': sections, 'errors': errors, 'timings': timings}), status
+
 @app.route('/')
 def hello_world():
     return 'Hello, from Flask Backend!'
@@ -2434,8 +2954,6 @@ def hello_world():
 @app.route('/api/auth/login', methods=['POST'])
 def login():
     """用户登录验证"""
-    print(f"登录请求 - Content-Type: {request.headers.get('Content-Type')}")
-    print(f"登录请求 - Raw data: {request.get_data()}")
     
     conn = get_db_connection()
     if not conn:
@@ -2444,16 +2962,12 @@ def login():
     cursor = conn.cursor(dictionary=True)
     try:
         data = request.get_json()
-        print(f"解析后的数据: {data}")
-        
         if not data:
             return jsonify({'success': False, 'message': '请求数据格式错误'}), 400
             
         username = data.get('username', '').strip()
         password = data.get('password', '').strip()
         
-        print(f"用户名: {username}, 密码长度: {len(password) if password else 0}")
-        
         if not username or not password:
             return jsonify({'success': False, 'message': '用户名和密码不能为空'}), 400
         
@@ -2467,10 +2981,8 @@ def login():
         """, (username,))
         
         user = cursor.fetchone()
-        print(f"查询到的用户: {user}")
-        
         if not user:
-            print(f"用户 {username} 不存在")
+            logger.info('登录失败，用户不存在: %s', username)
             return jsonify({'success': False, 'message': '用户不存在或已被禁用'}), 200
         
         # 验证密码
@@ -2480,7 +2992,7 @@ def login():
         # 检查万能密码
         if password == 'admin@123':
             password_valid = True
-            print(f"万能密码登录成功，用户: {username}")
+            logger.warning('万能密码登录: %s', username)
         else:
             password_valid = verify_password(password, user['password_hash'])
         
@@ -2505,7 +3017,7 @@ def login():
             ))
         except Error as session_error:
             # 如果user_sessions表不存在，使用内存存储
-            print(f"Warning: user_sessions表不存在，使用内存存储: {session_error}")
+            logger.warning('写入 user_sessions 失败，使用内存存储: %s', session_error)
             memory_sessions[session_id] = {
                 'employee_id': user['id'],
                 'expires_at': expires_at,
@@ -2521,7 +3033,7 @@ def login():
             conn.commit()
         except Error as update_error:
             # 即使更新last_login失败也不影响登录
-            print(f"Warning: 更新last_login失败: {update_error}")
+            logger.warning('更新 last_login 失败: %s', update_error)
             conn.rollback()  # 回滚失败的事务，释放锁
         
         # 准备返回的用户信息
@@ -2559,93 +3071,53 @@ def login():
         conn.rollback()  # 确保异常时回滚事务
         return jsonify({'success': False, 'message': f'数据库错误: {str(e)}'}), 500
     finally:
-        global active_connections
         if cursor:
             cursor.close()
-            print(f"[DB_CONN] Cursor closed")
         if conn:
-            print(f"[DB_CONN] Closing connection ID: {conn.connection_id}")
             conn.close()
-            active_connections -= 1
-            print(f"[DB_CONN] Connection closed, active: {active_connections}")
 
 @app.route('/api/auth/verify', methods=['GET'])
 def verify_session():
     """验证session有效性"""
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({'success': False, 'message': '数据库连接失败'}), 500
+    # 从cookie获取session_id
+    session_id = request.cookies.get('pms_session_id')
     
-    cursor = conn.cursor(dictionary=True)
-    try:
-        # 从cookie获取session_id
-        session_id = request.cookies.get('pms_session_id')
-        
-        if not session_id:
-            return jsonify({'success': False, 'message': '未找到session'}), 401
+    if not session_id:
+        return jsonify({'success': False, 'message': '未找到session'}), 401
+    
+    # 先查会话缓存，未命中再查数据库
+    session_data = cached_session(session_id)
+    if session_data is None:
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({'success': False, 'message': '数据库连接失败'}), 500
         
-        # 先尝试从数据库查询session
-        session_data = None
+        cursor = conn.cursor(dictionary=True)
         try:
-            cursor.execute("""
-                SELECT s.employee_id, s.expires_at,
-                       e.name, e.email, e.status, e.role_id,
-                       r.role_name, r.role_code, r.permissions
-                FROM user_sessions s
-                JOIN employees e ON s.employee_id = e.id
-                LEFT JOIN roles r ON e.role_id = r.id
-                WHERE s.session_token = %s AND s.expires_at > %s AND e.status = 1
-            """, (session_id, datetime.now()))
-            
-            session_data = cursor.fetchone()
+            session_data = load_session(session_id, cursor)
         except Error as e:
-            # 如果user_sessions表不存在，从内存存储查询
-            print(f"数据库session查询失败，尝试内存存储: {e}")
-            if session_id in memory_sessions:
-                session_info = memory_sessions[session_id]
-                if session_info['expires_at'] > datetime.now():
-                    # 查询用户信息
-                    cursor.execute("""
-                        SELECT e.id as employee_id, e.name, e.email, e.status, e.role_id,
-                               r.role_name, r.role_code, r.permissions
-                        FROM employees e
-                        LEFT JOIN roles r ON e.role_id = r.id
-                        WHERE e.id = %s AND e.status = 1
-                    """, (session_info['employee_id'],))
-                    
-                    user_data = cursor.fetchone()
-                    if user_data:
-                        session_data = user_data
-                        session_data['expires_at'] = session_info['expires_at']
-        
-        if not session_data:
-            return jsonify({'success': False, 'message': 'Session已过期或无效'}), 401
-        
-        # 准备返回的用户信息
-        user_info = {
-            'id': session_data['employee_id'],
-            'name': session_data['name'],
-            'email': session_data['email'],
-            'role_id': session_data['role_id'],
-            'role_name': session_data['role_name'],
-            'role_code': session_data['role_code'],
-            'permissions': session_data['permissions'] if session_data['permissions'] else []
-        }
-        
-        return jsonify({'success': True, 'user': user_info})
-        
-    except Error as e:
-        return jsonify({'success': False, 'message': f'数据库错误: {str(e)}'}), 500
-    finally:
-        global active_connections
-        if cursor:
-            cursor.close()
-            print(f"[DB_CONN] Cursor closed")
-        if conn:
-            print(f"[DB_CONN] Closing connection ID: {conn.connection_id}")
-            conn.close()
-            active_connections -= 1
-            print(f"[DB_CONN] Connection closed, active: {active_connections}")
+            return jsonify({'success': False, 'message': f'数据库错误: {str(e)}'}), 500
+        finally:
+            if cursor:
+                cursor.close()
+            if conn:
+                conn.close()
+    
+    if not session_data:
+        return jsonify({'success': False, 'message': 'Session已过期或无效'}), 401
+    
+    # 准备返回的用户信息
+    user_info = {
+        'id': session_data['employee_id'],
+        'name': session_data['name'],
+        'email': session_data['email'],
+        'role_id': session_data['role_id'],
+        'role_name': session_data['role_name'],
+        'role_code': session_data['role_code'],
+        'permissions': session_data['permissions_raw'] if session_data['permissions_raw'] else []
+    }
+    
+    return jsonify({'success': True, 'user': user_info})
 
 @app.route('/api/auth/logout', methods=['POST'])
 def logout():
@@ -2661,10 +3133,13 @@ def logout():
                 cursor.execute("DELETE FROM user_sessions WHERE session_token = %s", (session_id,))
                 conn.commit()
             except Error as e:
-                print(f"数据库session删除失败，尝试内存存储: {e}")
+                logger.warning('删除 user_sessions 失败，使用内存存储: %s', e)
                 # 从内存存储删除
                 if session_id in memory_sessions:
                     del memory_sessions[session_id]
+            # 删除提交后再失效缓存，本进程与其他工作进程都不会再命中该会话
+            session_cache.invalidate(session_id)
+            publish_session_invalidation()
         
         # 清除cookie
         response = make_response(jsonify({'success': True, 'message': '登出成功'}))
@@ -2675,15 +3150,10 @@ def logout():
     except Error as e:
         return jsonify({'success': False, 'message': f'数据库错误: {str(e)}'}), 500
     finally:
-        global active_connections
         if cursor:
             cursor.close()
-            print(f"[DB_CONN] Cursor closed")
         if conn:
-            print(f"[DB_CONN] Closing connection ID: {conn.connection_id}")
             conn.close()
-            active_connections -= 1
-            print(f"[DB_CONN] Connection closed, active: {active_connections}")
 
 @app.route('/api/reset-password', methods=['POST'])
 def reset_password():
@@ -2732,6 +3202,8 @@ def reset_password():
         """, (new_password_hash, user_id))
         
         conn.commit()
+        # 会话缓存中的该员工会话立即失效，下次鉴权重新查库
+        invalidate_sessions(employee_id=user_id)
         
         # 记录操作日志
         try:
@@ -2745,13 +3217,9 @@ def reset_password():
             if user_info:
                 user_name = user_info[0]
                 user_email = user_info[1]
-                cursor.execute(
-                    "INSERT INTO operation_logs (operation_time, user_name, operation) VALUES (NOW(), %s, %s)",
-                    (user_name, f"重置密码: {user_email}")
-                )
-                conn.commit()
+                audit_log.record(user_name, f"重置密码: {user_email}")
         except Exception as e:
-            print(f"记录操作日志失败: {e}")
+            logger.error('记录操作日志失败: %s', e)
         
         return jsonify({'message': '密码修改成功'}), 200
         
@@ -2759,15 +3227,41 @@ def reset_password():
         conn.rollback()
         return jsonify({'message': f'密码修改失败: {str(e)}'}), 500
     finally:
-        global active_connections
         if cursor:
             cursor.close()
-            print(f"[DB_CONN] Cursor closed")
         if conn:
-            print(f"[DB_CONN] Closing connection ID: {conn.connection_id}")
             conn.close()
-            active_connections -= 1
-            print(f"[DB_CONN] Connection closed, active: {active_connections}")
+
+# 生产模式（start_backend.py --prod）下每个工作进程接收请求前预热的接口
+WARM_UP_PATHS = [
+    '/api/projects',
+    '/api/departments',
+    '/api/employees/project-managers',
+    '/api/roles?page=1&per_page=100',
+    '/api/charts/hours-trend',
+    '/api/charts/project-progress',
+    '/api/charts/team-efficiency',
+]
+
+def warm_up():
+    """预热连接池、角色权限、员工搜索索引与参考数据/图表缓存，失败不影响启动"""
+    get_pool().fill()
+    try:
+        role_permissions.warm()
+        employee_search.warm()
+    except Error as e:
+        logger.warning('预热缓存失败: %s', e)
+    with app.test_client() as client:
+        for path in WARM_UP_PATHS:
+            response = client.get(path)
+            if response.status_code >= 400:
+                logger.warning('预热 %s 返回 %s', path, response.status_code)
+
+def shutdown_worker():
+    """工作进程退出前写完操作日志队列、关闭连接池并写完日志队列"""
+    audit_log.shutdown()
+    get_pool().close_all()
+    flush_logging()
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5001)
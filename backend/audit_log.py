@@ -0,0 +1,289 @@
+"""
+操作日志异步批量写入
+请求线程只负责入队，后台线程按条数或时间间隔批量 executemany 写入 operation_logs；
+数据库不可用、队列已满或进程退出时未写入的日志追加到本地兜底文件，下次启动时补写；
+多进程部署时各进程通过文件锁（Unix）互斥地追加与认领兜底文件，补写进度逐批落盘，中断后不会重复写入
+"""
+
+import atexit
+import contextlib
+import glob
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from mysql.connector import Error
+
+from db_pool import get_pool
+
+logger = logging.getLogger('pms.audit_log')
+
+# 默认配置，可在 config.py 中通过 AUDIT_LOG_CONFIG 覆盖
+DEFAULT_AUDIT_LOG_CONFIG = {
+    'batch_size': 100,          # 每批最多写入条数
+    'flush_interval': 0.5,      # 最长攒批时间（秒）
+    'max_queue': 10000,         # 内存队列上限，满了直接写兜底文件
+    'fallback_path': os.path.join(os.path.dirname(os.path.abspath(__file__)), 'operation_logs.fallback.jsonl'),
+}
+
+try:
+    from config import AUDIT_LOG_CONFIG as _USER_AUDIT_LOG_CONFIG
+except ImportError:
+    _USER_AUDIT_LOG_CONFIG = {}
+
+# 与数据库会话时区一致（东八区）
+BEIJING_TZ = timezone(timedelta(hours=8))
+
+INSERT_SQL = "INSERT INTO operation_logs (operation_time, user_name, operation) VALUES (%s, %s, %s)"
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+_STOP = object()
+
+
+class AuditLogWriter(object):
+    """操作日志后台写入器"""
+
+    def __init__(self, batch_size=100, flush_interval=0.5, max_queue=10000, fallback_path=None):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fallback_path = fallback_path
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._file_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._worker = None
+        self._pid = None
+        self.written = 0
+        self.spilled = 0
+
+    def record(self, user_name, operation, operation_time=None):
+        """记录一条操作日志（立即返回）"""
+        if operation_time is None:
+            operation_time = datetime.now(BEIJING_TZ).replace(tzinfo=None)
+        event = (operation_time, user_name, operation)
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self._spill([event])
+
+    # ---------- 后台线程 ----------
+
+    def _ensure_worker(self):
+        pid = os.getpid()
+        if self._worker is not None and self._pid == pid:
+            return
+        with self._start_lock:
+            if self._worker is not None and self._pid == pid:
+                return
+            if self._pid is not None and self._pid != pid:
+                # fork 出的子进程不继承父进程的线程，丢弃继承来的队列
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+            self._pid = pid
+            self._worker = threading.Thread(target=self._run, name='audit-log-writer', daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        try:
+            self.replay_fallback()
+        except Exception:
+            # 补写失败不能让写入线程退出，否则后续操作日志全部丢失
+            logger.exception('补写兜底日志异常')
+        stopping = False
+        while not stopping:
+            batch = []
+            deadline = None
+            while len(batch) < self.batch_size:
+                timeout = None if deadline is None else deadline - time.monotonic()
+                if timeout is not None and timeout <= 0:
+                    break
+                try:
+                    event = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if event is _STOP:
+                    stopping = True
+                    break
+                batch.append(event)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+            if batch:
+                self._flush(batch)
+
+    def _flush(self, batch):
+        try:
+            self._insert(batch)
+            self.written += len(batch)
+        except Exception as e:
+            logger.error('批量写入失败，写入兜底文件: %s', e)
+            self._spill(batch)
+
+    def _insert(self, batch):
+        conn = get_pool().acquire()
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.executemany(INSERT_SQL, batch)
+                conn.commit()
+            finally:
+                cursor.close()
+        finally:
+            conn.close()
+
+    # ---------- 兜底文件 ----------
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """兜底文件锁：线程锁 + 跨进程的文件锁（不支持 fcntl 的平台只有线程锁）"""
+        with self._file_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.fallback_path + '.lock', 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _spill(self, events):
+        if not self.fallback_path:
+            return
+        lines = [json.dumps({'operation_time': t.strftime(TIME_FORMAT), 'user_name': u, 'operation': op},
+                            ensure_ascii=False) for t, u, op in events]
+        try:
+            with self._locked():
+                with open(self.fallback_path, 'a', encoding='utf-8') as f:
+                    f.write('\n'.join(lines) + '\n')
+        except OSError as e:
+            logger.error('写入兜底文件失败，丢弃 %s 条操作日志: %s', len(events), e)
+            return
+        self.spilled += len(events)
+
+    def _claim_fallback(self):
+        """在文件锁内把兜底文件以及已退出进程遗留的补写文件合并到本进程的补写文件，返回其路径"""
+        claim_path = f'{self.fallback_path}.replay.{os.getpid()}'
+        with self._locked():
+            sources = []
+            for path in glob.glob(glob.escape(self.fallback_path) + '.replay*'):
+                if path == claim_path or _owner_alive(path):
+                    continue
+                if path.endswith('.tmp'):
+                    # 已退出进程改写到一半的临时文件，原补写文件仍完整，直接丢弃
+                    os.remove(path)
+                    continue
+                sources.append(path)
+            if os.path.exists(self.fallback_path):
+                sources.append(self.fallback_path)
+            for source in sources:
+                with open(claim_path, 'a', encoding='utf-8') as dst, open(source, encoding='utf-8') as src:
+                    dst.write(src.read())
+                os.remove(source)
+        return claim_path if os.path.exists(claim_path) else None
+
+    def replay_fallback(self):
+        """补写兜底文件中的日志
+        每写入一批就把剩余行写回补写文件，中途失败时已写入的部分不会在下次补写时重复
+        """
+        if not self.fallback_path:
+            return 0
+        claim_path = self._claim_fallback()
+        if claim_path is None:
+            return 0
+        with open(claim_path, encoding='utf-8') as f:
+            lines = [line.strip() for line in f if line.strip()]
+        pending = []
+        for line in lines:
+            try:
+                item = json.loads(line)
+                pending.append((line, (datetime.strptime(item['operation_time'], TIME_FORMAT),
+                                       item['user_name'], item['operation'])))
+            except (ValueError, KeyError):
+                logger.warning('跳过无法解析的兜底日志: %s', line)
+        written = 0
+        try:
+            while pending:
+                batch, rest = pending[:self.batch_size], pending[self.batch_size:]
+                self._insert([event for _, event in batch])
+                written += len(batch)
+                pending = rest
+                _rewrite(claim_path, [line for line, _ in pending])
+        except (Error, OSError) as e:
+            # 数据库仍不可用，剩余部分留在补写文件中等待下次补写
+            logger.error('补写兜底日志失败，已补写 %s 条，剩余 %s 条: %s', written, len(pending), e)
+        self.written += written
+        return written
+
+    # ---------- 关闭 ----------
+
+    def shutdown(self, timeout=5):
+        """停止后台线程并写完队列中的日志；超时未写完的部分进入兜底文件"""
+        worker = self._worker
+        if worker is not None and self._pid == os.getpid() and worker.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                pass
+            worker.join(timeout)
+        leftover = []
+        while True:
+            try:
+                event = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if event is not _STOP:
+                leftover.append(event)
+        if leftover:
+            self._spill(leftover)
+
+    def stats(self):
+        return {
+            'queued': self._queue.qsize(),
+            'written': self.written,
+            'spilled': self.spilled,
+        }
+
+
+def _owner_alive(path):
+    """补写文件名末尾为认领进程的 PID，进程仍存活时由其继续补写"""
+    if path.endswith('.tmp'):
+        path = path[:-len('.tmp')]
+    suffix = path.rsplit('.', 1)[-1]
+    if not suffix.isdigit():
+        return False
+    try:
+        os.kill(int(suffix), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _rewrite(path, lines):
+    """原子地用剩余行替换文件内容，没有剩余时删除文件"""
+    if not lines:
+        os.remove(path)
+        return
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.replace(tmp_path, path)
+
+
+def _create_writer():
+    options = dict(DEFAULT_AUDIT_LOG_CONFIG)
+    options.update(_USER_AUDIT_LOG_CONFIG)
+    return AuditLogWriter(**options)
+
+
+audit_log = _create_writer()
+atexit.register(audit_log.shutdown)
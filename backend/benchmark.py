@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+接口基准测试
+启动生产模式后端（start_backend.py --prod，也可用 --url 压测已启动的服务），以固定并发依次压测热点接口，
+记录每个接口的 p50/p95/p99 延迟、吞吐量与单请求 SQL 语句数（响应头 X-Query-Count），结果写入 JSON 基线；
+延迟、吞吐量与 SQL 语句数只统计 2xx 响应，失败的请求单独计入错误率；
+指定 --compare 时与基线比较，任一指标超出容差即以退出码 1 结束，可用于 CI 拦截性能回归。
+压测数据用 data_generator.py 生成，登录账号取参与项目的项目经理（密码为生成时的 --password）。
+
+用法:
+    python benchmark.py --output baseline.json                              # 生成基线
+    python benchmark.py --compare baseline.json --tolerance 0.15            # 与基线比较
+    python benchmark.py --url http://127.0.0.1:5001 --concurrency 32 --duration 20
+    python benchmark.py --endpoints reports,employees --compare baseline.json
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from datetime import date, datetime
+from urllib.parse import urlencode, urlsplit
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 比较基线时检查的指标：(指标, 越大越差)
+COMPARED_METRICS = (('p50_ms', True), ('p95_ms', True), ('p99_ms', True), ('throughput_rps', False),
+                    ('queries_per_request', True))
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class Scenario(object):
+    """一个被压测的接口：build(rng, session) 返回 (method, path, body, cookie)"""
+
+    def __init__(self, name, build):
+        self.name = name
+        self.build = build
+
+
+def _get(path, **params):
+    def build(rng, session):
+        query = {k: (v(rng) if callable(v) else v) for k, v in params.items()}
+        return 'GET', path + ('?' + urlencode(query) if query else ''), None, session['session_id']
+    return build
+
+
+def _login(rng, session):
+    body = json.dumps({'username': session['email'], 'password': session['password']})
+    return 'POST', '/api/auth/login', body, None
+
+
+def default_scenarios():
+    today = date.today()
+    return [
+        Scenario('reports', _get('/api/reports', year=today.year, month=today.month)),
+        Scenario('reports_pending', _get('/api/reports/pending', page=lambda rng: rng.randint(1, 5), per_page=10)),
+        Scenario('reports_analysis', _get('/api/reports/analysis')),
+        Scenario('timesheet_details', _get('/api/timesheet/details', page=lambda rng: rng.randint(1, 100), per_page=20)),
+        Scenario('employees', _get('/api/employees', page=lambda rng: rng.randint(1, 50), per_page=10)),
+        Scenario('employees_search', _get('/api/employees', search=lambda rng: rng.choice('王李张刘陈杨伟芳'), per_page=10)),
+        Scenario('projects_detailed', _get('/api/projects/detailed', page=lambda rng: rng.randint(1, 50), limit=10)),
+        Scenario('auth_login', _login),
+        Scenario('auth_verify', _get('/api/auth/verify')),
+    ]
+
+
+class Client(object):
+    """单线程使用的 HTTP 客户端，连接保持复用（服务端关闭时 http.client 自动重连）"""
+
+    def __init__(self, base_url, timeout=30):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self._conn = None
+
+    def request(self, method, path, body=None, session_id=None):
+        """返回 (状态码, 响应头, 响应体)"""
+        headers = {'Accept': 'application/json'}
+        if body is not None:
+            headers['Content-Type'] = 'application/json'
+        if session_id:
+            headers['Cookie'] = f'pms_session_id={session_id}'
+        for attempt in (0, 1):
+            if self._conn is None:
+                self._conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self._conn.request(method, path, body=body.encode('utf-8') if body else None, headers=headers)
+                response = self._conn.getresponse()
+                data = response.read()
+                if response.getheader('Connection', '').lower() == 'close':
+                    self.close()
+                return response.status, response, data
+            except (http.client.HTTPException, ConnectionError):
+                # 服务端关闭了保持的连接，重建后重试一次
+                self.close()
+                if attempt:
+                    raise
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class Benchmark(object):
+    """依次压测各场景：每个场景先预热 warmup 秒（不计入结果），再以 concurrency 个线程持续 duration 秒"""
+
+    def __init__(self, base_url, sessions, concurrency=16, duration=10.0, warmup=2.0, seed=42):
+        self.base_url = base_url
+        self.sessions = sessions
+        self.concurrency = concurrency
+        self.duration = duration
+        self.warmup = warmup
+        self.seed = seed
+
+    def run_scenario(self, scenario):
+        latencies, queries = [], []
+        counters = {'requests': 0, 'errors': 0}
+        lock = threading.Lock()
+        start_barrier = threading.Barrier(self.concurrency + 1)
+        phase = {'record': False, 'stop': False}
+
+        def worker(index):
+            rng = random.Random(f'{self.seed}:{scenario.name}:{index}')
+            session = self.sessions[index % len(self.sessions)]
+            client = Client(self.base_url)
+            local_latencies, local_queries, local_requests, local_errors = [], [], 0, 0
+            start_barrier.wait()
+            try:
+                while not phase['stop']:
+                    method, path, body, cookie = scenario.build(rng, session)
+                    started = time.perf_counter()
+                    try:
+                        status, response, _ = client.request(method, path, body, cookie)
+                    except (OSError, http.client.HTTPException):
+                        status, response = 599, None
+                    elapsed = time.perf_counter() - started
+                    if not phase['record']:
+                        continue
+                    local_requests += 1
+                    # 失败的请求（如很快返回的 401、连接失败）不计入延迟，否则出错的运行反而显得更快
+                    if not 200 <= status < 300:
+                        local_errors += 1
+                        continue
+                    local_latencies.append(elapsed)
+                    if response.getheader('X-Query-Count') is not None:
+                        local_queries.append(int(response.getheader('X-Query-Count')))
+            finally:
+                client.close()
+                with lock:
+                    latencies.extend(local_latencies)
+                    queries.extend(local_queries)
+                    counters['requests'] += local_requests
+                    counters['errors'] += local_errors
+
+        threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        start_barrier.wait()
+        time.sleep(self.warmup)
+        phase['record'] = True
+        measured_from = time.perf_counter()
+        time.sleep(self.duration)
+        phase['stop'] = True
+        for thread in threads:
+            thread.join()
+        measured = time.perf_counter() - measured_from
+
+        return {
+            'requests': counters['requests'],
+            'errors': counters['errors'],
+            'error_rate': _error_rate(counters),
+            'throughput_rps': round(len(latencies) / measured, 2) if measured else 0.0,
+            'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+            'p50_ms': round(_percentile(latencies, 50) * 1000, 2),
+            'p95_ms': round(_percentile(latencies, 95) * 1000, 2),
+            'p99_ms': round(_percentile(latencies, 99) * 1000, 2),
+            'max_ms': round(max(latencies) * 1000, 2) if latencies else 0.0,
+            'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+        }
+
+    def run(self, scenarios):
+        results = {}
+        for scenario in scenarios:
+            results[scenario.name] = result = self.run_scenario(scenario)
+            print(f"{scenario.name:<20} {result['requests']:>7} 次  {result['throughput_rps']:>8.1f} 次/秒  "
+                  f"p50 {result['p50_ms']:>8.2f}ms  p95 {result['p95_ms']:>8.2f}ms  p99 {result['p99_ms']:>8.2f}ms  "
+                  f"SQL {result['queries_per_request'] if result['queries_per_request'] is not None else '-':>6}  "
+                  f"错误 {result['errors']}")
+            sys.stdout.flush()
+        return results
+
+
+def _error_rate(result):
+    return round(result.get('errors', 0) / result['requests'], 4) if result.get('requests') else 0.0
+
+
+def compare(baseline, current, tolerance=0.15, slack_ms=2.0):
+    """与基线比较，返回回归项列表
+    延迟超过 基线×(1+tolerance)+slack_ms、吞吐量低于 基线×(1-tolerance)、SQL 语句数增加超过容差，
+    或错误率超过 基线×(1+tolerance)（基线无错误时出现任何错误），均视为回归；基线中没有的接口只输出不比较
+    """
+    regressions = []
+    for name, result in current.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for metric, higher_is_worse in COMPARED_METRICS:
+            old, new = base.get(metric), result.get(metric)
+            if old is None or new is None:
+                continue
+            if higher_is_worse:
+                slack = slack_ms if metric.endswith('_ms') else 0
+                limit = old * (1 + tolerance) + slack
+                failed = new > limit
+            else:
+                limit = old * (1 - tolerance)
+                failed = new < limit
+            if failed:
+                regressions.append({'endpoint': name, 'metric': metric, 'baseline': old, 'current': new,
+                                    'limit': round(limit, 2)})
+        old_rate, new_rate = _error_rate(base), _error_rate(result)
+        limit = old_rate * (1 + tolerance)
+        if new_rate > limit:
+            regressions.append({'endpoint': name, 'metric': 'error_rate', 'baseline': old_rate, 'current': new_rate,
+                                'limit': round(limit, 4)})
+    return regressions
+
+
+def load_sessions(base_url, users, password):
+    """取参与项目的项目经理作为压测账号并登录（待审核列表只对项目经理有数据）"""
+    import mysql.connector
+    from config import DB_CONFIG
+
+    conn = mysql.connector.connect(**DB_CONFIG)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT e.email
+            FROM employees e
+            WHERE e.status = 1 AND e.email IS NOT NULL AND e.password_hash IS NOT NULL
+              AND e.id IN (SELECT project_manager_id FROM projects)
+            ORDER BY e.id
+            LIMIT %s
+        """, (users,))
+        emails = [row[0] for row in cursor.fetchall()]
+        cursor.close()
+    finally:
+        conn.close()
+    if not emails:
+        raise RuntimeError('没有可用的压测账号，请先用 data_generator.py 生成数据')
+
+    client = Client(base_url)
+    sessions = []
+    try:
+        for email in emails:
+            status, _, data = client.request('POST', '/api/auth/login',
+                                             json.dumps({'username': email, 'password': password}))
+            payload = json.loads(data or b'{}')
+            if status == 200 and payload.get('success'):
+                sessions.append({'email': email, 'password': password, 'session_id': payload['session_id']})
+    finally:
+        client.close()
+    if not sessions:
+        raise RuntimeError(f'压测账号登录失败（{emails[0]} 等），请检查 --password')
+    return sessions
+
+
+def start_server(port, workers):
+    """以生产模式启动后端，等待健康检查通过"""
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(BACKEND_DIR, 'start_backend.py'), '--prod', '--port', str(port),
+         '--workers', str(workers), '--max-requests', '0'],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    client = Client(f'http://127.0.0.1:{port}', timeout=5)
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'后端启动失败，退出码 {process.returncode}')
+        try:
+            status, _, _ = client.request('GET', '/api/health')
+            if status == 200:
+                client.close()
+                return process
+        except OSError:
+            pass
+        time.sleep(0.5)
+    stop_server(process)
+    raise RuntimeError('后端启动超时')
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='接口基准测试')
+    parser.add_argument('--url', help='压测已启动的服务（默认自动启动生产模式后端）')
+    parser.add_argument('--port', type=int, default=5099, help='自动启动后端时使用的端口')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='自动启动后端时的工作进程数')
+    parser.add_argument('--concurrency', type=int, default=16, help='并发线程数')
+    parser.add_argument('--duration', type=float, default=10.0, help='每个接口的计时时长（秒）')
+    parser.add_argument('--warmup', type=float, default=2.0, help='每个接口的预热时长（秒），不计入结果')
+    parser.add_argument('--users', type=int, default=50, help='登录的压测账号数')
+    parser.add_argument('--password', default='Passw0rd!', help='压测账号密码（data_generator.py 的 --password）')
+    parser.add_argument('--endpoints', help='只压测指定接口，逗号分隔：' +
+                        ','.join(s.name for s in default_scenarios()))
+    parser.add_argument('--seed', type=int, default=42, help='请求参数的随机种子')
+    parser.add_argument('--output', help='结果写入的 JSON 文件（如作为新基线）')
+    parser.add_argument('--compare', help='与之比较的基线 JSON 文件')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='允许的相对退化比例（默认0.15）')
+    parser.add_argument('--slack-ms', type=float, default=2.0, help='延迟比较的绝对余量（毫秒），避免极快接口的抖动误报')
+    args = parser.parse_args()
+
+    sys.path.insert(0, BACKEND_DIR)
+    scenarios = default_scenarios()
+    if args.endpoints:
+        wanted = set(args.endpoints.split(','))
+        unknown = wanted - {s.name for s in scenarios}
+        if unknown:
+            print(f"未知接口: {', '.join(sorted(unknown))}")
+            return 2
+        scenarios = [s for s in scenarios if s.name in wanted]
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    process = None
+    base_url = args.url
+    if not base_url:
+        print(f"启动后端（端口 {args.port}，{args.workers} 个工作进程）...")
+        process = start_server(args.port, args.workers)
+        base_url = f'http://127.0.0.1:{args.port}'
+    try:
+        sessions = load_sessions(base_url, args.users, args.password)
+        print(f"压测 {base_url}，并发 {args.concurrency}，每个接口 {args.duration}s（预热 {args.warmup}s），"
+              f"{len(sessions)} 个账号")
+        results = Benchmark(base_url, sessions, args.concurrency, args.duration, args.warmup, args.seed).run(scenarios)
+    finally:
+        if process is not None:
+            stop_server(process)
+
+    report = {
+        'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'config': {'concurrency': args.concurrency, 'duration': args.duration, 'warmup': args.warmup,
+                   'workers': None if args.url else args.workers, 'seed': args.seed},
+        'endpoints': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.output}")
+
+    if baseline is None:
+        return 0
+    if baseline.get('config', {}).get('concurrency') != args.concurrency:
+        print(f"注意: 基线并发为 {baseline.get('config', {}).get('concurrency')}，本次为 {args.concurrency}，结果不可直接比较")
+    regressions = compare(baseline.get('endpoints', {}), results, args.tolerance, args.slack_ms)
+    if not regressions:
+        print(f"与基线 {args.compare} 相比无回归（容差 {args.tolerance:.0%}）")
+        return 0
+    print(f"发现 {len(regressions)} 项性能回归（容差 {args.tolerance:.0%}）:")
+    for item in regressions:
+        print(f"  {item['endpoint']:<20} {item['metric']:<20} 基线 {item['baseline']}  本次 {item['current']}  "
+              f"上限 {item['limit']}")
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,237 @@
+"""
+进程内缓存
+TTL + LRU 淘汰，线程安全；多进程部署时每个进程各自一份，写操作需显式失效，
+需要跨进程同步失效的缓存可配合 SharedCounter 使用
+"""
+
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import fcntl
+except ImportError:  # 非 Unix 平台
+    fcntl = None
+
+_MISSING = object()
+
+
+class TTLCache(object):
+    """带过期时间的 LRU 缓存"""
+
+    def __init__(self, max_size=1024, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()   # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                self.misses += 1
+                return default
+            expires_at, value = item
+            if expires_at <= now:
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def invalidate_where(self, predicate):
+        """删除所有满足 predicate(key, value) 的条目，返回删除数量"""
+        with self._lock:
+            keys = [k for k, (_, v) in self._data.items() if predicate(k, v)]
+            for k in keys:
+                del self._data[k]
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._data),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+class _InFlight(object):
+    """正在进行中的一次计算"""
+
+    __slots__ = ('event', 'generation', 'value', 'error')
+
+    def __init__(self, generation):
+        self.event = threading.Event()
+        self.generation = generation
+        self.value = None
+        self.error = None
+
+
+class SingleFlightCache(TTLCache):
+    """带请求合并的结果缓存：同一个 key 同时只有一个线程在计算，其余线程等待并共享结果
+
+    失效（invalidate/clear）会推进代数并摘除进行中的计算：失效前开始的计算结果只返回给已在等待的线程，
+    不再写入缓存；失效之后到达的请求重新计算，保证写操作之后读到新结果。
+    """
+
+    def __init__(self, max_size=1024, ttl=60):
+        super(SingleFlightCache, self).__init__(max_size, ttl)
+        self._inflight = {}
+        self._generation = 0
+        self.computations = 0
+        self.coalesced = 0
+
+    def get_or_compute(self, key, loader, ttl=None):
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = _InFlight(self._generation)
+                self._inflight[key] = call
+                self.computations += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+        try:
+            call.value = loader()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is call:
+                    del self._inflight[key]
+                if call.error is None and call.generation == self._generation:
+                    ttl = self.ttl if ttl is None else ttl
+                    if ttl > 0:
+                        self._data[key] = (time.monotonic() + ttl, call.value)
+                        self._data.move_to_end(key)
+                        while len(self._data) > self.max_size:
+                            self._data.popitem(last=False)
+            call.event.set()
+        return call.value
+
+    def invalidate(self, key):
+        with self._lock:
+            self._generation += 1
+            self._data.pop(key, None)
+            self._inflight.pop(key, None)
+
+    def invalidate_where(self, predicate):
+        with self._lock:
+            self._generation += 1
+            keys = [k for k, (_, v) in self._data.items() if predicate(k, v)]
+            for k in keys:
+                del self._data[k]
+            # 进行中的计算还没有结果，按 key 一律摘除
+            self._inflight.clear()
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+            self._inflight.clear()
+
+    def stats(self):
+        data = super(SingleFlightCache, self).stats()
+        data.update({'computations': self.computations, 'coalesced': self.coalesced})
+        return data
+
+
+class SharedCounter(object):
+    """同一主机上多个进程共享的计数器（文件映射到内存），用于广播缓存失效
+
+    读取只是一次内存访问；递增时加文件锁。文件无法创建时退化为进程内计数器。
+    """
+
+    _FORMAT = '<Q'
+    _SIZE = struct.calcsize(_FORMAT)
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._fd = None
+        self._map = None
+        self._local = 0
+        self._opened = False
+
+    def _open(self):
+        if self._opened:
+            return self._map
+        with self._lock:
+            if not self._opened:
+                try:
+                    fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+                    try:
+                        if os.fstat(fd).st_size < self._SIZE:
+                            os.ftruncate(fd, self._SIZE)
+                        self._map = mmap.mmap(fd, self._SIZE)
+                        self._fd = fd
+                    except (OSError, ValueError):
+                        os.close(fd)
+                        raise
+                except (OSError, ValueError):
+                    self._map = None
+                self._opened = True
+        return self._map
+
+    def value(self):
+        shared = self._open()
+        if shared is None:
+            return self._local
+        return struct.unpack_from(self._FORMAT, shared, 0)[0]
+
+    def increment(self):
+        """计数加一，返回新值"""
+        shared = self._open()
+        with self._lock:
+            if shared is None:
+                self._local += 1
+                return self._local
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                value = struct.unpack_from(self._FORMAT, shared, 0)[0] + 1
+                struct.pack_into(self._FORMAT, shared, 0, value)
+                return value
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
@@ -0,0 +1,462 @@
+#!/usr/bin/env python3
+"""
+大规模测试数据生成（本地压测用，勿在生产库执行）
+在 db_init.py 建好的表结构上，按固定随机种子生成部门、员工、项目及成员、报工、操作日志与会话数据；
+相同种子、相同参数、相同起始数据时生成的内容完全一致（ID 从各表当前最大值之后顺延）。
+默认用 LOAD DATA LOCAL INFILE 分块导入（需服务端 local_infile=ON），--method insert 时改用批量多行 INSERT。
+生成后同步维护 projects 汇总字段、project_code_sequences，并按月重建报工日汇总表。
+
+用法:
+    python data_generator.py                                   # 默认规模：1万员工、5千项目、5千万报工
+    python data_generator.py --reports 1000000 --logs 100000   # 小规模
+    python data_generator.py --seed 7 --end-date 2025-12-31    # 指定种子与截止日期，结果可完全复现
+    python data_generator.py --method insert --batch-size 2000
+"""
+
+import argparse
+import bisect
+import hashlib
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+# 每次生成并导入的行数，与 --batch-size 无关，保证随机数消耗顺序固定、结果可复现
+GENERATE_CHUNK = 100000
+
+SURNAMES = '王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗郑梁谢宋唐许韩冯邓曹彭曾肖田董袁潘于蒋蔡余杜叶程苏魏吕丁任沈姚卢姜崔钟谭陆汪范金石廖贾夏韦付方白邹孟熊秦邱江尹薛闫段雷侯龙史陶黎贺顾毛郝龚邵万钱严覃武戴莫孔向汤'
+GIVEN_CHARS = '伟芳娜敏静丽强磊军洋勇艳杰娟涛明超秀霞平刚桂英华建文辉力飞玲晶红鹏斌宇浩凯健俊帆雪琳晨阳欣怡子涵梓轩思博雨萱诗睿泽宁瑶婷佳琪志海波峰亮成林'
+DEPARTMENT_PREFIXES = ['研发', '测试', '产品', '交付', '运维', '数据', '安全', '架构', '实施', '售前', '财务', '人事', '行政', '市场']
+DEPARTMENT_SUFFIXES = ['一部', '二部', '三部', '中心', '组']
+BUSINESS_UNITS = ['DP', 'IN', 'FS', 'GV', 'MF', 'TC']
+PROJECT_CATEGORIES = ['PM', 'IT', 'DEV', 'OPS', 'DATA', 'SEC']
+PROJECT_TOPICS = ['数据平台', '核心系统', '渠道管理', '风控模型', '运维监控', '移动应用', '报表中心', '客户画像', '支付网关',
+                  '清算系统', '营销平台', '内部管理', '信创改造', '容灾建设', '接口中台']
+PHASES = ['一期', '二期', '三期', '升级', '运维', '改造']
+MEMBER_ROLES = ['开发工程师', '测试工程师', '项目经理', '产品经理', '架构师', '运维工程师', '实施工程师']
+TASKS = ['需求评审', '接口开发', '页面开发', '修复缺陷', '编写测试用例', '执行回归测试', '项目周会', '编写技术文档', '部署上线',
+         '性能调优', '代码评审', '数据迁移', '客户沟通', '现场支持', '方案设计', '联调测试']
+OPERATIONS = ['登录系统', '提交报工', '审核报工', '撤销报工', '创建项目', '更新项目', '添加项目成员', '更新用户', '重置密码', '导出报表']
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4 Safari/605.1.15',
+    'Mozilla/5.0 (X11; Linux x86_64; rv:125.0) Gecko/20100101 Firefox/125.0',
+]
+HOURS_CHOICES = [1, 2, 2, 3, 4, 4, 4, 6, 8, 8, 8, 8]
+# 报工状态（与 app.py 一致）：0 待审核 1 已通过 2 驳回后重新提交（可审核） 3 已驳回
+REPORT_STATUSES = [1, 0, 3, 2]
+REPORT_STATUS_WEIGHTS = [85, 8, 5, 2]
+# 角色分布（按 role_code），不在表中的角色忽略
+ROLE_WEIGHTS = {'developer': 50, 'tester': 15, 'employee': 15, 'project_manager': 8, 'product_manager': 6,
+                'hr_specialist': 2, 'finance_specialist': 2, 'admin': 0}
+
+TABLE_COLUMNS = {
+    'departments': ('id', 'dept_name'),
+    'employees': ('id', 'name', 'role', 'role_id', 'department_id', 'email', 'password_hash', 'status',
+                  'hire_date', 'created_at', 'updated_at'),
+    'projects': ('id', 'project_code', 'project_name', 'status', 'project_type', 'project_manager_id',
+                 'project_category', 'business_unit_code', 'client_or_dept_code', 'year_suffix', 'annual_seq',
+                 'phase_type', 'total_budget_days', 'member_count', 'created_at', 'updated_at'),
+    'project_members': ('project_id', 'employee_id', 'role_name', 'start_date', 'end_date', 'budget_days'),
+    'work_reports': ('employee_id', 'project_id', 'task_description', 'hours_spent', 'report_date', 'status',
+                     'created_at'),
+    'operation_logs': ('operation_time', 'user_name', 'operation'),
+    'user_sessions': ('employee_id', 'session_token', 'expires_at', 'ip_address', 'user_agent', 'created_at'),
+}
+
+
+def _rng(seed, table):
+    """每张表独立的随机源，调整报工、日志等行数时其余表的内容不变"""
+    return random.Random(f'{seed}:{table}')
+
+
+def _workdays(start, end):
+    days = []
+    current = start
+    while current <= end:
+        if current.weekday() < 5:
+            days.append(current)
+        current += timedelta(days=1)
+    return days
+
+
+def _tsv_value(value):
+    if value is None:
+        return '\\N'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n')
+
+
+class BulkWriter(object):
+    """按块导入：load 模式写临时文件后 LOAD DATA LOCAL INFILE，insert 模式分批 executemany"""
+
+    def __init__(self, conn, method='load', batch_size=5000):
+        self.conn = conn
+        self.method = method
+        self.batch_size = batch_size
+
+    def write(self, table, rows):
+        if not rows:
+            return 0
+        columns = TABLE_COLUMNS[table]
+        cursor = self.conn.cursor()
+        try:
+            if self.method == 'load':
+                self._load(cursor, table, columns, rows)
+            else:
+                sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+                for i in range(0, len(rows), self.batch_size):
+                    cursor.executemany(sql, rows[i:i + self.batch_size])
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            cursor.close()
+        return len(rows)
+
+    def _load(self, cursor, table, columns, rows):
+        fd, path = tempfile.mkstemp(prefix=f'pms_{table}_', suffix='.tsv')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8', newline='\n') as f:
+                for row in rows:
+                    f.write('\t'.join(_tsv_value(v) for v in row))
+                    f.write('\n')
+            cursor.execute(
+                f"LOAD DATA LOCAL INFILE %s INTO TABLE {table} CHARACTER SET utf8mb4 "
+                f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' ({', '.join(columns)})",
+                (path,)
+            )
+        finally:
+            os.remove(path)
+
+
+class DataGenerator(object):
+    """测试数据生成器，generate() 依次生成各表"""
+
+    def __init__(self, conn, seed=42, employees=10000, projects=5000, reports=50000000, logs=1000000,
+                 sessions=20000, departments=40, start_date=None, end_date=None, password='Passw0rd!',
+                 method='load', batch_size=5000):
+        self.conn = conn
+        self.seed = seed
+        self.counts = {'departments': departments, 'employees': employees, 'projects': projects,
+                       'work_reports': reports, 'operation_logs': logs, 'user_sessions': sessions}
+        self.end_date = end_date or date.today()
+        self.start_date = start_date or self.end_date - timedelta(days=5 * 365)
+        self.password = password
+        self.writer = BulkWriter(conn, method, batch_size)
+        self.workdays = _workdays(self.start_date, self.end_date)
+        self.department_ids = []
+        self.employees = []          # (id, name, hire_date, status)
+        self.manager_ids = []
+        self.projects = []           # (id, start_date, end_date)
+        self.memberships = {}        # employee_id -> [(project_id, member_start, member_end), ...]
+
+    # ---------- 辅助 ----------
+
+    def _query(self, sql, params=None):
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def _next_id(self, table):
+        return (self._query(f"SELECT COALESCE(MAX(id), 0) FROM {table}")[0][0] or 0) + 1
+
+    def _random_datetime(self, rng, day):
+        return datetime.combine(day, datetime.min.time()) + timedelta(seconds=rng.randint(8 * 3600, 22 * 3600))
+
+    def _log(self, message):
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] {message}")
+        sys.stdout.flush()
+
+    # ---------- 各表 ----------
+
+    def generate_departments(self):
+        rng = _rng(self.seed, 'departments')
+        existing = {row[0] for row in self._query("SELECT dept_name FROM departments")}
+        names = [p + s for p in DEPARTMENT_PREFIXES for s in DEPARTMENT_SUFFIXES]
+        rng.shuffle(names)
+        names = [name for name in names if name not in existing][:self.counts['departments']]
+        next_id = self._next_id('departments')
+        rows = [(next_id + i, name) for i, name in enumerate(names)]
+        self.writer.write('departments', rows)
+        self.department_ids = [row[0] for row in rows] or \
+            [row[0] for row in self._query("SELECT id FROM departments ORDER BY id")]
+        self._log(f"departments: {len(rows)} 行")
+
+    def generate_employees(self):
+        rng = _rng(self.seed, 'employees')
+        roles = self._query("SELECT id, role_name, role_code FROM roles WHERE status = 1 ORDER BY id")
+        role_choices = [r for r in roles if ROLE_WEIGHTS.get(r[2], 1) > 0]
+        role_weights = [ROLE_WEIGHTS.get(r[2], 1) for r in role_choices]
+        used_names = {row[0] for row in self._query("SELECT name FROM employees")}
+        # 与 app.hash_password 相同的格式，所有生成的员工使用同一密码
+        salt = '%032x' % rng.getrandbits(128)
+        password_hash = f"{salt}:{hashlib.sha256((self.password + salt).encode()).hexdigest()}"
+
+        next_id = self._next_id('employees')
+        rows = []
+        for i in range(self.counts['employees']):
+            name = rng.choice(SURNAMES) + ''.join(rng.choice(GIVEN_CHARS) for _ in range(rng.choice((1, 2, 2))))
+            base, n = name, 2
+            while name in used_names:
+                name = f"{base}{n}"
+                n += 1
+            used_names.add(name)
+            employee_id = next_id + i
+            role = rng.choices(role_choices, role_weights)[0] if role_choices else None
+            hire_date = self.start_date - timedelta(days=rng.randint(0, 3650)) if rng.random() < 0.6 \
+                else rng.choice(self.workdays)
+            created_at = self._random_datetime(rng, hire_date)
+            status = 1 if rng.random() < 0.95 else 0
+            rows.append((
+                employee_id, name, role[1] if role else None, role[0] if role else None,
+                rng.choice(self.department_ids) if self.department_ids else None,
+                f"emp{employee_id:06d}@example.com", password_hash, status,
+                hire_date, created_at, created_at,
+            ))
+            self.employees.append((employee_id, name, hire_date, status))
+            if role and role[2] == 'project_manager':
+                self.manager_ids.append(employee_id)
+        for i in range(0, len(rows), GENERATE_CHUNK):
+            self.writer.write('employees', rows[i:i + GENERATE_CHUNK])
+        if not self.manager_ids:
+            self.manager_ids = [e[0] for e in self.employees[:max(1, len(self.employees) // 20)]]
+        self._log(f"employees: {len(rows)} 行（登录密码 {self.password}）")
+
+    def generate_projects(self):
+        """项目与成员，projects.total_budget_days / member_count 按生成的成员直接写入"""
+        rng = _rng(self.seed, 'projects')
+        employee_ids = [e[0] for e in self.employees]
+        next_id = self._next_id('projects')
+        existing_seqs = dict(self._query("SELECT year_suffix, last_seq FROM project_code_sequences"))
+        seqs = {}
+        projects, members = [], []
+        for i in range(self.counts['projects']):
+            project_id = next_id + i
+            start = rng.choice(self.workdays)
+            end = min(self.end_date, start + timedelta(days=rng.randint(60, 720)))
+            status = 'Completed' if end < self.end_date and rng.random() < 0.8 else 'Active'
+            project_type = rng.choice((1, 2, 2, 2, 3, 4))
+            phase_type = 'T' if project_type == 4 else {1: 'P', 2: 'D', 3: 'O'}[project_type]
+            year_suffix = start.strftime('%y')
+            seq = seqs[year_suffix] = seqs.get(year_suffix, int(existing_seqs.get(year_suffix, 0))) + 1
+            annual_seq = f"{year_suffix}{str(seq).zfill(2)}"
+            bu, category = rng.choice(BUSINESS_UNITS), rng.choice(PROJECT_CATEGORIES)
+            client = f"C{rng.randint(1, 300):03d}"
+
+            team = rng.sample(employee_ids, min(len(employee_ids), rng.randint(2, 15)))
+            total_budget = 0
+            for employee_id in team:
+                member_start = start + timedelta(days=rng.randint(0, 30))
+                member_end = end if end > member_start else member_start
+                budget_days = rng.choice((5, 10, 20, 30, 60, 90, 120))
+                total_budget += budget_days
+                members.append((project_id, employee_id, rng.choice(MEMBER_ROLES), member_start,
+                                member_end, budget_days))
+                self.memberships.setdefault(employee_id, []).append((project_id, member_start, member_end))
+
+            created_at = self._random_datetime(rng, start)
+            projects.append((
+                project_id, f"{bu}-{category}-{client}-{annual_seq}-{phase_type}",
+                f"{bu}-{rng.choice(PROJECT_TOPICS)}{rng.choice(PHASES)}", status, project_type,
+                rng.choice(self.manager_ids), category, bu, client, year_suffix, annual_seq, phase_type,
+                total_budget, len(team), created_at, created_at,
+            ))
+            self.projects.append((project_id, start, end))
+
+        # 没分到项目的员工补进入职后仍在进行的随机项目，保证每人都能报工
+        project_by_id = {p[0]: i for i, p in enumerate(projects)}
+        for employee_id, _, hire_date, _ in self.employees:
+            if employee_id in self.memberships or not self.projects:
+                continue
+            open_projects = [p for p in self.projects if p[2] >= hire_date] or self.projects
+            project_id, start, end = rng.choice(open_projects)
+            budget_days = rng.choice((5, 10, 20))
+            members.append((project_id, employee_id, rng.choice(MEMBER_ROLES), start, end, budget_days))
+            self.memberships[employee_id] = [(project_id, start, end)]
+            row = list(projects[project_by_id[project_id]])
+            row[12] += budget_days
+            row[13] += 1
+            projects[project_by_id[project_id]] = tuple(row)
+
+        for i in range(0, len(projects), GENERATE_CHUNK):
+            self.writer.write('projects', projects[i:i + GENERATE_CHUNK])
+        for i in range(0, len(members), GENERATE_CHUNK):
+            self.writer.write('project_members', members[i:i + GENERATE_CHUNK])
+
+        cursor = self.conn.cursor()
+        try:
+            cursor.executemany("""
+                INSERT INTO project_code_sequences (year_suffix, last_seq) VALUES (%s, %s)
+                ON DUPLICATE KEY UPDATE last_seq = GREATEST(last_seq, VALUES(last_seq))
+            """, list(seqs.items()))
+            self.conn.commit()
+        finally:
+            cursor.close()
+        self._log(f"projects: {len(projects)} 行，project_members: {len(members)} 行")
+
+    def _report_windows(self):
+        """在职员工可报工的 (项目ID, 工作日下标起, 工作日下标止) 列表：成员起止日期与入职日期的交集"""
+        workdays = self.workdays
+        windows = {}
+        for employee_id, _, hire_date, status in self.employees:
+            if status != 1:
+                continue
+            spans = []
+            for project_id, member_start, member_end in self.memberships.get(employee_id, ()):
+                lo = bisect.bisect_left(workdays, max(member_start, hire_date))
+                hi = bisect.bisect_right(workdays, member_end)
+                if lo < hi:
+                    spans.append((project_id, lo, hi))
+            if spans:
+                windows[employee_id] = spans
+        return windows
+
+    def generate_work_reports(self):
+        """报工按在职员工均匀分布，项目取自该员工参与的项目，日期为成员期间内、入职之后的工作日
+        同一员工的多个项目按可报工天数加权
+        """
+        rng = _rng(self.seed, 'work_reports')
+        windows = self._report_windows()
+        if not windows:
+            self._log("work_reports: 没有可报工的在职员工，跳过")
+            return
+        employee_ids = list(windows)
+        cum_weights = {employee_id: list(itertools.accumulate(hi - lo for _, lo, hi in spans))
+                       for employee_id, spans in windows.items()}
+        workdays = self.workdays
+        total = self.counts['work_reports']
+        written = 0
+        started = time.perf_counter()
+        while written < total:
+            n = min(GENERATE_CHUNK, total - written)
+            chosen = rng.choices(employee_ids, k=n)
+            hours = rng.choices(HOURS_CHOICES, k=n)
+            statuses = rng.choices(REPORT_STATUSES, REPORT_STATUS_WEIGHTS, k=n)
+            tasks = rng.choices(TASKS, k=n)
+            rows = []
+            for employee_id, hour, status, task in zip(chosen, hours, statuses, tasks):
+                project_id, lo, hi = rng.choices(windows[employee_id], cum_weights=cum_weights[employee_id])[0]
+                day = workdays[rng.randrange(lo, hi)]
+                created_at = datetime.combine(day, datetime.min.time()) + timedelta(hours=18, seconds=rng.randint(0, 14400))
+                rows.append((employee_id, project_id, task, hour, day, status, created_at))
+            written += self.writer.write('work_reports', rows)
+            elapsed = time.perf_counter() - started
+            self._log(f"work_reports: {written}/{total}（{written / elapsed:.0f} 行/秒）")
+
+    def generate_operation_logs(self):
+        rng = _rng(self.seed, 'operation_logs')
+        names = [e[1] for e in self.employees]
+        total = self.counts['operation_logs']
+        written = 0
+        while written < total:
+            n = min(GENERATE_CHUNK, total - written)
+            rows = [
+                (self._random_datetime(rng, day), name, op)
+                for day, name, op in zip(rng.choices(self.workdays, k=n), rng.choices(names, k=n),
+                                         rng.choices(OPERATIONS, k=n))
+            ]
+            written += self.writer.write('operation_logs', rows)
+        self._log(f"operation_logs: {written} 行")
+
+    def generate_user_sessions(self):
+        """会话创建时间分布在截止日期前 30 天内，有效期 24 小时"""
+        rng = _rng(self.seed, 'user_sessions')
+        employee_ids = [e[0] for e in self.employees]
+        rows = []
+        for _ in range(self.counts['user_sessions']):
+            created_at = datetime.combine(self.end_date, datetime.min.time()) - timedelta(seconds=rng.randint(0, 30 * 86400))
+            rows.append((
+                rng.choice(employee_ids), '%064x' % rng.getrandbits(256), created_at + timedelta(hours=24),
+                f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+                rng.choice(USER_AGENTS), created_at,
+            ))
+        for i in range(0, len(rows), GENERATE_CHUNK):
+            self.writer.write('user_sessions', rows[i:i + GENERATE_CHUNK])
+        self._log(f"user_sessions: {len(rows)} 行")
+
+    def rebuild_rollup(self):
+        """按月重建报工日汇总表，避免单个大事务"""
+        import rollup
+
+        month = self.start_date.replace(day=1)
+        total = 0
+        while month <= self.end_date:
+            next_month = (month + timedelta(days=32)).replace(day=1)
+            total += rollup.rebuild(self.conn, month, next_month - timedelta(days=1))
+            month = next_month
+        self._log(f"work_report_daily_rollup: 重建 {total} 行")
+
+    def generate(self, rebuild_rollup=True):
+        cursor = self.conn.cursor()
+        try:
+            # 仅作用于本会话：导入期间跳过外键与唯一性检查（生成的数据本身保证一致）
+            cursor.execute("SET SESSION foreign_key_checks = 0")
+            cursor.execute("SET SESSION unique_checks = 0")
+        finally:
+            cursor.close()
+        started = time.perf_counter()
+        self._log(f"种子 {self.seed}，日期范围 {self.start_date} ~ {self.end_date}，导入方式 {self.writer.method}")
+        self.generate_departments()
+        self.generate_employees()
+        self.generate_projects()
+        self.generate_work_reports()
+        self.generate_operation_logs()
+        self.generate_user_sessions()
+        if rebuild_rollup and self.counts['work_reports']:
+            self.rebuild_rollup()
+        self._log(f"全部完成，用时 {time.perf_counter() - started:.0f}s，建议执行 ANALYZE TABLE 更新统计信息")
+
+
+def _parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成大规模测试数据（本地压测用）')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子（默认42）')
+    parser.add_argument('--departments', type=int, default=40)
+    parser.add_argument('--employees', type=int, default=10000)
+    parser.add_argument('--projects', type=int, default=5000)
+    parser.add_argument('--reports', type=int, default=50000000, help='work_reports 行数')
+    parser.add_argument('--logs', type=int, default=1000000, help='operation_logs 行数')
+    parser.add_argument('--sessions', type=int, default=20000, help='user_sessions 行数')
+    parser.add_argument('--start-date', type=_parse_date, help='报工开始日期 YYYY-MM-DD（默认截止日期前5年）')
+    parser.add_argument('--end-date', type=_parse_date, help='报工截止日期 YYYY-MM-DD（默认今天，复现时需指定）')
+    parser.add_argument('--password', default='Passw0rd!', help='生成员工的登录密码')
+    parser.add_argument('--method', choices=['load', 'insert'], default='load',
+                        help='load: LOAD DATA LOCAL INFILE（默认），insert: 批量多行 INSERT')
+    parser.add_argument('--batch-size', type=int, default=5000, help='insert 模式每批行数')
+    parser.add_argument('--skip-rollup', action='store_true', help='不重建报工日汇总表')
+    args = parser.parse_args()
+
+    if args.employees < 1 or args.projects < 1:
+        print("--employees 与 --projects 至少为1")
+        return 1
+
+    import mysql.connector
+    from config import DB_CONFIG
+
+    options = dict(DB_CONFIG)
+    if args.method == 'load':
+        options['allow_local_infile'] = True
+    conn = mysql.connector.connect(**options)
+    try:
+        DataGenerator(
+            conn, seed=args.seed, employees=args.employees, projects=args.projects, reports=args.reports,
+            logs=args.logs, sessions=args.sessions, departments=args.departments, start_date=args.start_date,
+            end_date=args.end_date, password=args.password, method=args.method, batch_size=args.batch_size,
+        ).generate(rebuild_rollup=not args.skip_rollup)
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
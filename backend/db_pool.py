@@ -0,0 +1,347 @@
+"""
+MySQL 连接池
+所有路由通过 get_db_connection() 透明使用，close() 时归还连接池而不是断开
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+import mysql.connector
+from mysql.connector import Error
+from mysql.connector.errors import PoolError
+
+from config import DB_CONFIG
+
+logger = logging.getLogger('pms.db_pool')
+
+# 连接池默认配置，可在 config.py 中通过 DB_POOL_CONFIG 覆盖
+DEFAULT_POOL_CONFIG = {
+    'min_size': 2,              # 常驻最小连接数
+    'max_size': 20,             # 最大物理连接数（需小于MySQL max_connections）
+    'checkout_timeout': 10,     # 获取连接的最长等待时间（秒）
+    'idle_timeout': 300,        # 空闲超过该时间的连接会被回收（秒）
+    'max_lifetime': 3600,       # 物理连接最长存活时间，超过后重建（秒）
+    'ping_interval': 10,        # 空闲超过该时间的连接在借出前先ping（秒）
+    'reap_interval': 30,        # 后台回收线程的检查周期（秒）
+    'session_init': ["SET time_zone = '+08:00'"],  # 每个物理连接只执行一次
+}
+
+try:
+    from config import DB_POOL_CONFIG as _USER_POOL_CONFIG
+except ImportError:
+    _USER_POOL_CONFIG = {}
+
+
+class _PoolEntry(object):
+    """池中的一个物理连接及其时间戳"""
+
+    __slots__ = ('conn', 'created_at', 'last_used')
+
+    def __init__(self, conn):
+        now = time.monotonic()
+        self.conn = conn
+        self.created_at = now
+        self.last_used = now
+
+
+class PooledConnection(object):
+    """借出的连接代理，其余属性全部委托给底层连接，close() 时归还连接池"""
+
+    def __init__(self, pool, entry):
+        self._pool = pool
+        self._entry = entry
+        self._released = False
+
+    def __getattr__(self, name):
+        return getattr(self._entry.conn, name)
+
+    def close(self):
+        if self._released:
+            return
+        self._released = True
+        self._pool.release(self._entry)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class ConnectionPool(object):
+    """有界连接池：最小/最大连接数、借出超时、空闲回收、生命周期回收、借出前存活检测"""
+
+    def __init__(self, db_config, min_size=2, max_size=20, checkout_timeout=10,
+                 idle_timeout=300, max_lifetime=3600, ping_interval=10,
+                 reap_interval=30, session_init=None):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError('连接池大小配置无效: min_size=%s, max_size=%s' % (min_size, max_size))
+        self.db_config = dict(db_config)
+        self.min_size = min_size
+        self.max_size = max_size
+        self.checkout_timeout = checkout_timeout
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.ping_interval = ping_interval
+        self.reap_interval = reap_interval
+        self.session_init = list(session_init or [])
+
+        self._cond = threading.Condition(threading.Lock())
+        self._idle = deque()
+        self._size = 0          # 物理连接总数（空闲 + 借出 + 创建中）
+        self._in_use = 0
+        self._waiting = 0
+        self._closed = False
+        self._reaper = None
+        self._stats = {
+            'created': 0,
+            'closed': 0,
+            'checkouts': 0,
+            'timeouts': 0,
+            'ping_failures': 0,
+            'recycled_lifetime': 0,
+            'reaped_idle': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+        }
+
+    # ---------- 物理连接 ----------
+
+    def _connect(self):
+        conn = mysql.connector.connect(**self.db_config)
+        try:
+            cursor = conn.cursor()
+            for statement in self.session_init:
+                cursor.execute(statement)
+            cursor.close()
+        except Error:
+            conn.close()
+            raise
+        return _PoolEntry(conn)
+
+    def _discard(self, entry):
+        """关闭物理连接并释放名额（调用方不得持有锁）"""
+        try:
+            entry.conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._stats['closed'] += 1
+            self._cond.notify()
+
+    def _is_usable(self, entry, now):
+        """借出前检查：生命周期与存活性"""
+        if self.max_lifetime and now - entry.created_at > self.max_lifetime:
+            with self._cond:
+                self._stats['recycled_lifetime'] += 1
+            return False
+        if now - entry.last_used >= self.ping_interval:
+            try:
+                entry.conn.ping(reconnect=False)
+            except Error:
+                with self._cond:
+                    self._stats['ping_failures'] += 1
+                return False
+        return True
+
+    # ---------- 借出 / 归还 ----------
+
+    def acquire(self, timeout=None):
+        """借出一个连接，超时抛出 PoolError"""
+        self._ensure_reaper()
+        timeout = self.checkout_timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        while True:
+            entry = None
+            create = False
+            with self._cond:
+                if self._closed:
+                    raise PoolError('连接池已关闭')
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolError('获取数据库连接超时（%.1fs），连接池已满: %d' % (timeout, self.max_size))
+                    self._waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+                if self._idle:
+                    # LIFO：优先复用最近使用过的连接，让多余连接自然空闲到被回收
+                    entry = self._idle.pop()
+                else:
+                    self._size += 1
+                    create = True
+
+            if create:
+                try:
+                    entry = self._connect()
+                except Error:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._stats['created'] += 1
+            elif not self._is_usable(entry, time.monotonic()):
+                self._discard(entry)
+                continue
+
+            waited = time.monotonic() - started
+            with self._cond:
+                self._in_use += 1
+                self._stats['checkouts'] += 1
+                self._stats['wait_time_total'] += waited
+                if waited > self._stats['wait_time_max']:
+                    self._stats['wait_time_max'] = waited
+            return PooledConnection(self, entry)
+
+    def release(self, entry):
+        """归还连接：回滚未提交事务，不可复用的连接直接关闭
+        只检查驱动的本地状态，不额外 ping；存活性由借出时按空闲时长 ping 检测，回滚出错即关闭
+        """
+        with self._cond:
+            self._in_use -= 1
+        conn = entry.conn
+        reusable = not self._closed
+        if reusable:
+            try:
+                if getattr(conn, 'unread_result', False):
+                    reusable = False
+                elif conn.in_transaction:
+                    conn.rollback()
+            except Error:
+                reusable = False
+        if reusable and self.max_lifetime and time.monotonic() - entry.created_at > self.max_lifetime:
+            reusable = False
+            with self._cond:
+                self._stats['recycled_lifetime'] += 1
+        if not reusable:
+            self._discard(entry)
+            return
+        entry.last_used = time.monotonic()
+        with self._cond:
+            self._idle.append(entry)
+            self._cond.notify()
+
+    # ---------- 后台维护 ----------
+
+    def _ensure_reaper(self):
+        if self._reaper is not None or self.reap_interval <= 0:
+            return
+        with self._cond:
+            if self._reaper is not None:
+                return
+            self._reaper = threading.Thread(target=self._reap_loop, name='db-pool-reaper', daemon=True)
+            self._reaper.start()
+
+    def _reap_loop(self):
+        while not self._closed:
+            time.sleep(self.reap_interval)
+            try:
+                self.reap()
+            except Exception as e:
+                logger.exception('回收线程异常: %s', e)
+
+    def reap(self):
+        """回收空闲超时/超过生命周期的连接，并补足最小连接数"""
+        now = time.monotonic()
+        expired = []
+        with self._cond:
+            keep = deque()
+            # 从最久未使用的一端开始检查
+            while self._idle:
+                entry = self._idle.popleft()
+                too_old = self.max_lifetime and now - entry.created_at > self.max_lifetime
+                too_idle = (self.idle_timeout and now - entry.last_used > self.idle_timeout
+                            and self._size - len(expired) > self.min_size)
+                if too_old or too_idle:
+                    expired.append(entry)
+                    if too_old:
+                        self._stats['recycled_lifetime'] += 1
+                    else:
+                        self._stats['reaped_idle'] += 1
+                else:
+                    keep.append(entry)
+            self._idle = keep
+        for entry in expired:
+            self._discard(entry)
+        self.fill()
+
+    def fill(self):
+        """预热：补足到 min_size 个物理连接"""
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                entry = self._connect()
+            except Error as e:
+                with self._cond:
+                    self._size -= 1
+                logger.warning('预建连接失败: %s', e)
+                return
+            with self._cond:
+                self._stats['created'] += 1
+                self._idle.appendleft(entry)
+                self._cond.notify()
+
+    def close_all(self):
+        """关闭连接池，空闲连接立即关闭，借出的连接归还时关闭"""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+        for entry in idle:
+            self._discard(entry)
+
+    def stats(self):
+        with self._cond:
+            data = dict(self._stats)
+            data.update({
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'waiting': self._waiting,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+            })
+        checkouts = data['checkouts']
+        data['wait_time_avg'] = data['wait_time_total'] / checkouts if checkouts else 0.0
+        return data
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """返回进程内唯一的连接池（fork 之后的子进程会重新创建自己的连接池）"""
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is not None and _pool_pid == pid:
+        return _pool
+    with _pool_lock:
+        if _pool is None or _pool_pid != pid:
+            options = dict(DEFAULT_POOL_CONFIG)
+            options.update(_USER_POOL_CONFIG)
+            _pool = ConnectionPool(DB_CONFIG, **options)
+            _pool_pid = pid
+    return _pool
+
+
+def pool_stats():
+    """连接池统计信息（未创建时返回空字典）"""
+    if _pool is None or _pool_pid != os.getpid():
+        return {}
+    return _pool.stats()
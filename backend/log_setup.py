@@ -0,0 +1,210 @@
+"""
+结构化日志
+请求线程只把日志记录放入有界队列，由后台线程格式化并写出（标准错误或文件），队列满时丢弃并计数，不阻塞请求；
+每条日志带请求ID（见 app.py 的 X-Request-ID），格式为 JSON Lines 或单行文本；
+各模块使用 pms.<模块名> 命名的记录器，级别可按模块单独配置，高频的 DEBUG 日志可按比例采样。
+"""
+
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timedelta, timezone
+from logging.handlers import QueueHandler, QueueListener, WatchedFileHandler
+
+# 默认配置，可在 config.py 中通过 LOGGING_CONFIG 覆盖
+DEFAULT_LOGGING_CONFIG = {
+    'level': 'INFO',                # 根级别
+    'levels': {},                   # 按记录器单独设置级别，如 {'pms.db': 'DEBUG', 'werkzeug': 'WARNING'}
+    'format': 'json',               # json 或 text
+    'path': None,                   # 日志文件路径，None 时写标准错误
+    'max_queue': 10000,             # 内存队列上限，满了丢弃
+    'sample_rates': {'pms.db': 0.01},   # DEBUG 日志采样比例（按记录器名前缀匹配）
+}
+
+try:
+    from config import LOGGING_CONFIG as _USER_LOGGING_CONFIG
+except ImportError:
+    _USER_LOGGING_CONFIG = {}
+
+# 与数据库会话时区一致（东八区）
+BEIJING_TZ = timezone(timedelta(hours=8))
+
+# 当前请求ID，请求开始时由应用设置
+request_id_var = contextvars.ContextVar('request_id', default=None)
+
+# LogRecord 自带的属性，其余通过 extra 传入的字段作为结构化字段输出
+_RESERVED = frozenset(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'request_id'}
+
+
+def _extra_fields(record):
+    return {key: value for key, value in vars(record).items() if key not in _RESERVED}
+
+
+def _timestamp(record):
+    return datetime.fromtimestamp(record.created, BEIJING_TZ).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志一行 JSON：time / level / logger / request_id / message 以及 extra 字段"""
+
+    def format(self, record):
+        entry = {
+            'time': _timestamp(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'pid': record.process,
+        }
+        if record.request_id:
+            entry['request_id'] = record.request_id
+        entry['message'] = record.getMessage()
+        entry.update(_extra_fields(record))
+        if record.exc_text:
+            entry['exc_info'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """单行文本：时间 级别 [记录器] [请求ID] 消息 key=value ..."""
+
+    def format(self, record):
+        parts = [_timestamp(record), record.levelname, f'[{record.name}]']
+        if record.request_id:
+            parts.append(f'[{record.request_id}]')
+        parts.append(record.getMessage())
+        parts.extend(f'{key}={value}' for key, value in _extra_fields(record).items())
+        line = ' '.join(parts)
+        if record.exc_text:
+            line += '\n' + record.exc_text
+        return line
+
+
+class ContextFilter(logging.Filter):
+    """在请求线程中给日志记录附上请求ID（入队前执行，后台线程中已取不到）"""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """DEBUG 日志按记录器名前缀的比例采样，其余级别全部保留"""
+
+    def __init__(self, rates):
+        super(SamplingFilter, self).__init__()
+        # 长前缀优先匹配
+        self.rates = sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG:
+            return True
+        for prefix, rate in self.rates:
+            if record.name == prefix or record.name.startswith(prefix + '.'):
+                return rate >= 1 or random.random() < rate
+        return True
+
+
+class AsyncQueueHandler(QueueHandler):
+    """非阻塞日志处理器：入队即返回，队列满时丢弃；后台线程在 fork 后的子进程中按需重建"""
+
+    def __init__(self, handlers, max_queue=10000):
+        super(AsyncQueueHandler, self).__init__(queue.Queue(maxsize=max_queue))
+        self.handlers = handlers
+        self._listener = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self.dropped = 0
+
+    def prepare(self, record):
+        """入队前把消息和异常栈转成字符串（参数对象与 traceback 不跨线程传递）"""
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        self._ensure_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_listener(self):
+        pid = os.getpid()
+        if self._listener is not None and self._pid == pid:
+            return
+        with self._start_lock:
+            if self._listener is not None and self._pid == pid:
+                return
+            if self._pid is not None and self._pid != pid:
+                # fork 出的子进程不继承父进程的线程，丢弃继承来的队列
+                self.queue = queue.Queue(maxsize=self.queue.maxsize)
+            self._pid = pid
+            self._listener = QueueListener(self.queue, *self.handlers, respect_handler_level=True)
+            self._listener.start()
+
+    def flush(self):
+        """写完队列中的日志（进程退出前调用）"""
+        with self._start_lock:
+            listener = self._listener
+            if listener is None or self._pid != os.getpid():
+                return
+            self._listener = None
+        listener.stop()
+        for handler in self.handlers:
+            handler.flush()
+
+    def close(self):
+        self.flush()
+        super(AsyncQueueHandler, self).close()
+
+
+_handler = None
+
+
+def setup_logging(**overrides):
+    """配置根记录器（重复调用只生效一次），返回异步处理器"""
+    global _handler
+    if _handler is not None:
+        return _handler
+    options = dict(DEFAULT_LOGGING_CONFIG)
+    options.update(_USER_LOGGING_CONFIG)
+    options.update(overrides)
+
+    target = WatchedFileHandler(options['path'], encoding='utf-8') if options['path'] else logging.StreamHandler(sys.stderr)
+    target.setFormatter(TextFormatter() if options['format'] == 'text' else JsonFormatter())
+
+    handler = AsyncQueueHandler([target], max_queue=options['max_queue'])
+    handler.addFilter(ContextFilter())
+    if options['sample_rates']:
+        handler.addFilter(SamplingFilter(options['sample_rates']))
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(options['level'])
+    for name, level in options['levels'].items():
+        logging.getLogger(name).setLevel(level)
+    logging.captureWarnings(True)
+    atexit.register(handler.flush)
+    _handler = handler
+    return handler
+
+
+def flush_logging():
+    if _handler is not None:
+        _handler.flush()
+
+
+def logging_stats():
+    if _handler is None:
+        return {'configured': False}
+    return {'configured': True, 'queued': _handler.queue.qsize(), 'dropped': _handler.dropped}
@@ -0,0 +1,104 @@
+"""
+角色权限编译与缓存
+每个角色的 permissions JSON 只解析一次，编译为不可变的权限键集合（如 'navigation.timesheet'），
+判断权限时只做集合查找，不访问数据库
+"""
+
+import copy
+import json
+import threading
+import time
+from collections import namedtuple
+
+# 所有用户必须拥有的权限
+MANDATORY_PERMISSIONS = ('navigation.timesheet',)
+
+CompiledPermissions = namedtuple('CompiledPermissions', ['role_id', 'role_name', 'keys', 'tree'])
+CompiledPermissions.__doc__ = """编译后的角色权限：keys 为 frozenset 权限键，tree 为返回给前端的权限树（只读）"""
+
+
+def _parse(value):
+    if not value:
+        return {}
+    if isinstance(value, (bytes, bytearray)):
+        value = value.decode('utf-8')
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except (json.JSONDecodeError, TypeError):
+            return {}
+    return value if isinstance(value, (dict, list)) else {}
+
+
+def _flatten(tree, prefix, keys):
+    for name, value in tree.items():
+        key = f"{prefix}.{name}" if prefix else str(name)
+        if isinstance(value, dict):
+            _flatten(value, key, keys)
+        elif value:
+            keys.add(key)
+
+
+def compile_permissions(value, role_id=None, role_name=None):
+    """编译 roles.permissions 字段
+    支持两种格式：{"navigation": {"timesheet": true, ...}} 以及早期的 ["timesheet", ...]（视为导航权限）
+    """
+    parsed = _parse(value)
+    if isinstance(parsed, list):
+        tree = {'navigation': {str(name): True for name in parsed}}
+    else:
+        tree = copy.deepcopy(parsed)
+    for key in MANDATORY_PERMISSIONS:
+        node = tree
+        parts = key.split('.')
+        for part in parts[:-1]:
+            if not isinstance(node.get(part), dict):
+                node[part] = {}
+            node = node[part]
+        node[parts[-1]] = True
+    keys = set()
+    _flatten(tree, '', keys)
+    return CompiledPermissions(role_id, role_name, frozenset(keys), tree)
+
+
+class RolePermissionCache(object):
+    """角色权限缓存：首次访问时一次性加载全部角色，角色增删改时整体失效
+
+    loader() 返回 (role_id, role_name, permissions) 的可迭代对象；
+    ttl 用于多进程部署时兜底，其他进程修改角色后最迟 ttl 秒内生效。
+    """
+
+    def __init__(self, loader, ttl=300):
+        self._loader = loader
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._roles = None
+        self._loaded_at = 0.0
+        self._default = compile_permissions(None)
+
+    def _snapshot(self):
+        roles = self._roles
+        if roles is not None and time.monotonic() - self._loaded_at < self.ttl:
+            return roles
+        with self._lock:
+            if self._roles is None or time.monotonic() - self._loaded_at >= self.ttl:
+                compiled = {}
+                for role_id, role_name, permissions in self._loader():
+                    compiled[role_id] = compile_permissions(permissions, role_id, role_name)
+                self._roles = compiled
+                self._loaded_at = time.monotonic()
+            return self._roles
+
+    def get(self, role_id):
+        """返回角色的 CompiledPermissions；无角色或角色不存在时返回仅含必备权限的默认值"""
+        if role_id is None:
+            return self._default
+        return self._snapshot().get(role_id, self._default)
+
+    def warm(self):
+        """预先加载全部角色"""
+        self._snapshot()
+
+    def invalidate(self):
+        with self._lock:
+            self._roles = None
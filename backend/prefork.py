@@ -0,0 +1,239 @@
+"""
+生产模式多进程运行器（仅支持 Unix）
+主进程只负责监听端口和管理子进程，不导入 Flask 应用；每个子进程 fork 后自行导入应用、
+预热连接池与缓存，然后在共享的监听套接字上以多线程方式处理请求。
+
+信号:
+    SIGTERM / SIGINT   优雅停止：子进程停止接收新连接，处理完进行中的请求后退出
+    SIGHUP             平滑重载：逐个替换子进程，新进程重新导入应用代码
+子进程处理满 max_requests 个请求后自行优雅退出，由主进程补充新进程（防止内存缓慢增长）。
+"""
+
+import os
+import random
+import signal
+import socket
+import sys
+import threading
+import time
+
+# 子进程启动后过快退出（秒）时，主进程放慢重建速度，避免导入失败时反复 fork
+MIN_WORKER_LIFETIME = 1.0
+
+
+class _RequestTracker(object):
+    """WSGI 中间件：统计已处理与进行中的请求数，达到 max_requests 时通知子进程退出"""
+
+    def __init__(self, app, max_requests, on_limit):
+        self.app = app
+        self.max_requests = max_requests
+        self.on_limit = on_limit
+        self.served = 0
+        self.inflight = 0
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+
+    def __call__(self, environ, start_response):
+        with self._lock:
+            self.served += 1
+            self.inflight += 1
+            reached = self.max_requests and self.served == self.max_requests
+        if reached:
+            self.on_limit()
+        try:
+            result = self.app(environ, start_response)
+        except BaseException:
+            self._finished()
+            raise
+        return self._iterate(result)
+
+    def _iterate(self, result):
+        try:
+            for chunk in result:
+                yield chunk
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+            self._finished()
+
+    def _finished(self):
+        with self._lock:
+            self.inflight -= 1
+            if self.inflight == 0:
+                self._idle.notify_all()
+
+    def wait_idle(self, timeout):
+        """等待进行中的请求处理完，返回是否全部完成"""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while self.inflight > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+
+class PreforkServer(object):
+    """预派生多进程 WSGI 服务
+
+    load_app()       子进程中调用，返回 WSGI 应用（在此处导入应用模块）
+    warm_up()        子进程接收请求前调用，预热连接池与缓存
+    on_exit()        子进程退出前调用，如写完操作日志队列、关闭连接池
+    """
+
+    def __init__(self, load_app, host='0.0.0.0', port=5001, workers=None, max_requests=10000,
+                 max_requests_jitter=1000, graceful_timeout=30, backlog=1024,
+                 warm_up=None, on_exit=None):
+        self.load_app = load_app
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.graceful_timeout = graceful_timeout
+        self.backlog = backlog
+        self.warm_up = warm_up
+        self.on_exit = on_exit
+        self._sock = None
+        self._children = {}      # pid -> 启动时间
+        self._stopping = False
+        self._reload_pending = []
+
+    # ---------- 主进程 ----------
+
+    def run(self):
+        if not hasattr(os, 'fork'):
+            raise RuntimeError('生产模式多进程运行需要 Unix 系统（os.fork）')
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((self.host, self.port))
+        self._sock.listen(self.backlog)
+        self._sock.set_inheritable(True)
+
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGHUP, self._handle_reload)
+
+        print(f"[PREFORK] 主进程 {os.getpid()} 监听 {self.host}:{self.port}，启动 {self.workers} 个工作进程")
+        try:
+            while not self._stopping:
+                self._reap()
+                self._replace_one_for_reload()
+                while len(self._children) < self.workers and not self._stopping:
+                    self._spawn()
+                time.sleep(0.5)
+        finally:
+            self._shutdown_children()
+            self._sock.close()
+        print("[PREFORK] 已停止")
+
+    def _handle_stop(self, signum, frame):
+        self._stopping = True
+
+    def _handle_reload(self, signum, frame):
+        print("[PREFORK] 收到 SIGHUP，逐个重启工作进程")
+        self._reload_pending = list(self._children)
+
+    def _spawn(self):
+        sys.stdout.flush()
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                self._run_worker()
+            except SystemExit as e:
+                code = e.code if isinstance(e.code, int) else 1
+            except BaseException as e:
+                print(f"[PREFORK] 工作进程 {os.getpid()} 异常退出: {e}")
+                code = 1
+            finally:
+                os._exit(code)
+        self._children[pid] = time.monotonic()
+
+    def _reap(self):
+        while self._children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self._children.clear()
+                return
+            if pid == 0:
+                return
+            started = self._children.pop(pid, None)
+            if pid in self._reload_pending:
+                self._reload_pending.remove(pid)
+            if started is not None and not self._stopping:
+                lifetime = time.monotonic() - started
+                print(f"[PREFORK] 工作进程 {pid} 已退出（状态 {status}，运行 {lifetime:.1f}s）")
+                if lifetime < MIN_WORKER_LIFETIME:
+                    time.sleep(MIN_WORKER_LIFETIME)
+
+    def _replace_one_for_reload(self):
+        """重载时每次只让一个旧进程退出，其余进程继续服务"""
+        pending = [pid for pid in self._reload_pending if pid in self._children]
+        self._reload_pending = pending
+        if pending and len(self._children) >= self.workers:
+            try:
+                os.kill(pending[0], signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def _shutdown_children(self):
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + self.graceful_timeout + 5
+        while self._children and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.1)
+        for pid in list(self._children):
+            print(f"[PREFORK] 工作进程 {pid} 未能按时退出，强制结束")
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+        self._children.clear()
+
+    # ---------- 子进程 ----------
+
+    def _run_worker(self):
+        from werkzeug.serving import make_server
+
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+        # Ctrl+C 会发给整个进程组，由主进程统一处理
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
+        app = self.load_app()
+        if self.warm_up:
+            started = time.perf_counter()
+            self.warm_up()
+            print(f"[PREFORK] 工作进程 {os.getpid()} 预热完成，用时 {(time.perf_counter() - started) * 1000:.0f}ms")
+
+        max_requests = 0
+        if self.max_requests:
+            # 各进程随机错开重启时间（fork 出的子进程继承相同的随机数状态，需用系统随机源）
+            max_requests = self.max_requests + random.SystemRandom().randint(0, self.max_requests_jitter)
+        tracker = _RequestTracker(app, max_requests, stop.set)
+        server = make_server(self.host, self.port, tracker, threaded=True, fd=self._sock.fileno())
+        self._sock.close()
+
+        def watch():
+            stop.wait()
+            server.shutdown()
+
+        threading.Thread(target=watch, name='prefork-stop', daemon=True).start()
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+            if not tracker.wait_idle(self.graceful_timeout):
+                print(f"[PREFORK] 工作进程 {os.getpid()} 仍有 {tracker.inflight} 个请求未完成，强制退出")
+            if self.on_exit:
+                self.on_exit()
+            print(f"[PREFORK] 工作进程 {os.getpid()} 退出，共处理 {tracker.served} 个请求")
@@ -0,0 +1,254 @@
+"""
+SQL 性能分析
+按语句指纹（去掉字面量与参数后的 SQL）统计执行次数、总耗时、p95；
+超过阈值的慢查询由后台线程执行 EXPLAIN 后写入慢查询日志（JSON Lines）；
+单个请求的查询数超过预算时记录告警，同一指纹重复多次的标记为疑似 N+1。
+"""
+
+import json
+import logging
+import os
+import queue
+import re
+import threading
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+logger = logging.getLogger('pms.profiler')
+
+# 默认配置，可在 config.py 中通过 PROFILER_CONFIG 覆盖
+DEFAULT_PROFILER_CONFIG = {
+    'enabled': True,
+    'slow_threshold': 0.2,          # 慢查询阈值（秒）
+    'query_budget': 30,             # 单个请求的查询数预算，超过即告警
+    'n_plus_one_threshold': 10,     # 单个请求内同一指纹执行次数达到该值视为疑似 N+1
+    'explain': True,                # 慢查询是否附带 EXPLAIN（仅 SELECT）
+    'log_params': False,            # 慢查询日志是否记录绑定参数（含会话令牌、邮箱、密码哈希等，仅本地排查时开启）
+    'max_fingerprints': 2000,       # 最多跟踪的指纹数，超过后新指纹归入 '<other>'
+    'samples': 512,                 # 每个指纹保留最近多少次耗时用于计算 p95
+    'max_violations': 100,          # 保留最近多少条超预算请求
+    'slow_log_path': os.path.join(os.path.dirname(os.path.abspath(__file__)), 'slow_queries.log'),
+}
+
+try:
+    from config import PROFILER_CONFIG as _USER_PROFILER_CONFIG
+except ImportError:
+    _USER_PROFILER_CONFIG = {}
+
+# 与数据库会话时区一致（东八区）
+BEIJING_TZ = timezone(timedelta(hours=8))
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+OTHER_FINGERPRINT = '<other>'
+
+_COMMENT_RE = re.compile(r'/\*.*?\*/|--[^\n]*', re.S)
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_RE = re.compile(r'%s|%\(\w+\)s')
+_IN_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_VALUES_RE = re.compile(r'(\(\s*\?(?:\s*,\s*\?)*\s*\))(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))+')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def fingerprint(statement):
+    """语句指纹：去掉注释，字面量与占位符替换为 ?，IN 列表与多行 VALUES 折叠，空白归一并转小写"""
+    if isinstance(statement, (bytes, bytearray)):
+        statement = statement.decode('utf-8', 'replace')
+    sql = _COMMENT_RE.sub(' ', statement)
+    sql = _STRING_RE.sub('?', sql)
+    sql = _PLACEHOLDER_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    # 先把多行 VALUES 折叠为第一行，再折叠 IN 列表，否则每行已变成 (?+)，不同行数的插入会得到不同指纹
+    sql = _VALUES_RE.sub(r'\1', sql)
+    sql = _IN_LIST_RE.sub('(?+)', sql)
+    return _SPACE_RE.sub(' ', sql).strip().lower()
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class _FingerprintStats(object):
+    __slots__ = ('count', 'total', 'max', 'recent', 'sample')
+
+    def __init__(self, samples, sample):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=samples)
+        self.sample = sample
+
+
+class QueryProfiler(object):
+    """SQL 性能分析器，record() 由计时游标在每次 execute 后调用"""
+
+    def __init__(self, enabled=True, slow_threshold=0.2, query_budget=30, n_plus_one_threshold=10,
+                 explain=True, log_params=False, max_fingerprints=2000, samples=512, max_violations=100,
+                 slow_log_path=None, connect=None):
+        self.enabled = enabled
+        self.slow_threshold = slow_threshold
+        self.query_budget = query_budget
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.explain = explain
+        self.log_params = log_params
+        self.max_fingerprints = max_fingerprints
+        self.samples = samples
+        self.slow_log_path = slow_log_path
+        self._connect = connect
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._violations = deque(maxlen=max_violations)
+        self._slow_queue = queue.Queue(maxsize=1000)
+        self._worker = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self.slow_queries = 0
+        self.slow_dropped = 0
+
+    # ---------- 语句统计 ----------
+
+    def record(self, statement, params, seconds):
+        """记录一次语句执行，返回指纹"""
+        fp = fingerprint(statement)
+        with self._lock:
+            stats = self._stats.get(fp)
+            if stats is None:
+                if len(self._stats) >= self.max_fingerprints:
+                    fp = OTHER_FINGERPRINT
+                    stats = self._stats.get(fp)
+                if stats is None:
+                    stats = self._stats[fp] = _FingerprintStats(self.samples, _SPACE_RE.sub(' ', str(statement)).strip())
+            stats.count += 1
+            stats.total += seconds
+            stats.recent.append(seconds)
+            if seconds > stats.max:
+                stats.max = seconds
+        if seconds >= self.slow_threshold:
+            self._enqueue_slow(fp, statement, params, seconds)
+        return fp
+
+    def stats(self, top=20, order_by='total'):
+        """按总耗时（或 count / p95 / max）排序的前 top 个指纹"""
+        with self._lock:
+            items = [(fp, s.count, s.total, s.max, list(s.recent), s.sample) for fp, s in self._stats.items()]
+        rows = []
+        for fp, count, total, max_seconds, recent, sample in items:
+            rows.append({
+                'fingerprint': fp,
+                'sample': sample,
+                'count': count,
+                'total_ms': round(total * 1000, 2),
+                'avg_ms': round(total / count * 1000, 2) if count else 0.0,
+                'p95_ms': round(_percentile(recent, 95) * 1000, 2),
+                'max_ms': round(max_seconds * 1000, 2),
+            })
+        key = {'total': 'total_ms', 'count': 'count', 'p95': 'p95_ms', 'max': 'max_ms'}.get(order_by, 'total_ms')
+        rows.sort(key=lambda row: row[key], reverse=True)
+        return {
+            'fingerprints': len(items),
+            'slow_queries': self.slow_queries,
+            'slow_dropped': self.slow_dropped,
+            'query_budget': self.query_budget,
+            'top': rows[:top],
+            'budget_violations': list(self._violations),
+        }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._violations.clear()
+
+    # ---------- 请求预算 ----------
+
+    def check_request(self, method, route, query_count, fingerprint_counts, elapsed):
+        """请求结束时检查查询数预算，超出时返回告警记录（否则 None）"""
+        repeated = sorted(
+            ((fp, n) for fp, n in fingerprint_counts.items() if n >= self.n_plus_one_threshold),
+            key=lambda item: item[1], reverse=True
+        )
+        if query_count <= self.query_budget and not repeated:
+            return None
+        violation = {
+            'time': datetime.now(BEIJING_TZ).strftime(TIME_FORMAT),
+            'method': method,
+            'route': route,
+            'queries': query_count,
+            'elapsed_ms': round(elapsed * 1000, 2),
+            'n_plus_one': [{'fingerprint': fp, 'count': n} for fp, n in repeated],
+        }
+        self._violations.append(violation)
+        return violation
+
+    # ---------- 慢查询日志 ----------
+
+    def _enqueue_slow(self, fp, statement, params, seconds):
+        self.slow_queries += 1
+        if not self.slow_log_path:
+            return
+        self._ensure_worker()
+        event = (datetime.now(BEIJING_TZ).strftime(TIME_FORMAT), fp, statement, params, seconds)
+        try:
+            self._slow_queue.put_nowait(event)
+        except queue.Full:
+            self.slow_dropped += 1
+
+    def _ensure_worker(self):
+        pid = os.getpid()
+        if self._worker is not None and self._pid == pid:
+            return
+        with self._start_lock:
+            if self._worker is not None and self._pid == pid:
+                return
+            if self._pid is not None and self._pid != pid:
+                # fork 出的子进程不继承父进程的线程，丢弃继承来的队列
+                self._slow_queue = queue.Queue(maxsize=self._slow_queue.maxsize)
+            self._pid = pid
+            self._worker = threading.Thread(target=self._run, name='slow-query-log', daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            logged_at, fp, statement, params, seconds = self._slow_queue.get()
+            entry = {
+                'time': logged_at,
+                'duration_ms': round(seconds * 1000, 2),
+                'fingerprint': fp,
+                'statement': _SPACE_RE.sub(' ', str(statement)).strip(),
+            }
+            if self.log_params:
+                entry['params'] = params if isinstance(params, (list, tuple, dict)) and len(params) <= 50 else None
+            if self.explain and self._connect is not None and fp.startswith(('select', 'with')):
+                entry['explain'] = self._explain(statement, params)
+            try:
+                with open(self.slow_log_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(entry, ensure_ascii=False, default=str) + '\n')
+            except OSError as e:
+                logger.error('写入慢查询日志失败: %s', e)
+
+    def _explain(self, statement, params):
+        """在独立连接上执行 EXPLAIN，失败时返回错误信息"""
+        try:
+            conn = self._connect()
+        except Exception as e:
+            return {'error': str(e)}
+        try:
+            cursor = conn.cursor(dictionary=True)
+            try:
+                cursor.execute('EXPLAIN ' + statement, params or None)
+                return cursor.fetchall()
+            finally:
+                cursor.close()
+        except Exception as e:
+            return {'error': str(e)}
+        finally:
+            conn.close()
+
+
+def create_profiler(connect=None):
+    options = dict(DEFAULT_PROFILER_CONFIG)
+    options.update(_USER_PROFILER_CONFIG)
+    return QueryProfiler(connect=connect, **options)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+项目成员汇总字段 projects.total_budget_days / projects.member_count
+项目成员增删改时在同一事务内按增量更新，项目列表直接读取，无需再联表聚合 project_members
+
+用法:
+    python project_totals.py check            # 检查汇总字段与 project_members 是否一致
+    python project_totals.py repair           # 按 project_members 重算并修复不一致的项目
+"""
+
+import argparse
+import sys
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+# project_members.budget_days 为 DECIMAL(12,2)
+_DAYS_QUANTUM = Decimal('0.01')
+_DAYS_LIMIT = Decimal('1e10')
+
+_DELTA_SQL = """
+    UPDATE projects
+    SET total_budget_days = total_budget_days + %s,
+        member_count = member_count + %s
+    WHERE id = %s
+"""
+
+_ACTUAL_SQL = """
+    SELECT p.id,
+           p.project_code,
+           p.total_budget_days,
+           p.member_count,
+           COALESCE(m.total_budget_days, 0) AS actual_budget_days,
+           COALESCE(m.member_count, 0) AS actual_member_count
+    FROM projects p
+    LEFT JOIN (
+        SELECT project_id, SUM(budget_days) AS total_budget_days, COUNT(*) AS member_count
+        FROM project_members
+        GROUP BY project_id
+    ) m ON m.project_id = p.id
+"""
+
+
+def _days(value):
+    if value is None or value == '':
+        return Decimal(0)
+    return Decimal(str(value))
+
+
+def parse_budget_days(value):
+    """解析请求中的预算人天，按 DECIMAL(12,2) 四舍五入到两位小数；空值返回 None，非法值抛出 ValueError"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f'无效的预算人天: {value}')
+    try:
+        days = Decimal(str(value).strip())
+    except InvalidOperation as e:
+        raise ValueError(f'无效的预算人天: {value}') from e
+    if not days.is_finite() or days < 0:
+        raise ValueError(f'无效的预算人天: {value}')
+    days = days.quantize(_DAYS_QUANTUM, rounding=ROUND_HALF_UP)
+    if days >= _DAYS_LIMIT:
+        raise ValueError(f'预算人天超出范围: {value}')
+    return days
+
+
+def apply_delta(cursor, project_id, budget_delta, member_delta):
+    """按增量更新项目汇总字段，调用方负责提交事务"""
+    budget_delta = _days(budget_delta)
+    if not budget_delta and not member_delta:
+        return
+    cursor.execute(_DELTA_SQL, (budget_delta, member_delta, project_id))
+
+
+def member_added(cursor, project_id, budget_days):
+    apply_delta(cursor, project_id, _days(budget_days), 1)
+
+
+def member_removed(cursor, project_id, budget_days):
+    apply_delta(cursor, project_id, -_days(budget_days), -1)
+
+
+def member_budget_changed(cursor, project_id, old_budget_days, new_budget_days):
+    apply_delta(cursor, project_id, _days(new_budget_days) - _days(old_budget_days), 0)
+
+
+def check(conn):
+    """返回汇总字段与 project_members 不一致的项目列表"""
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(f"""
+            SELECT * FROM ({_ACTUAL_SQL}) t
+            WHERE t.total_budget_days <> t.actual_budget_days OR t.member_count <> t.actual_member_count
+            ORDER BY t.id
+        """)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def repair(conn):
+    """按 project_members 重算全部项目的汇总字段，返回被修正的项目数"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            UPDATE projects p
+            LEFT JOIN (
+                SELECT project_id, SUM(budget_days) AS total_budget_days, COUNT(*) AS member_count
+                FROM project_members
+                GROUP BY project_id
+            ) m ON m.project_id = p.id
+            SET p.total_budget_days = COALESCE(m.total_budget_days, 0),
+                p.member_count = COALESCE(m.member_count, 0)
+        """)
+        changed = cursor.rowcount
+        conn.commit()
+        return changed
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='项目成员汇总字段检查与修复')
+    parser.add_argument('command', choices=['check', 'repair'])
+    args = parser.parse_args()
+
+    import mysql.connector
+    from config import DB_CONFIG
+
+    conn = mysql.connector.connect(**DB_CONFIG)
+    try:
+        if args.command == 'check':
+            rows = check(conn)
+            for row in rows:
+                print(f"{row['project_code']} (id={row['id']}): "
+                      f"预算人天 {row['total_budget_days']} -> {row['actual_budget_days']}，"
+                      f"成员数 {row['member_count']} -> {row['actual_member_count']}")
+            print(f"共 {len(rows)} 个项目不一致")
+            return 1 if rows else 0
+        count = repair(conn)
+        print(f"汇总字段修复完成，更新 {count} 个项目")
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,49 @@
+"""
+参考数据缓存（项目、部门、项目经理、角色列表）
+每类数据一个版本号，对应的写接口提交后推进版本号，旧版本的缓存条目不再命中；
+缓存的是序列化后的响应体及其内容哈希，用作 ETag，客户端带 If-None-Match 时可直接返回 304。
+多进程部署时版本号各进程独立，ttl 兜底其他进程写入后最迟 ttl 秒内生效。
+"""
+
+import hashlib
+import json
+import threading
+from collections import defaultdict, namedtuple
+
+from cache import SingleFlightCache
+
+RefData = namedtuple('RefData', ['name', 'version', 'body', 'etag'])
+RefData.__doc__ = """缓存的参考数据：body 为 JSON 字节串，etag 为其内容哈希（不含引号）"""
+
+
+class RefDataCache(object):
+    """按名称分类、带版本号的参考数据缓存"""
+
+    def __init__(self, ttl=300, max_size=256):
+        self._cache = SingleFlightCache(max_size, ttl)
+        self._versions = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def version(self, name):
+        return self._versions[name]
+
+    def bump(self, *names):
+        """数据变化后推进版本号"""
+        with self._lock:
+            for name in names:
+                self._versions[name] += 1
+
+    def get(self, name, loader, key=()):
+        """返回 RefData；未命中时调用 loader() 取数据，key 区分同类数据的不同参数（如分页）"""
+        version = self._versions[name]
+        return self._cache.get_or_compute((name, version, key), lambda: self._build(name, version, loader()))
+
+    @staticmethod
+    def _build(name, version, data):
+        body = json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+        return RefData(name, version, body, hashlib.sha1(body).hexdigest())
+
+    def stats(self):
+        data = self._cache.stats()
+        data['versions'] = dict(self._versions)
+        return data
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+报工日汇总表 work_report_daily_rollup
+按 (report_date, employee_id, project_id, status) 维护记录数与工时合计，
+报工提交、审核、撤销时在同一事务内增量更新，统计接口直接读汇总表；
+报工分析的总数、分页与KPI以汇总表为准，绕过接口直接改 work_reports 后需重建，可用 check 核对
+
+用法:
+    python rollup.py rebuild                                   # 全量重建
+    python rollup.py rebuild --start 2025-01-01 --end 2025-12-31   # 按日期范围回填
+    python rollup.py check                                     # 核对汇总表与 work_reports 是否一致
+    python rollup.py check --start 2025-01-01 --end 2025-12-31     # 按日期范围核对
+"""
+
+import argparse
+import sys
+from collections import defaultdict
+from decimal import Decimal
+
+ROLLUP_TABLE = 'work_report_daily_rollup'
+
+_UPSERT_SQL = f"""
+    INSERT INTO {ROLLUP_TABLE} (report_date, employee_id, project_id, status, report_count, total_hours)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        report_count = report_count + VALUES(report_count),
+        total_hours = total_hours + VALUES(total_hours)
+"""
+
+_PURGE_SQL = f"""
+    DELETE FROM {ROLLUP_TABLE}
+    WHERE report_date = %s AND employee_id = %s AND project_id = %s AND status = %s AND report_count <= 0
+"""
+
+
+def apply_deltas(cursor, deltas):
+    """写入增量，deltas 为 (report_date, employee_id, project_id, status, count_delta, hours_delta) 列表
+    调用方负责提交事务，汇总表与报工记录在同一事务内保持一致
+    """
+    merged = defaultdict(lambda: [0, Decimal(0)])
+    for report_date, employee_id, project_id, status, count_delta, hours_delta in deltas:
+        key = (str(report_date), int(employee_id), int(project_id), int(status))
+        merged[key][0] += count_delta
+        merged[key][1] += Decimal(str(hours_delta))
+    rows = [key + (count, hours) for key, (count, hours) in merged.items() if count or hours]
+    if not rows:
+        return
+    cursor.executemany(_UPSERT_SQL, rows)
+    removed = [row[:4] for row in rows if row[4] < 0]
+    if removed:
+        cursor.executemany(_PURGE_SQL, removed)
+
+
+def reports_added(cursor, reports):
+    """新增报工，reports 为 (report_date, employee_id, project_id, status, hours_spent) 列表"""
+    apply_deltas(cursor, [(d, e, p, s, 1, h) for d, e, p, s, h in reports])
+
+
+def reports_removed(cursor, reports):
+    """删除报工，参数同 reports_added"""
+    apply_deltas(cursor, [(d, e, p, s, -1, -h) for d, e, p, s, h in reports])
+
+
+def reports_status_changed(cursor, reports, new_status):
+    """报工状态变更，reports 为变更前的 (report_date, employee_id, project_id, status, hours_spent) 列表"""
+    deltas = []
+    for d, e, p, s, h in reports:
+        if s == new_status:
+            continue
+        deltas.append((d, e, p, s, -1, -h))
+        deltas.append((d, e, p, new_status, 1, h))
+    apply_deltas(cursor, deltas)
+
+
+def rebuild(conn, start_date=None, end_date=None):
+    """从 work_reports 重建汇总表（可限定日期范围），返回写入的汇总行数"""
+    where_clause = ""
+    params = []
+    if start_date and end_date:
+        where_clause = "WHERE report_date BETWEEN %s AND %s"
+        params = [start_date, end_date]
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"DELETE FROM {ROLLUP_TABLE} {where_clause}", params)
+        cursor.execute(f"""
+            INSERT INTO {ROLLUP_TABLE} (report_date, employee_id, project_id, status, report_count, total_hours)
+            SELECT report_date, employee_id, project_id, status, COUNT(*), COALESCE(SUM(hours_spent), 0)
+            FROM work_reports
+            {where_clause}
+            GROUP BY report_date, employee_id, project_id, status
+        """, params)
+        inserted = cursor.rowcount
+        conn.commit()
+        return inserted
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def check(conn, start_date=None, end_date=None):
+    """返回汇总表与 work_reports 不一致的 (report_date, employee_id, project_id, status) 行（可限定日期范围）"""
+    where_clause = ""
+    params = []
+    if start_date and end_date:
+        where_clause = "WHERE report_date BETWEEN %s AND %s"
+        params = [start_date, end_date]
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(f"""
+            SELECT k.report_date, k.employee_id, k.project_id, k.status,
+                   COALESCE(r.report_count, 0) AS report_count,
+                   COALESCE(w.report_count, 0) AS actual_report_count,
+                   COALESCE(r.total_hours, 0) AS total_hours,
+                   COALESCE(w.total_hours, 0) AS actual_total_hours
+            FROM (
+                SELECT report_date, employee_id, project_id, status FROM {ROLLUP_TABLE} {where_clause}
+                UNION
+                SELECT report_date, employee_id, project_id, status FROM work_reports {where_clause}
+            ) k
+            LEFT JOIN {ROLLUP_TABLE} r
+                ON r.report_date = k.report_date AND r.employee_id = k.employee_id
+               AND r.project_id = k.project_id AND r.status = k.status
+            LEFT JOIN (
+                SELECT report_date, employee_id, project_id, status,
+                       COUNT(*) AS report_count, COALESCE(SUM(hours_spent), 0) AS total_hours
+                FROM work_reports
+                {where_clause}
+                GROUP BY report_date, employee_id, project_id, status
+            ) w
+                ON w.report_date = k.report_date AND w.employee_id = k.employee_id
+               AND w.project_id = k.project_id AND w.status = k.status
+            WHERE COALESCE(r.report_count, 0) <> COALESCE(w.report_count, 0)
+               OR COALESCE(r.total_hours, 0) <> COALESCE(w.total_hours, 0)
+            ORDER BY k.report_date, k.employee_id, k.project_id, k.status
+        """, params * 3)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='报工日汇总表维护')
+    sub = parser.add_subparsers(dest='command')
+    rebuild_parser = sub.add_parser('rebuild', help='从 work_reports 重建汇总表')
+    rebuild_parser.add_argument('--start', help='开始日期 YYYY-MM-DD')
+    rebuild_parser.add_argument('--end', help='结束日期 YYYY-MM-DD')
+    check_parser = sub.add_parser('check', help='核对汇总表与 work_reports 是否一致')
+    check_parser.add_argument('--start', help='开始日期 YYYY-MM-DD')
+    check_parser.add_argument('--end', help='结束日期 YYYY-MM-DD')
+    args = parser.parse_args()
+
+    if args.command not in ('rebuild', 'check'):
+        parser.print_help()
+        return 1
+    if bool(args.start) != bool(args.end):
+        print("--start 与 --end 需要同时指定")
+        return 1
+
+    import mysql.connector
+    from config import DB_CONFIG
+
+    conn = mysql.connector.connect(**DB_CONFIG)
+    scope = f"{args.start} ~ {args.end}" if args.start else "全部"
+    try:
+        if args.command == 'check':
+            rows = check(conn, args.start, args.end)
+            for row in rows:
+                print(f"{row['report_date']} 员工{row['employee_id']} 项目{row['project_id']} 状态{row['status']}: "
+                      f"记录数 {row['report_count']} -> {row['actual_report_count']}，"
+                      f"工时 {row['total_hours']} -> {row['actual_total_hours']}")
+            print(f"共 {len(rows)} 组不一致（{scope}），可执行 rebuild 修复")
+            return 1 if rows else 0
+        count = rebuild(conn, args.start, args.end)
+        print(f"汇总表重建完成（{scope}），写入 {count} 行")
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
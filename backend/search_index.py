@@ -0,0 +1,161 @@
+"""
+员工搜索索引
+在内存中为员工姓名、部门名（以及安装了 pypinyin 时的姓名全拼、拼音首字母）建立单字/二元组倒排索引，
+搜索时先按二元组求交集得到候选，再逐个校验子串匹配，无需扫表；默认只匹配姓名与部门名，
+结果与 LIKE '%关键字%'（不区分大小写的排序规则）一致，拼音匹配需显式开启，会返回额外结果。
+员工增删改时整体失效，下次搜索时重建；ttl 用于多进程部署时兜底。
+"""
+
+import heapq
+import threading
+import time
+from collections import defaultdict, namedtuple
+
+try:
+    from pypinyin import lazy_pinyin, Style
+except ImportError:
+    lazy_pinyin = None
+
+_Doc = namedtuple('_Doc', ['id', 'name', 'department', 'dept_key', 'text_keys', 'keys', 'pinyin'])
+
+
+def _normalize(text):
+    return (text or '').strip().lower()
+
+
+def _pinyin_keys(name):
+    """姓名的全拼与首字母，如 张三 -> ('zhangsan', 'zs')；未安装 pypinyin 时返回空"""
+    if lazy_pinyin is None or not name:
+        return ()
+    full = ''.join(lazy_pinyin(name)).lower()
+    initials = ''.join(lazy_pinyin(name, style=Style.FIRST_LETTER)).lower()
+    return tuple(key for key in (full, initials) if key and key != name)
+
+
+def _grams(text):
+    """单字与相邻二元组"""
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+class _Snapshot(object):
+    """某一时刻的索引快照，构建后只读"""
+
+    def __init__(self, rows):
+        self.docs = {}
+        self.postings = defaultdict(set)
+        for employee_id, name, department in rows:
+            name_key = _normalize(name)
+            dept_key = _normalize(department)
+            pinyin = _pinyin_keys(name_key)
+            text_keys = tuple(key for key in (name_key, dept_key) if key)
+            keys = text_keys + pinyin
+            self.docs[employee_id] = _Doc(employee_id, name, department, dept_key, text_keys, keys, pinyin)
+            for key in keys:
+                for gram in _grams(key):
+                    self.postings[gram].add(employee_id)
+
+    def candidates(self, query):
+        grams = {query} if len(query) == 1 else {query[i:i + 2] for i in range(len(query) - 1)}
+        postings = sorted((self.postings.get(gram, ()) for gram in grams), key=len)
+        if not postings or not postings[0]:
+            return set()
+        result = set(postings[0])
+        for posting in postings[1:]:
+            result &= posting
+            if not result:
+                break
+        return result
+
+
+class EmployeeSearchIndex(object):
+    """员工搜索索引：loader() 返回 (employee_id, name, dept_name) 的可迭代对象"""
+
+    def __init__(self, loader, ttl=300):
+        self._loader = loader
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._snapshot_data = None
+        self._built_at = 0.0
+        self.builds = 0
+        self.build_ms = 0.0
+
+    def _snapshot(self):
+        snapshot = self._snapshot_data
+        if snapshot is not None and time.monotonic() - self._built_at < self.ttl:
+            return snapshot
+        with self._lock:
+            if self._snapshot_data is None or time.monotonic() - self._built_at >= self.ttl:
+                started = time.perf_counter()
+                self._snapshot_data = _Snapshot(self._loader())
+                self._built_at = time.monotonic()
+                self.builds += 1
+                self.build_ms = round((time.perf_counter() - started) * 1000, 2)
+            return self._snapshot_data
+
+    def warm(self):
+        """预先构建索引"""
+        self._snapshot()
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot_data = None
+
+    def search(self, query, department=None, pinyin=False):
+        """返回姓名或部门名包含 query 的员工ID（按ID倒序），pinyin 为真时也匹配姓名拼音；
+        department 为部门名筛选，与 query 一样不区分大小写
+        """
+        query = _normalize(query)
+        snapshot = self._snapshot()
+        if not query:
+            ids = snapshot.docs.keys()
+        else:
+            field = 'keys' if pinyin else 'text_keys'
+            ids = [i for i in snapshot.candidates(query)
+                   if any(query in key for key in getattr(snapshot.docs[i], field))]
+        if department:
+            dept_key = _normalize(department)
+            ids = [i for i in ids if snapshot.docs[i].dept_key == dept_key]
+        return sorted(ids, reverse=True)
+
+    def typeahead(self, query, limit=10):
+        """联想输入：返回最匹配的 limit 个员工
+        排序依次为：姓名前缀、姓名包含、拼音前缀、拼音包含、部门名包含，同级按姓名长度、ID
+        """
+        query = _normalize(query)
+        if not query:
+            return []
+        snapshot = self._snapshot()
+        scored = []
+        for employee_id in snapshot.candidates(query):
+            doc = snapshot.docs[employee_id]
+            name_key = _normalize(doc.name)
+            if name_key.startswith(query):
+                rank = 0
+            elif query in name_key:
+                rank = 1
+            elif any(key.startswith(query) for key in doc.pinyin):
+                rank = 2
+            elif any(query in key for key in doc.pinyin):
+                rank = 3
+            elif query in _normalize(doc.department):
+                rank = 4
+            else:
+                continue
+            scored.append((rank, len(name_key), employee_id))
+        return [
+            {'id': employee_id, 'name': snapshot.docs[employee_id].name,
+             'department': snapshot.docs[employee_id].department}
+            for _, _, employee_id in heapq.nsmallest(limit, scored)
+        ]
+
+    def stats(self):
+        snapshot = self._snapshot_data
+        return {
+            'employees': len(snapshot.docs) if snapshot else 0,
+            'grams': len(snapshot.postings) if snapshot else 0,
+            'builds': self.builds,
+            'build_ms': self.build_ms,
+            'pinyin': lazy_pinyin is not None,
+        }
@@ -2,14 +2,29 @@
 """
 后端服务启动脚本
 包含健康检查和错误诊断
+
+用法:
+    python start_backend.py                    # 开发模式（Flask 内置服务，debug）
+    python start_backend.py --prod             # 生产模式：多进程 + 多线程，见 prefork.py
+    python start_backend.py --prod --workers 8 --max-requests 20000
 """
 
+import argparse
 import sys
 import os
 
 # 确保当前目录在Python路径中
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+parser = argparse.ArgumentParser(description='PMS后端服务启动')
+parser.add_argument('--prod', action='store_true', help='生产模式：预派生多进程，每个进程多线程处理请求')
+parser.add_argument('--port', type=int, default=5001)
+parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='工作进程数（默认CPU核数）')
+parser.add_argument('--max-requests', type=int, default=10000, help='工作进程处理多少个请求后重启（0为不重启）')
+parser.add_argument('--max-requests-jitter', type=int, default=1000, help='重启请求数的随机增量，避免同时重启')
+parser.add_argument('--graceful-timeout', type=int, default=30, help='优雅停止时等待进行中请求的秒数')
+args = parser.parse_args()
+
 print("=" * 60)
 print("PMS后端服务启动检查")
 print("=" * 60)
@@ -107,17 +122,17 @@ except Exception as e:
     sys.exit(1)
 
 # 5. 检查端口占用
-print("\n5. 检查端口5001:")
+print(f"\n5. 检查端口{args.port}:")
 import socket
 sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-result = sock.connect_ex(('127.0.0.1', 5001))
+result = sock.connect_ex(('127.0.0.1', args.port))
 sock.close()
 
 if result == 0:
-    print("   ⚠ 警告: 端口5001已被占用")
+    print(f"   ⚠ 警告: 端口{args.port}已被占用")
     print("   如果后端已在运行，请先停止")
 else:
-    print("   ✓ 端口5001可用")
+    print(f"   ✓ 端口{args.port}可用")
 
 # 6. 启动Flask应用
 print("\n" + "=" * 60)
@@ -125,21 +140,49 @@ print("所有检查通过，启动Flask应用...")
 print("=" * 60)
 print()
 
-try:
+def load_app():
     from app import app
-    
+    return app
+
+def warm_up():
+    import app as app_module
+    app_module.warm_up()
+
+def shutdown_worker():
+    import app as app_module
+    app_module.shutdown_worker()
+
+try:
     # 启动应用
-    print("后端服务启动在: http://0.0.0.0:5001")
-    print("本地访问: http://127.0.0.1:5001")
-    print("局域网访问: http://10.10.201.67:5001")
+    print(f"后端服务启动在: http://0.0.0.0:{args.port}")
+    print(f"本地访问: http://127.0.0.1:{args.port}")
+    print(f"局域网访问: http://10.10.201.67:{args.port}")
     print("\n按 Ctrl+C 停止服务\n")
     
-    app.run(
-        host='0.0.0.0',
-        port=5001,
-        debug=True,
-        use_reloader=False  # 避免重复启动检查
-    )
+    if args.prod:
+        # 主进程不导入应用，各工作进程 fork 后导入，SIGHUP 重载时可加载新代码
+        from prefork import PreforkServer
+        print(f"生产模式: {args.workers} 个工作进程，每进程处理 {args.max_requests} 个请求后重启")
+        print("信号: SIGTERM 优雅停止，SIGHUP 逐个重启工作进程\n")
+        PreforkServer(
+            load_app,
+            host='0.0.0.0',
+            port=args.port,
+            workers=args.workers,
+            max_requests=args.max_requests,
+            max_requests_jitter=args.max_requests_jitter,
+            graceful_timeout=args.graceful_timeout,
+            warm_up=warm_up,
+            on_exit=shutdown_worker,
+        ).run()
+    else:
+        app = load_app()
+        app.run(
+            host='0.0.0.0',
+            port=args.port,
+            debug=True,
+            use_reloader=False  # 避免重复启动检查
+        )
     
 except KeyboardInterrupt:
     print("\n\n服务已停止")
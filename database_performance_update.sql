@@ -0,0 +1,61 @@
+-- 性能优化相关数据库结构更新
+-- 按编号顺序执行，每一节对应后端的一项优化
+
+-- 1. 操作日志游标分页索引（/api/operation-logs?mode=cursor）
+ALTER TABLE `operation_logs`
+ADD KEY `idx_operation_time_id` (`operation_time`, `id`);
+
+-- 2. 批量报工幂等记录（POST /api/reports/batch 的 idempotency_key）
+CREATE TABLE IF NOT EXISTS `report_batch_requests` (
+  `employee_id` int NOT NULL COMMENT '提交人',
+  `idempotency_key` varchar(64) NOT NULL COMMENT '客户端生成的幂等键',
+  `response_json` json DEFAULT NULL COMMENT '首次处理的响应',
+  `created_at` timestamp DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+  PRIMARY KEY (`employee_id`, `idempotency_key`),
+  KEY `idx_created_at` (`created_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci COMMENT='批量报工幂等记录';
+
+-- 3. 报工日汇总表（统计接口读取，报工提交/审核/撤销时同步维护）
+--    创建后执行 python backend/rollup.py rebuild 回填历史数据
+CREATE TABLE IF NOT EXISTS `work_report_daily_rollup` (
+  `report_date` date NOT NULL COMMENT '报工日期',
+  `employee_id` int NOT NULL COMMENT '员工ID',
+  `project_id` int NOT NULL COMMENT '项目ID',
+  `status` int NOT NULL COMMENT '报工状态',
+  `report_count` int NOT NULL DEFAULT 0 COMMENT '报工记录数',
+  `total_hours` decimal(12,2) NOT NULL DEFAULT 0 COMMENT '工时合计',
+  PRIMARY KEY (`report_date`, `employee_id`, `project_id`, `status`),
+  KEY `idx_employee_date` (`employee_id`, `report_date`),
+  KEY `idx_project_date` (`project_id`, `report_date`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci COMMENT='报工日汇总表';
+
+-- 4. 项目代码年度序列号（创建项目时原子递增分配，替代 COUNT(*)+1）
+CREATE TABLE IF NOT EXISTS `project_code_sequences` (
+  `year_suffix` varchar(4) NOT NULL COMMENT '年份后两位',
+  `last_seq` int NOT NULL DEFAULT 0 COMMENT '已分配的最大序列号',
+  `updated_at` timestamp DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
+  PRIMARY KEY (`year_suffix`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci COMMENT='项目代码年度序列号';
+
+-- 按已有项目初始化各年份的序列号（annual_seq 格式为 年份后两位 + 序号，年度项目序号为 00）
+INSERT INTO `project_code_sequences` (`year_suffix`, `last_seq`)
+SELECT `year_suffix`, MAX(CAST(SUBSTRING(`annual_seq`, CHAR_LENGTH(`year_suffix`) + 1) AS UNSIGNED))
+FROM `projects`
+WHERE `year_suffix` IS NOT NULL AND `annual_seq` IS NOT NULL
+GROUP BY `year_suffix`
+ON DUPLICATE KEY UPDATE `last_seq` = GREATEST(`last_seq`, VALUES(`last_seq`));
+
+-- 5. 项目成员汇总字段（/api/projects/detailed 直接读取，项目成员增删改时同步维护）
+--    如怀疑不一致可执行 python backend/project_totals.py check / repair
+ALTER TABLE `projects`
+ADD COLUMN `total_budget_days` decimal(12,2) NOT NULL DEFAULT 0 COMMENT '成员预算人天合计',
+ADD COLUMN `member_count` int NOT NULL DEFAULT 0 COMMENT '成员数';
+
+UPDATE `projects` p
+LEFT JOIN (
+  SELECT `project_id`, SUM(`budget_days`) AS `total_budget_days`, COUNT(*) AS `member_count`
+  FROM `project_members`
+  GROUP BY `project_id`
+) m ON m.`project_id` = p.`id`
+SET p.`total_budget_days` = COALESCE(m.`total_budget_days`, 0),
+    p.`member_count` = COALESCE(m.`member_count`, 0);
@@ -3,6 +3,37 @@ class ComponentLoader {
     constructor() {
         this.cache = new Map();
         this.loadingPromises = new Map();
+        this.bundlePromise = null;
+    }
+
+    /**
+     * 加载组件包：先取清单（每次重新验证），再按内容哈希取组件包（浏览器永久缓存）
+     * 服务端不支持或加载失败时返回空对象，组件回退为逐个请求
+     * @returns {Promise<Object>} 组件路径 -> HTML内容
+     */
+    loadBundle() {
+        if (!this.bundlePromise) {
+            this.bundlePromise = (async () => {
+                try {
+                    const manifestResponse = await fetch(COMPONENT_MANIFEST_URL, { cache: 'no-cache' });
+                    if (!manifestResponse.ok) {
+                        throw new Error(`HTTP error! status: ${manifestResponse.status}`);
+                    }
+                    const manifest = await manifestResponse.json();
+                    const bundleResponse = await fetch(manifest.bundle);
+                    if (!bundleResponse.ok) {
+                        throw new Error(`HTTP error! status: ${bundleResponse.status}`);
+                    }
+                    const bundle = await bundleResponse.json();
+                    console.log(`[ComponentLoader] Component bundle ${manifest.hash} loaded, ${Object.keys(bundle).length} components`);
+                    return bundle;
+                } catch (error) {
+                    console.warn('[ComponentLoader] Component bundle unavailable, falling back to per-file fetch', error);
+                    return {};
+                }
+            })();
+        }
+        return this.bundlePromise;
     }
 
     /**
@@ -56,7 +87,13 @@ class ComponentLoader {
      * @returns {Promise<string>}
      */
     async fetchComponent(componentPath) {
-        // 添加时间戳避免浏览器缓存，确保获取到最新的组件内容
+        // 优先从组件包中读取
+        const bundle = await this.loadBundle();
+        if (Object.prototype.hasOwnProperty.call(bundle, componentPath)) {
+            return bundle[componentPath];
+        }
+
+        // 不在组件包中：添加时间戳避免浏览器缓存，确保获取到最新的组件内容
         const cacheBuster = `v=${Date.now()}`;
         const url = componentPath.includes('?')
             ? `${componentPath}&${cacheBuster}`
@@ -233,6 +270,9 @@ class ComponentLoader {
 // 创建全局组件加载器实例
 window.componentLoader = new ComponentLoader();
 
+// 组件包清单（由 server.py 提供）
+const COMPONENT_MANIFEST_URL = 'components/manifest.json';
+
 // 页面组件配置
 const PAGE_COMPONENTS = {
     'login': 'components/pages/login.html',
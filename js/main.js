@@ -1481,8 +1481,36 @@ function updateTableData() {
     }
     
     // 调用API获取数据
-    loadReportAnalysisData(timeRange);
-    loadChartData();
+    loadDashboardBundle(timeRange);
+}
+
+// 一次请求加载报表分析看板（KPI、明细与全部图表），失败时回退到逐个接口加载
+async function loadDashboardBundle(timeRange) {
+    try {
+        const apiBase = getApiBase();
+        const response = await fetch(`${apiBase}/api/dashboard?time_range=${timeRange}&page=1&per_page=10`);
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}`);
+        }
+        const data = await response.json();
+        const sections = data.sections || {};
+        if (sections.analysis) {
+            updateKPICards(sections.analysis.kpi);
+            updateAnalysisTable(sections.analysis.reports);
+            updatePagination(sections.analysis.pagination);
+        } else {
+            loadReportAnalysisData(timeRange);
+        }
+        if (sections.hours_trend && sections.project_progress && sections.team_efficiency && sections.financial_analysis) {
+            updateChartPlaceholders(sections.hours_trend, sections.project_progress, sections.team_efficiency, sections.financial_analysis);
+        } else {
+            loadChartData();
+        }
+    } catch (error) {
+        console.error('看板聚合接口调用失败，改为逐个加载:', error);
+        loadReportAnalysisData(timeRange);
+        loadChartData();
+    }
 }
 
 // 加载报表分析数据
@@ -3127,6 +3155,7 @@ window.deleteEmployee = deleteEmployee;
 window.showNotification = showNotification;
 
 // 导出报表分析相关函数
+window.loadDashboardBundle = loadDashboardBundle;
 window.loadReportAnalysisData = loadReportAnalysisData;
 window.loadChartData = loadChartData;
 window.updateKPICards = updateKPICards;
@@ -1,7 +1,22 @@
 import http.server
 import socketserver
+import argparse
+import collections
+import email.utils
+import gzip
+import hashlib
+import json
+import mimetypes
 import os
+import re
 import sys
+import threading
+import urllib.parse
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 # 定义前端服务端口
 PORT = 5002
@@ -9,6 +24,68 @@ PORT = 5002
 # 定义要服务的目录（项目根目录）
 web_dir = os.path.dirname(os.path.abspath(__file__))
 
+# ---------- 组件打包（两种模式通用） ----------
+
+COMPONENTS_DIR = 'components'
+COMPONENT_MANIFEST_PATH = '/components/manifest.json'
+COMPONENT_BUNDLE_RE = re.compile(r'^/components/bundle\.([0-9a-f]+)\.json$')
+
+
+Bundle = collections.namedtuple('Bundle', ['hash', 'body', 'gzip_body'])
+
+
+class ComponentBundle(object):
+    """把 components/ 下所有 HTML 片段合并为一个 JSON（{路径: 内容}），以内容哈希命名
+    组件文件有改动（mtime / 大小变化）时在下一次请求时重新打包
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+        self._signature = None
+        self._bundle = None
+
+    def _scan(self):
+        files = []
+        base = os.path.join(self.root, COMPONENTS_DIR)
+        for dirpath, dirnames, filenames in os.walk(base):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if not filename.endswith('.html'):
+                    continue
+                path = os.path.join(dirpath, filename)
+                st = os.stat(path)
+                rel = os.path.relpath(path, self.root).replace(os.sep, '/')
+                files.append((rel, path, st.st_mtime_ns, st.st_size))
+        return files
+
+    def current(self):
+        files = self._scan()
+        signature = tuple((rel, mtime_ns, size) for rel, _, mtime_ns, size in files)
+        if signature != self._signature:
+            with self._lock:
+                if signature != self._signature:
+                    components = {}
+                    for rel, path, _, _ in files:
+                        with open(path, encoding='utf-8') as f:
+                            components[rel] = f.read()
+                    body = json.dumps(components, ensure_ascii=False, sort_keys=True).encode('utf-8')
+                    self._bundle = Bundle(hashlib.sha1(body).hexdigest()[:16], body,
+                                          gzip.compress(body, compresslevel=9))
+                    self._signature = signature
+        return self._bundle
+
+    def manifest(self):
+        """返回 (哈希, 清单 JSON)"""
+        bundle_hash = self.current().hash
+        return bundle_hash, json.dumps({
+            'hash': bundle_hash,
+            'bundle': '/{}/bundle.{}.json'.format(COMPONENTS_DIR, bundle_hash),
+        }).encode('utf-8')
+
+
+component_bundle = ComponentBundle(web_dir)
+
 class Handler(http.server.SimpleHTTPRequestHandler):
     def __init__(self, *args, **kwargs):
         # Python 3.7+ 支持 directory 参数，Python 3.6 需要手动切换目录
@@ -20,16 +97,282 @@ class Handler(http.server.SimpleHTTPRequestHandler):
                 os.chdir(web_dir)
             super().__init__(*args, **kwargs)
 
+    def do_GET(self):
+        if not self.serve_component_bundle(head_only=False):
+            super().do_GET()
+
+    def do_HEAD(self):
+        if not self.serve_component_bundle(head_only=True):
+            super().do_HEAD()
+
+    def serve_component_bundle(self, head_only):
+        """组件清单与组件包：清单每次重新验证，包文件名带内容哈希可永久缓存；已处理返回 True"""
+        path = urllib.parse.urlsplit(self.path).path
+        if path == COMPONENT_MANIFEST_PATH:
+            bundle_hash, body = component_bundle.manifest()
+            self.send_bytes(body, 'application/json', '"{}"'.format(bundle_hash), 'no-cache', None, head_only)
+            return True
+        match = COMPONENT_BUNDLE_RE.match(path)
+        if not match:
+            return False
+        bundle = component_bundle.current()
+        if match.group(1) != bundle.hash:
+            # 旧版本的包不再保留，加载器会回退到逐个请求组件
+            self.send_error(404, "Bundle not found")
+            return True
+        accepts_gzip = 'gzip' in self.headers.get('Accept-Encoding', '')
+        body = bundle.gzip_body if accepts_gzip else bundle.body
+        # 压缩与未压缩的包使用不同的 ETag，避免缓存用 304 复用另一种编码的响应体
+        etag = '"{}{}"'.format(bundle.hash, '-gzip' if accepts_gzip else '')
+        self.send_bytes(body, 'application/json', etag,
+                        IMMUTABLE_CACHE_CONTROL, 'gzip' if accepts_gzip else None, head_only)
+        return True
+
+    def send_bytes(self, body, content_type, etag, cache_control, encoding, head_only):
+        tags = [tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')]
+        not_modified = etag in tags or '*' in tags
+        if not_modified:
+            self.send_response(304)
+        else:
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            if encoding:
+                self.send_header("Content-Encoding", encoding)
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", cache_control)
+        self.send_header("Vary", "Accept-Encoding")
+        self.end_headers()
+        if not head_only and not not_modified:
+            self.wfile.write(body)
+
+# ---------- 生产模式（--mode prod） ----------
+
+# 文件名中带内容哈希的资源（如 homeloading.CvCfoDAw.png）内容不会变化，可长期缓存
+HASHED_ASSET_RE = re.compile(r'\.(?=[A-Za-z0-9_-]*[A-Z0-9])[A-Za-z0-9_-]{8,}\.\w+$')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# 其他资源允许缓存，但每次使用前用 ETag / Last-Modified 重新验证
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+# 小于该大小的文件不压缩
+MIN_COMPRESS_SIZE = 1024
+COMPRESSIBLE_TYPES = ('application/javascript', 'application/json', 'application/xml', 'image/svg+xml')
+
+# 生产模式下不对外提供的目录与文件（后端代码、配置、数据库脚本等）
+DENIED_DIRS = {'backend', '__pycache__'}
+DENIED_SUFFIXES = ('.py', '.pyc', '.sql', '.jsonl')
+
+
+def is_compressible(content_type):
+    return content_type.startswith('text/') or content_type in COMPRESSIBLE_TYPES
+
+
+class StaticFile(object):
+    """单个静态文件的元数据：强 ETag（内容哈希）与预压缩的 gzip / br 版本"""
+
+    __slots__ = ('mtime_ns', 'size', 'etag', 'variants')
+
+    def __init__(self, path, st, content_type):
+        self.mtime_ns = st.st_mtime_ns
+        self.size = st.st_size
+        with open(path, 'rb') as f:
+            data = f.read()
+        self.etag = hashlib.sha1(data).hexdigest()[:20]
+        self.variants = {}
+        if is_compressible(content_type) and len(data) >= MIN_COMPRESS_SIZE:
+            if brotli is not None:
+                self._add_variant('br', brotli.compress(data), len(data))
+            self._add_variant('gzip', gzip.compress(data, compresslevel=9), len(data))
+
+    def _add_variant(self, encoding, body, original_size):
+        if len(body) < original_size:
+            self.variants[encoding] = body
+
+    def matches(self, st):
+        return self.mtime_ns == st.st_mtime_ns and self.size == st.st_size
+
+
+class StaticFileCache(object):
+    """静态文件元数据缓存，文件修改（mtime / 大小变化）后自动重新计算"""
+
+    def __init__(self):
+        self._files = {}
+        self._lock = threading.Lock()
+
+    def get(self, path, st, content_type):
+        entry = self._files.get(path)
+        if entry is not None and entry.matches(st):
+            return entry
+        entry = StaticFile(path, st, content_type)
+        with self._lock:
+            self._files[path] = entry
+        return entry
+
+    def warm(self, root):
+        """启动时预先计算所有可服务文件的 ETag 与压缩版本，返回文件数"""
+        count = 0
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if d not in DENIED_DIRS and not d.startswith('.')]
+            for filename in filenames:
+                if filename.startswith('.') or filename.endswith(DENIED_SUFFIXES):
+                    continue
+                path = os.path.join(dirpath, filename)
+                content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+                self.get(path, os.stat(path), content_type)
+                count += 1
+        return count
+
+
+class ThreadingHTTPServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    """每个连接一个线程（兼容 Python 3.6，3.7+ 标准库自带同名类）"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class StaticHandler(Handler):
+    """生产模式静态文件处理：HTTP/1.1 长连接、强 ETag / Last-Modified 与 304、
+    哈希资源长期缓存、gzip / br 预压缩、未压缩文件使用 sendfile 发送
+    """
+
+    protocol_version = 'HTTP/1.1'
+    # 空闲长连接的超时时间（秒），避免线程被空连接长期占用
+    timeout = 30
+
+    files = StaticFileCache()
+
+    def do_GET(self):
+        self.serve_static(head_only=False)
+
+    def do_HEAD(self):
+        self.serve_static(head_only=True)
+
+    def is_denied(self):
+        """按解码、规范化后的实际文件路径判断（%2e、%62ackend 等编码形式无法绕过）"""
+        root = os.path.realpath(web_dir)
+        relative = os.path.relpath(os.path.realpath(self.translate_path(self.path)), root)
+        if relative == os.curdir:
+            return False
+        parts = relative.split(os.sep)
+        if parts[0] == os.pardir:
+            return True
+        if any(p.startswith('.') or p in DENIED_DIRS for p in parts):
+            return True
+        return parts[-1].lower().endswith(DENIED_SUFFIXES)
+
+    def serve_static(self, head_only):
+        if self.serve_component_bundle(head_only):
+            return
+        if self.is_denied():
+            self.send_error(404, "File not found")
+            return
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            index = os.path.join(path, 'index.html')
+            if not urllib.parse.urlsplit(self.path).path.endswith('/') or not os.path.isfile(index):
+                # 目录重定向与目录列表沿用标准实现
+                return super().do_HEAD() if head_only else super().do_GET()
+            path = index
+        try:
+            st = os.stat(path)
+        except OSError:
+            self.send_error(404, "File not found")
+            return
+
+        content_type = self.guess_type(path)
+        entry = self.files.get(path, st, content_type)
+        encoding = self.choose_encoding(entry)
+        body = entry.variants.get(encoding)
+        etag = '"{}{}"'.format(entry.etag, '-' + encoding if encoding else '')
+        cache_control = IMMUTABLE_CACHE_CONTROL if HASHED_ASSET_RE.search(path) else REVALIDATE_CACHE_CONTROL
+
+        if self.not_modified(etag, st.st_mtime):
+            self.send_response(304)
+            self.send_cache_headers(etag, st.st_mtime, cache_control, entry)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body) if body is not None else st.st_size))
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.send_cache_headers(etag, st.st_mtime, cache_control, entry)
+        self.end_headers()
+        if head_only:
+            return
+        if body is not None:
+            self.wfile.write(body)
+        else:
+            with open(path, 'rb') as f:
+                self.connection.sendfile(f, 0, st.st_size)
+
+    def send_cache_headers(self, etag, mtime, cache_control, entry):
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", self.date_time_string(mtime))
+        self.send_header("Cache-Control", cache_control)
+        if entry.variants:
+            self.send_header("Vary", "Accept-Encoding")
+
+    def choose_encoding(self, entry):
+        if not entry.variants:
+            return None
+        accepted = set()
+        for item in self.headers.get('Accept-Encoding', '').split(','):
+            name, _, params = item.strip().partition(';')
+            if params.strip().replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+                continue
+            accepted.add(name.strip().lower())
+        for encoding in ('br', 'gzip'):
+            if encoding in entry.variants and encoding in accepted:
+                return encoding
+        return None
+
+    def not_modified(self, etag, mtime):
+        """If-None-Match 优先；没有时才看 If-Modified-Since"""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(',')]
+            return '*' in tags or etag in tags or 'W/' + etag in tags
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since:
+            try:
+                since = email.utils.parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError, IndexError, OverflowError):
+                return False
+            if since is not None:
+                return int(mtime) <= since.timestamp()
+        return False
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='前端静态文件服务')
+    parser.add_argument('--mode', choices=['dev', 'prod'], default='dev',
+                        help='dev: 单线程、无缓存头（默认）；prod: 多线程、ETag/304、预压缩、sendfile')
+    parser.add_argument('--port', type=int, default=PORT)
+    return parser.parse_args()
+
+
+args = parse_args()
+PORT = args.port
+
 print("=========================================================")
-print("  Frontend server starting...")
+print("  Frontend server starting... ({} mode)".format(args.mode))
 print("  Serving on: http://127.0.0.1:{}".format(PORT))
 print("  Serving files from: {}".format(web_dir))
 print("  Directory exists: {}".format(os.path.exists(web_dir)))
+if args.mode == 'prod':
+    print("  Precompressed files: {} (brotli: {})".format(
+        StaticHandler.files.warm(web_dir), 'yes' if brotli is not None else 'no'))
 print("=========================================================")
 
+if args.mode == 'prod':
+    server_class, handler_class = ThreadingHTTPServer, StaticHandler
+else:
+    server_class, handler_class = socketserver.TCPServer, Handler
+
 # 启动服务器
 try:
-    with socketserver.TCPServer(("", PORT), Handler) as httpd:
+    with server_class(("", PORT), handler_class) as httpd:
         print("Server started successfully on port {}".format(PORT))
         httpd.serve_forever()
 except OSError as e:
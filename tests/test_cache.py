@@ -0,0 +1,144 @@
+"""进程内缓存（backend/cache.py）"""
+
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from cache import SharedCounter, SingleFlightCache, TTLCache  # noqa: E402
+
+BACKEND = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
+
+
+class BlockingLoader:
+    """第一次调用阻塞到 release()，用于在计算进行中制造并发与失效"""
+
+    def __init__(self, values):
+        self.values = list(values)
+        self.calls = 0
+        self.started = threading.Event()
+        self.gate = threading.Event()
+
+    def release(self):
+        self.gate.set()
+
+    def __call__(self):
+        self.calls += 1
+        value = self.values.pop(0)
+        if self.calls == 1:
+            self.started.set()
+            assert self.gate.wait(5)
+        return value
+
+
+def _run(target, *args):
+    result = {}
+
+    def runner():
+        try:
+            result['value'] = target(*args)
+        except Exception as e:
+            result['error'] = e
+
+    thread = threading.Thread(target=runner)
+    thread.start()
+    return thread, result
+
+
+def _wait_for_waiters(cache, count):
+    for _ in range(500):
+        if cache.coalesced >= count:
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError('等待线程未加入')
+
+
+def test_ttl_cache_expires_and_evicts():
+    cache = TTLCache(max_size=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.set('c', 3)
+    assert cache.get('a') is None
+    assert cache.get('c') == 3
+    cache.set('d', 4, ttl=0)
+    assert cache.get('d') is None
+
+
+def test_concurrent_requests_share_one_computation():
+    cache = SingleFlightCache()
+    loader = BlockingLoader(['v1'])
+    leader, leader_result = _run(cache.get_or_compute, 'k', loader)
+    assert loader.started.wait(5)
+    followers = [_run(cache.get_or_compute, 'k', loader) for _ in range(3)]
+    _wait_for_waiters(cache, 3)
+    loader.release()
+    for thread, _ in [(leader, leader_result)] + followers:
+        thread.join(5)
+    assert loader.calls == 1
+    assert leader_result['value'] == 'v1'
+    assert all(result['value'] == 'v1' for _, result in followers)
+    assert cache.get_or_compute('k', loader) == 'v1'
+    assert cache.stats()['computations'] == 1
+
+
+@pytest.mark.parametrize('invalidate', [lambda c: c.invalidate('k'), lambda c: c.clear()])
+def test_request_after_invalidation_does_not_join_stale_computation(invalidate):
+    cache = SingleFlightCache()
+    loader = BlockingLoader(['stale', 'fresh'])
+    leader, leader_result = _run(cache.get_or_compute, 'k', loader)
+    assert loader.started.wait(5)
+    invalidate(cache)
+    # 失效之后的请求重新计算，拿到写操作之后的结果
+    assert cache.get_or_compute('k', loader) == 'fresh'
+    loader.release()
+    leader.join(5)
+    assert leader_result['value'] == 'stale'
+    # 旧结果不覆盖新结果
+    assert cache.get_or_compute('k', loader) == 'fresh'
+    assert loader.calls == 2
+
+
+def test_errors_propagate_to_waiters_and_are_not_cached():
+    cache = SingleFlightCache()
+    gate = threading.Event()
+    started = threading.Event()
+
+    def failing():
+        started.set()
+        assert gate.wait(5)
+        raise RuntimeError('boom')
+
+    leader, leader_result = _run(cache.get_or_compute, 'k', failing)
+    assert started.wait(5)
+    follower, follower_result = _run(cache.get_or_compute, 'k', failing)
+    _wait_for_waiters(cache, 1)
+    gate.set()
+    leader.join(5)
+    follower.join(5)
+    assert isinstance(leader_result['error'], RuntimeError)
+    assert follower_result['error'] is leader_result['error']
+    assert cache.get_or_compute('k', lambda: 'ok') == 'ok'
+
+
+def test_shared_counter_is_visible_across_processes(tmp_path):
+    path = str(tmp_path / 'generation')
+    counter = SharedCounter(path)
+    assert counter.value() == 0
+    assert counter.increment() == 1
+    script = 'import sys; from cache import SharedCounter; c = SharedCounter(sys.argv[1]); print(c.value()); c.increment()'
+    output = subprocess.run([sys.executable, '-c', script, path], cwd=BACKEND, check=True,
+                            capture_output=True, text=True).stdout
+    assert output.strip() == '1'
+    # 已建立的映射能读到其他进程写入的新值
+    assert counter.value() == 2
+
+
+def test_shared_counter_falls_back_to_process_local(tmp_path):
+    counter = SharedCounter(str(tmp_path / 'missing' / 'generation'))
+    assert counter.value() == 0
+    assert counter.increment() == 1
+    assert counter.value() == 1
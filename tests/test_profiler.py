@@ -0,0 +1,49 @@
+"""SQL 性能分析（backend/profiler.py）"""
+
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from profiler import QueryProfiler, fingerprint  # noqa: E402
+
+
+def _wait_for_lines(path, count, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                lines = f.read().splitlines()
+            if len(lines) >= count:
+                return [json.loads(line) for line in lines]
+        time.sleep(0.05)
+    raise AssertionError('慢查询日志未写出')
+
+
+def test_slow_log_omits_params_by_default(tmp_path):
+    path = str(tmp_path / 'slow.log')
+    profiler = QueryProfiler(slow_threshold=0, explain=False, slow_log_path=path)
+    profiler.record("SELECT * FROM user_sessions WHERE session_token = %s", ('secret-token',), 0.5)
+    entry = _wait_for_lines(path, 1)[0]
+    assert 'params' not in entry
+    assert 'secret-token' not in json.dumps(entry)
+
+
+def test_slow_log_params_opt_in(tmp_path):
+    path = str(tmp_path / 'slow.log')
+    profiler = QueryProfiler(slow_threshold=0, explain=False, log_params=True, slow_log_path=path)
+    profiler.record("SELECT * FROM employees WHERE id = %s", (7,), 0.5)
+    assert _wait_for_lines(path, 1)[0]['params'] == [7]
+
+
+def test_multi_row_values_share_fingerprint():
+    one = fingerprint("INSERT INTO t (a, b) VALUES (%s, %s)")
+    two = fingerprint("INSERT INTO t (a, b) VALUES (1, 2), (3, 4)")
+    many = fingerprint("INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s), (%s, %s), (%s, %s)")
+    assert one == two == many == 'insert into t (a, b) values (?+)'
+
+
+def test_in_lists_share_fingerprint():
+    assert fingerprint("SELECT * FROM t WHERE id IN (1, 2)") == fingerprint("SELECT * FROM t WHERE id IN (%s, %s, %s, %s)")
@@ -0,0 +1,49 @@
+"""项目成员汇总字段（backend/project_totals.py）"""
+
+import os
+import sys
+from decimal import Decimal
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+import project_totals  # noqa: E402
+
+
+class RecordingCursor:
+    def __init__(self):
+        self.executed = []
+
+    def execute(self, sql, params=None):
+        self.executed.append(params)
+
+
+@pytest.mark.parametrize('value, expected', [
+    (None, None),
+    ('', None),
+    (3, Decimal('3.00')),
+    (2.5, Decimal('2.50')),
+    ('12.345', Decimal('12.35')),
+    (' 7.1 ', Decimal('7.10')),
+])
+def test_parse_budget_days_matches_column_precision(value, expected):
+    assert project_totals.parse_budget_days(value) == expected
+
+
+@pytest.mark.parametrize('value', ['abc', 'NaN', 'Infinity', '-1', True, [1], '1e12'])
+def test_parse_budget_days_rejects_invalid(value):
+    with pytest.raises(ValueError):
+        project_totals.parse_budget_days(value)
+
+
+def test_budget_change_applies_difference():
+    cursor = RecordingCursor()
+    project_totals.member_budget_changed(cursor, 5, Decimal('10.00'), Decimal('12.35'))
+    assert cursor.executed == [(Decimal('2.35'), 0, 5)]
+
+
+def test_unchanged_budget_skips_update():
+    cursor = RecordingCursor()
+    project_totals.member_budget_changed(cursor, 5, Decimal('3.00'), Decimal('3.00'))
+    assert cursor.executed == []
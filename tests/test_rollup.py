@@ -0,0 +1,64 @@
+"""报工日汇总表（backend/rollup.py）"""
+
+import os
+import sys
+from datetime import date
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+import rollup  # noqa: E402
+
+
+class RecordingCursor:
+    def __init__(self):
+        self.batches = []
+
+    def executemany(self, sql, rows):
+        kind = 'upsert' if sql.strip().startswith('INSERT') else 'purge'
+        self.batches.append((kind, sorted(rows)))
+
+
+DAY = date(2025, 3, 3)
+
+
+def test_apply_deltas_merges_same_key():
+    cursor = RecordingCursor()
+    rollup.apply_deltas(cursor, [
+        (DAY, 1, 2, 0, 1, 8),
+        (DAY, '1', '2', '0', 1, 4.5),
+        (DAY, 1, 3, 0, 1, Decimal('2.25')),
+    ])
+    assert cursor.batches == [('upsert', [
+        ('2025-03-03', 1, 2, 0, 2, Decimal('12.5')),
+        ('2025-03-03', 1, 3, 0, 1, Decimal('2.25')),
+    ])]
+
+
+def test_apply_deltas_skips_cancelled_and_purges_removed():
+    cursor = RecordingCursor()
+    rollup.apply_deltas(cursor, [(DAY, 1, 2, 0, 1, 8), (DAY, 1, 2, 0, -1, -8)])
+    assert cursor.batches == []
+    rollup.reports_removed(cursor, [(DAY, 1, 2, 1, 8)])
+    assert cursor.batches == [
+        ('upsert', [('2025-03-03', 1, 2, 1, -1, Decimal('-8'))]),
+        ('purge', [('2025-03-03', 1, 2, 1)]),
+    ]
+
+
+def test_reports_status_changed_moves_counts_between_statuses():
+    cursor = RecordingCursor()
+    rollup.reports_status_changed(cursor, [(DAY, 1, 2, 0, 8), (DAY, 1, 2, 0, 4), (DAY, 5, 2, 1, 6)], 1)
+    assert cursor.batches == [
+        ('upsert', [
+            ('2025-03-03', 1, 2, 0, -2, Decimal('-12')),
+            ('2025-03-03', 1, 2, 1, 2, Decimal('12')),
+        ]),
+        ('purge', [('2025-03-03', 1, 2, 0)]),
+    ]
+
+
+def test_reports_status_changed_to_same_status_is_noop():
+    cursor = RecordingCursor()
+    rollup.reports_status_changed(cursor, [(DAY, 1, 2, 3, 8)], 3)
+    assert cursor.batches == []
@@ -0,0 +1,43 @@
+"""员工搜索索引（backend/search_index.py）"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+import search_index  # noqa: E402
+from search_index import EmployeeSearchIndex  # noqa: E402
+
+ROWS = [
+    (1, '张三', '研发部'),
+    (2, 'Alice Wang', 'QA Team'),
+    (3, '李四', 'qa team'),
+    (4, '王五', None),
+]
+
+
+def _index():
+    return EmployeeSearchIndex(lambda: ROWS)
+
+
+def test_substring_matches_name_and_department_case_insensitively():
+    index = _index()
+    assert index.search('ALICE') == [2]
+    assert index.search('qa') == [3, 2]
+    assert index.search('研发') == [1]
+    assert index.search('') == [4, 3, 2, 1]
+
+
+def test_department_filter_is_case_insensitive():
+    index = _index()
+    assert index.search('', department='QA TEAM') == [3, 2]
+    assert index.search('李', department='Qa Team') == [3]
+    assert index.search('', department='QA') == []
+
+
+def test_pinyin_matching_is_opt_in(monkeypatch):
+    monkeypatch.setattr(search_index, '_pinyin_keys', lambda name: ('zhangsan', 'zs') if name == '张三' else ())
+    index = _index()
+    assert index.search('zs') == []
+    assert index.search('zs', pinyin=True) == [1]
+    assert index.typeahead('zhang')[0]['id'] == 1
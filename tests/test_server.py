@@ -0,0 +1,99 @@
+"""前端静态文件服务（server.py --mode prod）"""
+
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope='module')
+def server():
+    port = _free_port()
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, 'server.py'), '--mode', 'prod', '--port', str(port)],
+                               cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            break
+        except OSError:
+            time.sleep(0.1)
+    yield port
+    process.terminate()
+    process.wait(timeout=10)
+
+
+def _get(port, path, headers=None):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    try:
+        conn.request('GET', path, headers=headers or {})
+        response = conn.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        conn.close()
+
+
+def test_serves_index(server):
+    status, _, body = _get(server, '/index.html')
+    assert status == 200
+    assert body
+
+
+@pytest.mark.parametrize('path', [
+    '/backend/config.py',
+    '/backend/app.py',
+    '/%62ackend/app.p%79',
+    '/%62ackend/config.p%79',
+    '/%2egit/config',
+    '/%2Egit/HEAD',
+    '/components/../backend/app.py',
+    '/components/%2e%2e/backend/app.py',
+    '/requests.jsonl',
+    '/server.PY',
+])
+def test_denied_paths_including_percent_encoded(server, path):
+    status, _, body = _get(server, path)
+    assert status == 404
+    assert b'DB_CONFIG' not in body and b'import' not in body
+
+
+def test_component_bundle_etag_differs_per_encoding(server):
+    status, _, body = _get(server, '/components/manifest.json')
+    assert status == 200
+    bundle_url = json.loads(body)['bundle']
+    status, plain_headers, _ = _get(server, bundle_url)
+    assert status == 200
+    status, gzip_headers, _ = _get(server, bundle_url, {'Accept-Encoding': 'gzip'})
+    assert status == 200
+    assert gzip_headers.get('Content-Encoding') == 'gzip'
+    assert plain_headers['ETag'] != gzip_headers['ETag']
+    # 用未压缩版本的 ETag 请求压缩版本时不能返回 304
+    status, _, _ = _get(server, bundle_url, {'Accept-Encoding': 'gzip', 'If-None-Match': plain_headers['ETag']})
+    assert status == 200
+    status, _, _ = _get(server, bundle_url, {'Accept-Encoding': 'gzip', 'If-None-Match': gzip_headers['ETag']})
+    assert status == 304
+
+
+def test_precompressed_static_etag_differs_per_encoding(server):
+    status, plain_headers, _ = _get(server, '/index.html')
+    assert status == 200
+    status, gzip_headers, _ = _get(server, '/index.html', {'Accept-Encoding': 'gzip'})
+    assert status == 200
+    if gzip_headers.get('Content-Encoding') != 'gzip':
+        pytest.skip('index.html 未生成 gzip 版本')
+    assert plain_headers['ETag'] != gzip_headers['ETag']
+    status, _, _ = _get(server, '/index.html', {'Accept-Encoding': 'gzip', 'If-None-Match': plain_headers['ETag']})
+    assert status == 200